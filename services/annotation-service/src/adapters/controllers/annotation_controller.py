@@ -17,6 +17,7 @@ from usecases.get_annotations import (
 from usecases.update_annotation import UpdateAnnotationUseCase, ReviewAnnotationUseCase
 from usecases.delete_annotation import DeleteAnnotationUseCase
 from adapters.gateways.annotation_gateway import AnnotationGateway
+from adapters.controllers.json_response import FastJSONResponse
 from adapters.dtos.annotation_dto import (
     AnnotationResponse, CreateAnnotationRequest, UpdateAnnotationRequest,
     ReviewAnnotationRequest, AnnotationListResponse, AnnotationCreateResponse,
@@ -91,6 +92,15 @@ def _annotation_to_response(annotation) -> AnnotationResponse:
         review_notes=annotation.review_notes
     )
 
+def _annotation_list_response(annotations: List[dict], skip: int, limit: int) -> FastJSONResponse:
+    """Listado serializado directamente desde los documentos del repositorio (sin DTO por anotación)"""
+    return FastJSONResponse({
+        "annotations": annotations,
+        "total": len(annotations),
+        "skip": skip,
+        "limit": limit
+    })
+
 @router.post("/", response_model=AnnotationCreateResponse, status_code=status.HTTP_201_CREATED)
 async def create_annotation(
     annotation_data: CreateAnnotationRequest,
@@ -127,13 +137,7 @@ async def get_annotations(
             user_id=user_id, image_id=image_id, skip=skip, limit=limit
         )
         logger.info(f"Anotaciones encontradas: {len(annotations)}")
-        annotation_responses = [_annotation_to_response(ann) for ann in annotations]
-        return AnnotationListResponse(
-            annotations=annotation_responses,
-            total=len(annotation_responses),
-            skip=skip,
-            limit=limit
-        )
+        return _annotation_list_response(annotations, skip=skip, limit=limit)
     except Exception as e:
         handle_internal_error(e, context="al obtener anotaciones")
 
@@ -168,13 +172,7 @@ async def get_annotations_by_status(
     """Obtener anotaciones por estado"""
     try:
         annotations = await get_annotations_by_status_use_case.execute(status)
-        annotation_responses = [_annotation_to_response(ann) for ann in annotations]
-        return AnnotationListResponse(
-            annotations=annotation_responses,
-            total=len(annotation_responses),
-            skip=0,
-            limit=len(annotation_responses)
-        )
+        return _annotation_list_response(annotations, skip=0, limit=len(annotations))
     except Exception as e:
         handle_internal_error(e, context="al obtener anotaciones por estado")
 
@@ -186,13 +184,7 @@ async def get_annotations_by_category(
     """Obtener anotaciones por categoría"""
     try:
         annotations = await get_annotations_by_category_use_case.execute(category)
-        annotation_responses = [_annotation_to_response(ann) for ann in annotations]
-        return AnnotationListResponse(
-            annotations=annotation_responses,
-            total=len(annotation_responses),
-            skip=0,
-            limit=len(annotation_responses)
-        )
+        return _annotation_list_response(annotations, skip=0, limit=len(annotations))
     except Exception as e:
         handle_internal_error(e, context="al obtener anotaciones por categoría")
 
@@ -203,13 +195,7 @@ async def get_pending_reviews(
     """Obtener anotaciones pendientes de revisión"""
     try:
         annotations = await get_pending_reviews_use_case.execute()
-        annotation_responses = [_annotation_to_response(ann) for ann in annotations]
-        return AnnotationListResponse(
-            annotations=annotation_responses,
-            total=len(annotation_responses),
-            skip=0,
-            limit=len(annotation_responses)
-        )
+        return _annotation_list_response(annotations, skip=0, limit=len(annotations))
     except Exception as e:
         handle_internal_error(e, context="al obtener anotaciones pendientes de revisión")
 
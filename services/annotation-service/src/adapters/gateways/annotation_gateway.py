@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from domain.entities.Annotation import Annotation
 from domain.repositories.AnnotationRepository import AnnotationRepository
 from infrastructure.repositories.MongoAnnotationRepository import MongoAnnotationRepository
@@ -21,6 +21,10 @@ class AnnotationGateway(AnnotationRepository):
         """Obtiene todas las anotaciones con paginación"""
         return await self.repository.find_all(skip, limit)
     
+    async def find_documents(self, query: Dict[str, Any], skip: int = 0, limit: int = 0) -> List[Dict[str, Any]]:
+        """Busca anotaciones como documentos listos para serializar"""
+        return await self.repository.find_documents(query, skip, limit)
+    
     async def find_by_image_id(self, image_id: str) -> List[Annotation]:
         """Busca anotaciones por ID de imagen"""
         return await self.repository.find_by_image_id(image_id)
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from ..entities.Annotation import Annotation
 
 class AnnotationRepository(ABC):
@@ -18,6 +18,11 @@ class AnnotationRepository(ABC):
         """Buscar una anotación por su ID."""
         pass
 
+    @abstractmethod
+    async def find_documents(self, query: Dict[str, Any], skip: int = 0, limit: int = 0) -> List[Dict[str, Any]]:
+        """Buscar anotaciones como documentos listos para serializar (sin entidades)."""
+        pass
+
     @abstractmethod
     async def find_by_image_id(self, image_id: str) -> List[Annotation]:
         """Buscar todas las anotaciones de una imagen."""
@@ -1,10 +1,18 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from bson import ObjectId
 from domain.entities.Annotation import Annotation
 from domain.repositories.AnnotationRepository import AnnotationRepository
 from ..database import database
 from datetime import datetime
 
+# Campos de AnnotationResponse (lo que devuelven los listados)
+RESPONSE_PROJECTION = {
+    field: 1 for field in (
+        "image_id", "user_id", "title", "description", "category", "confidence", "status", "shapes",
+        "metadata", "created_at", "updated_at", "reviewed_by", "reviewed_at", "review_notes",
+    )
+}
+
 class MongoAnnotationRepository(AnnotationRepository):
     def __init__(self):
         self.collection = database.get_collection("annotations")
@@ -53,6 +61,24 @@ class MongoAnnotationRepository(AnnotationRepository):
             logging.error(f"Error al buscar anotación por ID: {e}")
             return None
     
+    async def find_documents(self, query: Dict[str, Any], skip: int = 0, limit: int = 0) -> List[Dict[str, Any]]:
+        """Buscar anotaciones como documentos con la forma de AnnotationResponse.
+
+        Lectura de confianza: los documentos los escribió el propio servicio a partir
+        de la entidad ya validada, así que no se vuelven a validar con Pydantic.
+        """
+        cursor = self.collection.find(query, RESPONSE_PROJECTION, skip=skip, limit=limit)
+        documents = []
+        async for doc in cursor:
+            doc["id"] = str(doc.pop("_id"))
+            doc.setdefault("shapes", [])
+            doc.setdefault("metadata", {})
+            doc.setdefault("reviewed_by", None)
+            doc.setdefault("reviewed_at", None)
+            doc.setdefault("review_notes", None)
+            documents.append(doc)
+        return documents
+    
     async def find_by_image_id(self, image_id: str) -> List[Annotation]:
         """Buscar todas las anotaciones de una imagen"""
         cursor = self.collection.find({"image_id": image_id})
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from domain.entities.Annotation import Annotation
 from domain.repositories.AnnotationRepository import AnnotationRepository
 
@@ -7,14 +7,14 @@ class GetAnnotationsUseCase:
         self.annotation_repository = annotation_repository
     
     async def execute(self, user_id: str = None, image_id: str = None, 
-                     skip: int = 0, limit: int = 100) -> List[Annotation]:
-        """Ejecutar el caso de uso de obtener anotaciones"""
+                     skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Ejecutar el caso de uso de obtener anotaciones (documentos con la forma de AnnotationResponse)"""
         if user_id:
-            return await self.annotation_repository.find_by_user_id(user_id)
+            return await self.annotation_repository.find_documents({"user_id": user_id})
         elif image_id:
-            return await self.annotation_repository.find_by_image_id(image_id)
+            return await self.annotation_repository.find_documents({"image_id": image_id})
         else:
-            return await self.annotation_repository.find_all(skip=skip, limit=limit)
+            return await self.annotation_repository.find_documents({}, skip=skip, limit=limit)
 
 class GetAnnotationByIdUseCase:
     def __init__(self, annotation_repository: AnnotationRepository):
@@ -31,22 +31,22 @@ class GetAnnotationsByStatusUseCase:
     def __init__(self, annotation_repository: AnnotationRepository):
         self.annotation_repository = annotation_repository
     
-    async def execute(self, status: str) -> List[Annotation]:
+    async def execute(self, status: str) -> List[Dict[str, Any]]:
         """Ejecutar el caso de uso de obtener anotaciones por estado"""
-        return await self.annotation_repository.find_by_status(status)
+        return await self.annotation_repository.find_documents({"status": status})
 
 class GetAnnotationsByCategoryUseCase:
     def __init__(self, annotation_repository: AnnotationRepository):
         self.annotation_repository = annotation_repository
     
-    async def execute(self, category: str) -> List[Annotation]:
+    async def execute(self, category: str) -> List[Dict[str, Any]]:
         """Ejecutar el caso de uso de obtener anotaciones por categoría"""
-        return await self.annotation_repository.find_by_category(category)
+        return await self.annotation_repository.find_documents({"category": category})
 
 class GetPendingReviewsUseCase:
     def __init__(self, annotation_repository: AnnotationRepository):
         self.annotation_repository = annotation_repository
     
-    async def execute(self) -> List[Annotation]:
+    async def execute(self) -> List[Dict[str, Any]]:
         """Ejecutar el caso de uso de obtener anotaciones pendientes de revisión"""
-        return await self.annotation_repository.find_pending_reviews()
+        return await self.annotation_repository.find_documents({"status": "pending"})
@@ -1,7 +1,7 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 import os
 import logging
 import httpx
@@ -133,6 +133,81 @@ async def predict_tumor_raw(image: UploadFile = File(...)):
         raise HTTPException(status_code=502, detail=f"Error comunicando con Colab (raw): {str(e)}")
 
 
+class BatchPredictionItem(PredictionResponse):
+    filename: Optional[str] = None
+
+
+class BatchPredictionResponse(BaseModel):
+    results: List[BatchPredictionItem]
+    processing_time: Optional[float] = None
+
+
+def _to_batch_item(filename: Optional[str], data: dict) -> BatchPredictionItem:
+    return BatchPredictionItem(
+        filename=filename,
+        status=str(data.get("status", "success")),
+        prediction=data.get("prediction"),
+        mean_score=float(data.get("mean_score")) if data.get("mean_score") is not None else None,
+        processing_time=float(data["processing_time"]) if data.get("processing_time") is not None else None,
+        error=data.get("error"),
+    )
+
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_tumor_batch(images: List[UploadFile] = File(...)):
+    """Predicción de un lote de imágenes en una sola petición.
+
+    Si COLAB_PREDICT_BATCH_URL está configurado, el lote completo se envía a Colab en
+    una única llamada ({"images": [{"id", "image_data"}]} -> {"results": [...]}, en el
+    mismo orden). Si no, cada imagen se reenvía a COLAB_PREDICT_URL en paralelo
+    (hasta COLAB_BATCH_CONCURRENCY a la vez) con un único cliente HTTP.
+    Un error en una imagen no invalida el resto: se devuelve con status "error".
+    """
+    import time, base64, asyncio
+    start_time = time.time()
+    colab_url = os.getenv("COLAB_PREDICT_URL", "").strip()
+    colab_batch_url = os.getenv("COLAB_PREDICT_BATCH_URL", "").strip()
+    if not colab_url and not colab_batch_url:
+        raise HTTPException(status_code=500, detail="COLAB_PREDICT_URL no está configurado")
+
+    filenames = [getattr(image, "filename", None) for image in images]
+    encoded = [base64.b64encode(await image.read()).decode("utf-8") for image in images]
+    logger.info("/predict/batch (proxy Colab) | imágenes=%s", len(encoded))
+    headers = {"ngrok-skip-browser-warning": "true", "Content-Type": "application/json"}
+
+    async with httpx.AsyncClient(timeout=float(os.getenv("COLAB_BATCH_TIMEOUT", "300"))) as client:
+        if colab_batch_url:
+            payload = {"images": [{"id": name, "image_data": b64} for name, b64 in zip(filenames, encoded)]}
+            try:
+                resp = await client.post(colab_batch_url, json=payload, headers=headers)
+            except Exception as e:
+                raise HTTPException(status_code=502, detail=f"Error comunicando con Colab (batch): {str(e)}")
+            if resp.status_code >= 400:
+                logger.error("Colab (batch) respondió %s: %s", resp.status_code, resp.text[:500])
+                raise HTTPException(status_code=resp.status_code, detail=f"Colab error: {resp.text}")
+            results = resp.json().get("results", [])
+            if len(results) != len(encoded):
+                raise HTTPException(status_code=502, detail="Colab (batch) devolvió un número de resultados distinto")
+            items = [_to_batch_item(name, data) for name, data in zip(filenames, results)]
+        else:
+            semaphore = asyncio.Semaphore(int(os.getenv("COLAB_BATCH_CONCURRENCY", "4")))
+
+            async def forward(name: Optional[str], b64: str) -> BatchPredictionItem:
+                async with semaphore:
+                    try:
+                        resp = await client.post(colab_url, json={"image_data": b64}, headers=headers)
+                        if resp.status_code >= 400:
+                            logger.error("Colab respondió %s: %s", resp.status_code, resp.text[:500])
+                            return BatchPredictionItem(filename=name, status="error", error=f"Colab error: {resp.text[:500]}")
+                        return _to_batch_item(name, resp.json())
+                    except Exception as e:
+                        return BatchPredictionItem(filename=name, status="error", error=f"Error comunicando con Colab: {str(e)}")
+
+            items = await asyncio.gather(*(forward(name, b64) for name, b64 in zip(filenames, encoded)))
+
+    return BatchPredictionResponse(results=list(items), processing_time=time.time() - start_time)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8004)
\ No newline at end of file
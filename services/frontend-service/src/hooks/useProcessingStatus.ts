@@ -18,6 +18,7 @@ export const useProcessingStatus = ({
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const intervalRef = useRef<NodeJS.Timeout | null>(null);
+  const unsubscribeRef = useRef<(() => void) | null>(null);
 
   const fetchStatus = async () => {
     if (!enabled || !imageId) return;
@@ -50,20 +51,43 @@ export const useProcessingStatus = ({
   useEffect(() => {
     if (!enabled || !imageId) return;
 
-    // Obtener estado inicial
-    fetchStatus();
-
-    // Configurar polling
-    intervalRef.current = setInterval(fetchStatus, interval);
+    // Canal push (SSE): el servidor envía el estado actual y cada transición
+    unsubscribeRef.current = apiService.subscribeProcessingStatus(
+      imageId,
+      (statusData) => {
+        setStatus(statusData);
+        setError(null);
+        if (onStatusChange) {
+          onStatusChange(statusData);
+        }
+      },
+      () => {
+        // Fallback: polling si no hay SSE o la conexión se corta
+        unsubscribeRef.current = null;
+        fetchStatus();
+        if (!intervalRef.current) {
+          intervalRef.current = setInterval(fetchStatus, interval);
+        }
+      }
+    );
 
     return () => {
+      if (unsubscribeRef.current) {
+        unsubscribeRef.current();
+        unsubscribeRef.current = null;
+      }
       if (intervalRef.current) {
         clearInterval(intervalRef.current);
+        intervalRef.current = null;
       }
     };
   }, [imageId, enabled, interval]);
 
   const stopPolling = () => {
+    if (unsubscribeRef.current) {
+      unsubscribeRef.current();
+      unsubscribeRef.current = null;
+    }
     if (intervalRef.current) {
       clearInterval(intervalRef.current);
       intervalRef.current = null;
@@ -108,7 +108,7 @@ const Images: React.FC = () => {
                 <img
                   onClick={() => navigate(`/chat/${image.id}`)}
                   style={{ cursor: 'pointer' }}
-                  src={apiService.getImageDownloadUrl(image.id)}
+                  src={apiService.getImageDerivativeUrl(image.id, 'thumb_256')}
                   alt={image.original_filename}
                   onError={(e) => {
                     const target = e.target as HTMLImageElement;
@@ -99,9 +99,10 @@ export interface ImageResponse {
 
 export interface ImageListResponse {
   images: ImageResponse[];
-  total: number;
+  total?: number | null;
   skip: number;
   limit: number;
+  next_cursor?: string | null;
 }
 
 export interface ImageUploadResponse {
@@ -342,6 +343,49 @@ class ApiService {
     return data;
   }
 
+  // Subida directa al almacenamiento: los bytes no pasan por image-service
+  async uploadImageDirect(file: File, userId: string, customName?: string): Promise<{ image_id: string; job_id: string | null }> {
+    const buffer = await file.arrayBuffer();
+    const digest = await crypto.subtle.digest('SHA-256', buffer);
+    const sha256 = Array.from(new Uint8Array(digest)).map((b) => b.toString(16).padStart(2, '0')).join('');
+
+    const sessionResp = await fetch(`${this.imageApiUrl}/images/upload-sessions`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ filename: file.name, size: file.size, sha256, user_id: userId, custom_filename: customName }),
+    });
+    if (!sessionResp.ok) {
+      const errorData = await sessionResp.json().catch(() => ({}));
+      throw new Error(errorData.detail || `HTTP error! status: ${sessionResp.status}`);
+    }
+    const session = await sessionResp.json();
+
+    let uploadResp: Response;
+    if (session.method === 'POST') {
+      const form = new FormData();
+      Object.entries(session.fields as Record<string, string>).forEach(([key, value]) => form.append(key, value));
+      form.append('file', file);
+      uploadResp = await fetch(session.url, { method: 'POST', body: form });
+    } else {
+      uploadResp = await fetch(session.url, { method: 'PUT', headers: session.headers, body: buffer });
+    }
+    if (!uploadResp.ok) {
+      throw new Error(`Error subiendo el archivo: ${uploadResp.status}`);
+    }
+
+    const completeResp = await fetch(`${this.imageApiUrl}/images/upload-sessions/${session.session_id}/complete`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ user_id: userId }),
+    });
+    if (!completeResp.ok) {
+      const errorData = await completeResp.json().catch(() => ({}));
+      throw new Error(errorData.detail || `HTTP error! status: ${completeResp.status}`);
+    }
+    const completed = await completeResp.json();
+    return { image_id: completed.image.id, job_id: completed.job_id };
+  }
+
   // Jobs de validación eliminados (flujo ahora síncrono)
 
   async getProcessingStatus(imageId: string): Promise<ProcessingStatusResponse> {
@@ -401,10 +445,12 @@ class ApiService {
     }
   }
 
-  async getImages(userId?: string, skip: number = 0, limit: number = 100): Promise<ImageListResponse> {
+  async getImages(userId?: string, skip: number = 0, limit: number = 100, cursor?: string | null): Promise<ImageListResponse> {
     const params = new URLSearchParams();
     if (userId) params.append('user_id', userId);
-    params.append('skip', skip.toString());
+    // Con cursor (next_cursor de la página anterior) el coste no depende de la profundidad
+    if (cursor) params.append('cursor', cursor);
+    else params.append('skip', skip.toString());
     params.append('limit', limit.toString());
     
     return this.request<ImageListResponse>(`/images/?${params.toString()}`, {}, true);
@@ -424,6 +470,37 @@ class ApiService {
     return `${this.imageApiUrl}/images/download/${imageId}`;
   }
 
+  getImageDerivativeUrl(imageId: string, kind: 'thumb_128' | 'thumb_256' | 'thumb_512' | 'model' | 'vlm' = 'thumb_256'): string {
+    return `${this.imageApiUrl}/images/${imageId}/derivative/${kind}`;
+  }
+
+  // Suscripción push (SSE) al estado de procesamiento; devuelve la función para cerrarla.
+  // onError se invoca si el navegador no soporta EventSource o la conexión falla (usar polling).
+  subscribeProcessingStatus(
+    imageId: string,
+    onStatus: (status: ProcessingStatusResponse) => void,
+    onError?: () => void
+  ): () => void {
+    if (typeof EventSource === 'undefined') {
+      onError?.();
+      return () => {};
+    }
+    const source = new EventSource(`${this.imageApiUrl}/images/${imageId}/processing-status/stream`);
+    source.addEventListener('status', (event) => {
+      const status = JSON.parse((event as MessageEvent).data) as ProcessingStatusResponse;
+      onStatus(status);
+      // El servidor cierra el canal al llegar a un estado final
+      if (status.status === 'completed' || status.status === 'failed') {
+        source.close();
+      }
+    });
+    source.onerror = () => {
+      source.close();
+      onError?.();
+    };
+    return () => source.close();
+  }
+
   // Colab proxy prediction (reenvía al servicio 8004)
   async predictImageViaColab(imageId: string): Promise<ProcessingStatusResponse> {
     const downloadUrl = this.getImageDownloadUrl(imageId);
@@ -472,6 +549,48 @@ class ApiService {
     }, true);
   }
 
+  // Chat con la respuesta en streaming (SSE sobre POST): onToken recibe cada fragmento;
+  // abortar la señal cancela la generación en el servidor. Resuelve con el mensaje guardado.
+  async streamImageChatMessage(
+    imageId: string,
+    userId: string,
+    message: string,
+    onToken: (text: string) => void,
+    signal?: AbortSignal
+  ): Promise<ChatMessageDTO> {
+    const params = new URLSearchParams({ user_id: userId });
+    const response = await fetch(`${this.imageApiUrl}/images/${imageId}/chat/stream?${params.toString()}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+      body: JSON.stringify({ message }),
+      signal,
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Error en chat: ${response.status} ${await response.text()}`);
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+        const event = block.match(/^event: (.*)$/m)?.[1];
+        const data = block.match(/^data: (.*)$/m)?.[1];
+        if (!event || data === undefined) continue; // heartbeat
+        if (event === 'token') onToken(JSON.parse(data).text);
+        if (event === 'done') return JSON.parse(data) as ChatMessageDTO;
+        if (event === 'error') throw new Error(JSON.parse(data).detail);
+      }
+    }
+    throw new Error('La respuesta del chat terminó sin completarse');
+  }
+
   // Annotation methods
   async getAnnotations(imageId: string): Promise<AnnotationListResponse> {
     return this.request<AnnotationListResponse>(`/annotations/?image_id=${imageId}`, {}, false, true);
@@ -0,0 +1,115 @@
+"""
+Benchmark de concurrencia de los gateways asíncronos (VLM y predicción).
+
+Uso:
+    python scripts/benchmark_gateway_concurrency.py [--calls 20] [--delay 0.5] [--tolerance 2.0]
+
+Lanza N llamadas concurrentes a MedicalImageValidator.validate_brain_ct (lo que
+ejecuta POST /validate) y a PredictionGateway.predict contra un Ollama y un
+colab-service simulados que tardan --delay segundos en responder. Con el cliente
+HTTP asíncrono compartido las llamadas se solapan: el tiempo total debe rondar el
+de una sola llamada, no N veces. Sale con código 1 si alguna etapa falla o se serializa
+(tiempo total > delay * tolerance).
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from io import BytesIO
+from pathlib import Path
+
+import httpx
+from PIL import Image
+
+# Sin caché de veredictos (usa Mongo) ni pre-filtro: cada validación llega al VLM simulado
+os.environ.setdefault("VLM_PROVIDER", "ollama")
+os.environ["VALIDATION_CACHE_ENABLED"] = "false"
+os.environ["PREFILTER_ENABLED"] = "false"
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from infrastructure.http_client import HttpClient, http_client  # noqa: E402
+from infrastructure.medical_image_validator import MedicalImageValidator  # noqa: E402
+from adapters.gateways.prediction_gateway import PredictionGateway  # noqa: E402
+
+
+def make_transport(delay):
+    """Ollama y colab-service simulados: responden tras `delay` segundos sin bloquear el loop"""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delay)
+        if request.url.path.endswith("/api/chat"):
+            return httpx.Response(200, json={"message": {"role": "assistant", "content": "SÍ"}})
+        return httpx.Response(200, json={"prediction": "tumor", "mean_score": 0.9})
+    return httpx.MockTransport(handler)
+
+
+def make_png(index):
+    """PNG distinto por llamada (el validador no debe reutilizar nada entre ellas)"""
+    out = BytesIO()
+    Image.new("L", (256, 256), color=index % 256).save(out, format="PNG")
+    return out.getvalue()
+
+
+async def timed_gather(calls):
+    start = time.perf_counter()
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    # El validador no lanza: sus fallos técnicos llegan como (False, {"validation_error": True})
+    errors = [
+        r if isinstance(r, Exception) else r[1].get("error")
+        for r in results
+        if isinstance(r, Exception) or (isinstance(r, tuple) and r[1].get("validation_error"))
+    ]
+    return elapsed, errors
+
+
+async def run(args):
+    HttpClient.client = httpx.AsyncClient(transport=make_transport(args.delay))
+    validator = MedicalImageValidator()
+    gateway = PredictionGateway()
+    images = [make_png(i) for i in range(args.calls)]
+    limit = args.delay * args.tolerance
+
+    try:
+        stages = {
+            "validate_brain_ct": [validator.validate_brain_ct(data, "image/png") for data in images],
+            "predict": [gateway.predict(data, f"img_{i}.png", "image/png") for i, data in enumerate(images)],
+        }
+        print(f"Llamadas concurrentes: {args.calls}, latencia simulada: {args.delay:.2f} s, límite: {limit:.2f} s")
+        header = f"{'Etapa':<18} | {'total (s)':>9} | {'serie (s)':>9} | {'errores':>7} | resultado"
+        print(header)
+        print("-" * len(header))
+
+        failed = False
+        for name, calls in stages.items():
+            elapsed, errors = await timed_gather(calls)
+            ok = not errors and elapsed <= limit
+            failed = failed or not ok
+            print(f"{name:<18} | {elapsed:>9.2f} | {args.delay * args.calls:>9.2f} | {len(errors):>7} | "
+                  f"{'OK' if ok else 'SERIALIZADO' if not errors else 'ERROR'}")
+            for err in errors[:3]:
+                print(f"⚠️  {name}: {err}")
+    finally:
+        await http_client.close()
+
+    if failed:
+        print("❌ Alguna etapa ha fallado o sus llamadas no se solapan (bloqueo del event loop)")
+        return 1
+    print("✅ Las llamadas concurrentes tardan lo mismo que una sola")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de concurrencia de los gateways VLM y de predicción")
+    parser.add_argument("--calls", type=int, default=20, help="Llamadas concurrentes por etapa")
+    parser.add_argument("--delay", type=float, default=0.5, help="Latencia simulada de cada respuesta (s)")
+    parser.add_argument("--tolerance", type=float, default=2.0,
+                        help="Múltiplo de --delay admitido para el tiempo total")
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Benchmark del ImageContext frente al flujo anterior de /validate-upload.
+
+Uso:
+    python scripts/benchmark_image_context.py <imagen> [--iterations 20]
+
+Compara el tiempo de CPU por subida cuando cada etapa decodifica los bytes por su
+cuenta (dimensiones en storage, PNG para el VLM, decodificación en el servicio de
+predicción) frente a decodificar una sola vez con ImageContext.
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from infrastructure.image_context import ImageContext, VLM_MAX_SIDE, MODEL_INPUT_SIZE  # noqa: E402
+
+
+def legacy_pipeline(file_content: bytes) -> None:
+    """Flujo anterior: cada etapa vuelve a abrir y decodificar los bytes"""
+    # StorageService._get_image_dimensions
+    Image.open(BytesIO(file_content)).size
+    # MedicalImageValidator.validate_brain_ct
+    img = Image.open(BytesIO(file_content)).convert("RGB")
+    w, h = img.size
+    scale = min(1.0, VLM_MAX_SIDE / max(w, h))
+    if scale < 1.0:
+        img = img.resize((int(w * scale), int(h * scale)))
+    img.save(BytesIO(), format="PNG", optimize=True)
+    # Servicio de predicción: decodifica el original y lo redimensiona
+    Image.open(BytesIO(file_content)).convert("RGB").resize(MODEL_INPUT_SIZE)
+
+
+async def context_pipeline(file_content: bytes, send_model_input: bool) -> None:
+    """Flujo con ImageContext: una decodificación compartida por todas las etapas"""
+    context = ImageContext(file_content, "bench.png", "image/png")
+    await context.dimensions()
+    await context.vlm_png()
+    if send_model_input:
+        payload = await context.model_input_png()
+        # El servicio de predicción decodifica un PNG de 300x300 en lugar del original
+        Image.open(BytesIO(payload)).convert("RGB").resize(MODEL_INPUT_SIZE)
+    else:
+        Image.open(BytesIO(file_content)).convert("RGB").resize(MODEL_INPUT_SIZE)
+
+
+def cpu_ms(fn, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) * 1000 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de decodificación única por subida")
+    parser.add_argument("image", help="Imagen de prueba")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    file_content = Path(args.image).read_bytes()
+    print(f"Imagen: {args.image} ({len(file_content) / 1024:.1f} KB), iteraciones: {args.iterations}")
+
+    legacy = cpu_ms(lambda: legacy_pipeline(file_content), args.iterations)
+    ctx_raw = cpu_ms(lambda: asyncio.run(context_pipeline(file_content, False)), args.iterations)
+    ctx_model = cpu_ms(lambda: asyncio.run(context_pipeline(file_content, True)), args.iterations)
+
+    print(f"{'Flujo':<45} | {'CPU ms/subida':>13}")
+    print("-" * 62)
+    print(f"{'Anterior (decodificación por etapa)':<45} | {legacy:>13.2f}")
+    print(f"{'ImageContext':<45} | {ctx_raw:>13.2f}")
+    print(f"{'ImageContext + PREDICTION_SEND_MODEL_INPUT':<45} | {ctx_model:>13.2f}")
+    print()
+    print(f"Ahorro de CPU por subida: {legacy - ctx_raw:.2f} ms ({(legacy - ctx_raw) / legacy:.1%}), "
+          f"con entrada del modelo: {legacy - ctx_model:.2f} ms ({(legacy - ctx_model) / legacy:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark de la serialización de los listados de imágenes.
+
+Uso:
+    python scripts/benchmark_list_serialization.py [--items 1000] [--iterations 50]
+
+Compara, sobre páginas sintéticas tal como las devuelve Mongo, el camino anterior
+(entidad Image + ImageResponse por documento, re-validación del response_model y
+json.dumps de FastAPI) con el camino rápido (documento proyectado + orjson con
+FastJSONResponse). Comprueba además que ambos producen el mismo JSON.
+"""
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from bson import ObjectId
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from domain.entities.Image import Image  # noqa: E402
+from adapters.dtos.image_dto import ImageResponse, ImageListResponse  # noqa: E402
+from adapters.controllers.json_response import FastJSONResponse  # noqa: E402
+from infrastructure.repositories.MongoImageRepository import MongoImageRepository  # noqa: E402
+
+STATUSES = ["pending", "processing", "completed", "failed"]
+
+
+def make_documents(items):
+    """Documentos con la proyección de los listados (ObjectId y datetime como los entrega Mongo)"""
+    now = datetime.utcnow().replace(microsecond=0)
+    docs = []
+    for i in range(items):
+        content_hash = f"{random.getrandbits(256):064x}"
+        docs.append({
+            "_id": ObjectId(),
+            "filename": f"{content_hash}.png",
+            "original_filename": f"estudio_{i:05d}.png",
+            "file_path": f"blobs/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.png",
+            "file_size": random.randint(50_000, 5_000_000),
+            "mime_type": "image/png",
+            "width": 512,
+            "height": 512,
+            "user_id": f"user-{i % 20}",
+            "upload_date": now - timedelta(seconds=i),
+            "processing_status": random.choice(STATUSES),
+            "metadata": {"content_hash": content_hash, "medical_validation": {"status": "valid"}},
+        })
+    return docs
+
+
+async def legacy_page(docs, field):
+    """Camino anterior: entidad por documento, DTO por imagen y serialización del response_model"""
+    images = []
+    for doc in docs:
+        doc = dict(doc)
+        doc["_id"] = str(doc["_id"])
+        images.append(Image.model_validate(doc))
+    responses = [
+        ImageResponse(
+            id=str(image.id), filename=image.filename, original_filename=image.original_filename,
+            file_size=image.file_size, mime_type=image.mime_type, width=image.width, height=image.height,
+            user_id=image.user_id, upload_date=image.upload_date, processing_status=image.processing_status,
+            metadata=image.metadata,
+        )
+        for image in images
+    ]
+    content = ImageListResponse(images=responses, total=None, skip=0, limit=len(docs), next_cursor=None)
+    serialized = await serialize_response(field=field, response_content=content, is_coroutine=True)
+    return JSONResponse(serialized).body
+
+
+def fast_page(docs):
+    """Camino rápido: documento proyectado (sin file_path) y orjson"""
+    images = []
+    for doc in docs:
+        doc = {key: value for key, value in doc.items() if key != "file_path"}
+        images.append(MongoImageRepository._response_document(doc))
+    return FastJSONResponse({
+        "images": images, "total": None, "skip": 0, "limit": len(docs), "next_cursor": None,
+    }).body
+
+
+async def run(args):
+    docs = make_documents(args.items)
+    field = create_response_field(name="Response_get_images", type_=ImageListResponse)
+
+    legacy_body = await legacy_page(docs, field)
+    fast_body = fast_page(docs)
+    if json.loads(legacy_body) != json.loads(fast_body):
+        print("❌ Las respuestas no coinciden")
+        return 1
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        await legacy_page(docs, field)
+    legacy_ms = (time.perf_counter() - start) * 1000 / args.iterations
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        fast_page(docs)
+    fast_ms = (time.perf_counter() - start) * 1000 / args.iterations
+
+    print(f"Página de {args.items} imágenes, {args.iterations} iteraciones, {len(fast_body) / 1024:.0f} KB")
+    print(f"{'Camino':<24} | {'ms/página':>9}")
+    print("-" * 36)
+    print(f"{'pydantic + json (antes)':<24} | {legacy_ms:>9.2f}")
+    print(f"{'documento + orjson':<24} | {fast_ms:>9.2f}")
+    print(f"Aceleración: x{legacy_ms / fast_ms:.1f}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de listados de imágenes")
+    parser.add_argument("--items", type=int, default=1000, help="Imágenes por página")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Benchmark de la re-codificación de imágenes enviadas al VLM.
+
+Uso:
+    python scripts/benchmark_vlm_encoding.py <carpeta_imagenes> [--iterations 5] [--vlm]
+
+Para cada configuración (formato, calidad, lado máximo) reporta el tiempo medio de
+codificación y el tamaño medio del payload. Con --vlm, además envía cada payload al
+VLM configurado (VLM_PROVIDER) y mide la concordancia del veredicto del validador
+frente a la configuración anterior (PNG optimize=True a 1024 px).
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from infrastructure.vlm_encoder import VLMEncoder  # noqa: E402
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
+
+SETTINGS = [
+    VLMEncoder("png", max_side=1024, png_compress_level=1),
+    VLMEncoder("png", max_side=1024, png_compress_level=6),
+    VLMEncoder("jpeg", quality=95, max_side=1024),
+    VLMEncoder("jpeg", quality=90, max_side=1024),
+    VLMEncoder("jpeg", quality=80, max_side=1024),
+    VLMEncoder("webp", quality=90, max_side=1024),
+    VLMEncoder("webp", quality=80, max_side=1024),
+    VLMEncoder("jpeg", quality=90, max_side=768),
+    VLMEncoder("jpeg", quality=90, max_side=512),
+    VLMEncoder("png", max_side=768, png_compress_level=1),
+]
+
+
+def encode_legacy(img: Image.Image):
+    """Codificación anterior del validador: PNG optimize=True a 1024 px"""
+    img = VLMEncoder("png", max_side=1024).resize(img)
+    out = BytesIO()
+    img.save(out, format="PNG", optimize=True)
+    return out.getvalue(), "image/png"
+
+
+def load_images(directory):
+    images = []
+    for path in sorted(Path(directory).rglob("*")):
+        if path.suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+        try:
+            images.append((path.name, Image.open(path).convert("RGB")))
+        except Exception as e:
+            print(f"⚠️  No se pudo leer {path}: {e}")
+    return images
+
+
+def measure(encode, images, iterations):
+    """Tiempo medio de codificación (ms) y payloads de la última iteración"""
+    payloads = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        payloads = [encode(img) for _, img in images]
+    elapsed_ms = (time.perf_counter() - start) * 1000 / (iterations * len(images))
+    return elapsed_ms, payloads
+
+
+async def verdicts(validator, payloads):
+    from infrastructure.medical_image_validator import VALIDATION_PROMPT
+    results = []
+    for data, mime_type in payloads:
+        try:
+            response = await validator.vlm.ask_about_image(
+                prompt=VALIDATION_PROMPT, image_bytes=data, mime_type=mime_type
+            )
+            results.append(validator.parse_verdict(response))
+        except Exception as e:
+            print(f"⚠️  Error del VLM: {e}")
+            results.append(None)
+    return results
+
+
+async def run(args):
+    images = load_images(args.directory)
+    if not images:
+        print("❌ No se encontraron imágenes")
+        return 1
+    print(f"Imágenes: {len(images)}, iteraciones: {args.iterations}")
+
+    validator = None
+    if args.vlm:
+        from infrastructure.http_client import http_client
+        from infrastructure.medical_image_validator import MedicalImageValidator
+        await http_client.connect()
+        validator = MedicalImageValidator()
+
+    try:
+        # Redimensionado incluido: es parte del coste por subida
+        legacy_ms, legacy_payloads = measure(encode_legacy, images, args.iterations)
+        baseline = await verdicts(validator, legacy_payloads) if validator else None
+
+        header = f"{'Configuración':<24} | {'ms/imagen':>9} | {'KB medio':>8}"
+        if validator:
+            header += f" | {'concordancia':>12}"
+        print(header)
+        print("-" * len(header))
+
+        def report(label, elapsed_ms, payloads, agreement=None):
+            size_kb = sum(len(data) for data, _ in payloads) / len(payloads) / 1024
+            line = f"{label:<24} | {elapsed_ms:>9.2f} | {size_kb:>8.1f}"
+            if agreement is not None:
+                line += f" | {agreement:>11.1%}"
+            print(line)
+
+        report("png(optimize)@1024 *", legacy_ms, legacy_payloads, 1.0 if validator else None)
+        for encoder in SETTINGS:
+            elapsed_ms, payloads = measure(lambda img: encoder.encode(encoder.resize(img)), images, args.iterations)
+            agreement = None
+            if validator:
+                results = await verdicts(validator, payloads)
+                pairs = [(a, b) for a, b in zip(baseline, results) if a is not None and b is not None]
+                agreement = sum(a == b for a, b in pairs) / len(pairs) if pairs else 0.0
+            report(encoder.label, elapsed_ms, payloads, agreement)
+        print()
+        print("* configuración anterior (referencia). Ajustar con VLM_IMAGE_FORMAT, VLM_IMAGE_QUALITY y VLM_IMAGE_MAX_SIDE.")
+    finally:
+        if validator:
+            from adapters.gateways.vlm_gateway import VisionLanguageGateway
+            await http_client.close()
+            VisionLanguageGateway.shutdown()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de codificación de payloads para el VLM")
+    parser.add_argument("directory", help="Carpeta con imágenes de prueba")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--vlm", action="store_true", help="Medir concordancia del veredicto con el VLM configurado")
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Comprobación de índices de MongoDB del image-service.
+
+Uso:
+    MONGODB_URL=... DATABASE_NAME=... python scripts/check_indexes.py [--no-create]
+
+Crea los índices declarados por los repositorios (salvo --no-create), ejecuta
+explain() sobre sus consultas representativas y termina con código 1 si alguna
+sigue resolviéndose con COLLSCAN. Muestra también las consultas lentas con
+COLLSCAN registradas por el profiler (MONGO_PROFILE_SLOW_MS).
+"""
+
+import sys
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from infrastructure.database import database  # noqa: E402
+from infrastructure.indexes import ensure_indexes, explain_query_plans, slow_collscans  # noqa: E402
+
+
+async def main(create: bool) -> int:
+    await database.connect_db()
+    try:
+        if create:
+            for collection, names in (await ensure_indexes()).items():
+                print(f"{collection}: {', '.join(names)}")
+        plans = await explain_query_plans()
+        print()
+        for plan in plans:
+            mark = "❌ COLLSCAN" if plan["collscan"] else "✅"
+            print(f"{mark:12} {plan['name']:35} {' <- '.join(plan['stages'])}  {plan['indexes']}")
+        slow = await slow_collscans()
+        if slow:
+            print("\nConsultas lentas con COLLSCAN (system.profile):")
+            for op in slow:
+                print(f"  {op.get('ts')} {op.get('ns')} {op.get('millis')} ms, {op.get('docsExamined')} docs: {op.get('command')}")
+        return 1 if any(plan["collscan"] for plan in plans) else 0
+    finally:
+        await database.close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verificar con explain() que las consultas usan índices")
+    parser.add_argument("--no-create", action="store_true", help="No crear los índices, solo comprobar")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(create=not args.no_create)))
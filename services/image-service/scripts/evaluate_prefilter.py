@@ -0,0 +1,86 @@
+"""
+Evaluación offline del pre-filtro estadístico de CT.
+
+Uso:
+    python scripts/evaluate_prefilter.py --ct-dir <carpeta_ct> --other-dir <carpeta_no_ct> [--max-false-reject 0.01]
+
+Reporta, para distintos valores de PREFILTER_MAX_FAILED_CHECKS, la tasa de falsos
+rechazos sobre tomografías reales y cuántas llamadas al VLM se ahorran sobre
+imágenes que no son CT.
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from infrastructure.ct_prefilter import CTPreFilter, REJECT  # noqa: E402
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
+
+
+def load_images(directory):
+    """Cargar imágenes RGB reducidas a 1024 px como en el validador"""
+    images = []
+    for path in sorted(Path(directory).rglob("*")):
+        if path.suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+        try:
+            img = Image.open(path).convert("RGB")
+            img.thumbnail((1024, 1024))
+            images.append((path.name, img))
+        except Exception as e:
+            print(f"⚠️  No se pudo leer {path}: {e}")
+    return images
+
+
+def rejection_rate(prefilter, images):
+    if not images:
+        return 0.0, []
+    rejected = [name for name, img in images if prefilter.evaluate(img)[0] == REJECT]
+    return len(rejected) / len(images), rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluar el pre-filtro estadístico de CT")
+    parser.add_argument("--ct-dir", required=True, help="Carpeta con tomografías cerebrales reales")
+    parser.add_argument("--other-dir", required=True, help="Carpeta con imágenes que no son CT")
+    parser.add_argument("--max-false-reject", type=float, default=0.01, help="Tasa máxima de falsos rechazos aceptable")
+    args = parser.parse_args()
+
+    ct_images = load_images(args.ct_dir)
+    other_images = load_images(args.other_dir)
+    print(f"Tomografías: {len(ct_images)} | Otras imágenes: {len(other_images)}")
+    print()
+    print(f"{'max_failed_checks':>18} | {'falsos rechazos':>15} | {'VLM ahorradas':>13}")
+    print("-" * 54)
+
+    best = None
+    for max_failed in range(1, 7):
+        prefilter = CTPreFilter(thresholds={"max_failed_checks": max_failed})
+        false_reject, false_rejected = rejection_rate(prefilter, ct_images)
+        saved, _ = rejection_rate(prefilter, other_images)
+        print(f"{max_failed:>18} | {false_reject:>14.2%} | {saved:>12.2%}")
+        if false_reject <= args.max_false_reject and (best is None or saved > best[1]):
+            best = (max_failed, saved, false_reject, false_rejected)
+
+    print()
+    if best is None:
+        print(f"❌ Ninguna configuración cumple una tasa de falsos rechazos <= {args.max_false_reject:.2%}")
+        return 1
+
+    max_failed, saved, false_reject, false_rejected = best
+    total = len(ct_images) + len(other_images)
+    saved_calls = round(saved * len(other_images))
+    print(f"✅ PREFILTER_MAX_FAILED_CHECKS={max_failed}: falsos rechazos {false_reject:.2%}, "
+          f"llamadas VLM ahorradas {saved_calls}/{total} ({saved_calls / total:.2%} del total)")
+    if false_rejected:
+        print(f"   Tomografías rechazadas: {', '.join(false_rejected)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
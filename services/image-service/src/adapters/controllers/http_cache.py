@@ -0,0 +1,140 @@
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from infrastructure.storage import StorageService
+from infrastructure.storage_backends import LocalStorageBackend
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """El rango pedido queda fuera del objeto (416)"""
+
+
+def http_date(value: datetime) -> str:
+    """Fecha en formato HTTP (las fechas de Mongo son UTC sin zona)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def strong_etag(value: str) -> str:
+    return f'"{value}"'
+
+
+def _etag_values(header: str):
+    for tag in header.split(","):
+        tag = tag.strip()
+        yield tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluar If-None-Match (comparación débil) o, si no viene, If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return any(tag == "*" or tag == etag for tag in _etag_values(if_none_match))
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
+        # Las fechas HTTP tienen resolución de segundos
+        return modified.replace(microsecond=0) <= since
+    return False
+
+
+def parse_range(request: Request, size: int, etag: str) -> Optional[Tuple[int, int]]:
+    """(inicio, fin) inclusivos del Range pedido, o None para responder el objeto completo.
+
+    Solo se atiende un rango; varios rangos, una sintaxis no válida (incluido fin <
+    inicio) o un If-Range que no coincide con el ETag actual se responden con el
+    objeto completo (RFC 9110). Un inicio fuera del objeto lanza RangeNotSatisfiable.
+    """
+    header = request.headers.get("range")
+    if not header:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range.strip() != etag:
+        return None
+    match = RANGE_PATTERN.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Sufijo: los últimos N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        # last-pos < first-pos no es un rango válido: se ignora la cabecera (RFC 9110 14.1.1)
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+class StorageObjectResponse(Response):
+    """Contenido (o un rango) de un objeto del almacenamiento.
+
+    Para archivos locales usa la extensión ASGI http.response.zerocopysend (sendfile)
+    si el servidor la ofrece; si no, envía el objeto por bloques desde el backend,
+    sin cargarlo entero en memoria.
+    """
+
+    def __init__(self, storage: StorageService, file_path: str, size: int, byte_range: Optional[Tuple[int, int]],
+                 headers: Dict[str, str], media_type: str):
+        self.storage = storage
+        self.file_path = file_path
+        self.start, self.end = byte_range if byte_range is not None else (0, size - 1)
+        headers = {**headers, "accept-ranges": "bytes", "content-length": str(max(self.end - self.start + 1, 0))}
+        if byte_range is not None:
+            headers["content-range"] = f"bytes {self.start}-{self.end}/{size}"
+        super().__init__(
+            content=None,
+            status_code=206 if byte_range is not None else 200,
+            headers=headers,
+            media_type=media_type,
+        )
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD" or self.end < self.start:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        local = isinstance(self.storage.backend_for(self.file_path), LocalStorageBackend)
+        if local and "http.response.zerocopysend" in (scope.get("extensions") or {}):
+            with open(self.file_path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.end - self.start + 1,
+                    "more_body": False,
+                })
+            return
+
+        async for chunk in self.storage.stream(self.file_path, self.start, self.end):
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
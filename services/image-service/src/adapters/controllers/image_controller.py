@@ -1,25 +1,51 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Form
-from fastapi.responses import FileResponse, RedirectResponse
-from typing import List, Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Form, Request
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 import os
+import json
+import uuid
+import asyncio
 import logging
+from io import BytesIO
 
 from usecases.upload_image import UploadImageUseCase
 from usecases.get_images import GetImagesUseCase, GetImageByIdUseCase, GetImagesByStatusUseCase
 from usecases.delete_image import DeleteImageUseCase
 from usecases.validate_upload import ValidateUploadUseCase
+from usecases.bulk_upload import BulkUploadUseCase
+from usecases.upload_session import UploadSessionUseCase
+from usecases.export_images import ExportImagesUseCase, EXPORT_BATCH_SIZE
 from infrastructure.repositories.MongoImageRepository import MongoImageRepository
 from infrastructure.repositories.MongoChatRepository import MongoChatRepository
-from infrastructure.storage import StorageService
+from infrastructure.storage import StorageService, storage_service, UPLOAD_CHUNK_SIZE, PRESIGNED_URL_REFRESH_SECONDS, presigned_url_cache
 from infrastructure.medical_image_validator import MedicalImageValidator
+from infrastructure.validation_cache import validation_cache
+from infrastructure.derivatives import DerivativeService, DERIVATIVE_SPECS
+from infrastructure.storage_backends import IMMUTABLE_CACHE_CONTROL
+from infrastructure.read_cache import read_cache
+from infrastructure.indexes import explain_query_plans, slow_collscans
+from infrastructure.dicom import DicomPixels, is_dicom, read_header
+from adapters.controllers.json_response import FastJSONResponse, ndjson_line
+from adapters.controllers.http_cache import (
+    RangeNotSatisfiable, StorageObjectResponse, content_disposition, http_date, is_not_modified, parse_range, strong_etag
+)
 from adapters.dtos.image_dto import (
     ImageResponse, ImageUploadResponse, ImageListResponse, ImageDeleteResponse, 
-    ErrorResponse, ProcessingStatusResponse, TumorPredictionResult
+    ErrorResponse, ProcessingStatusResponse
 )
 from adapters.dtos.chat_dto import ChatRequest, ChatResponse, ChatHistoryResponse, ChatMessageDTO
 from adapters.dtos.validation_dto import ValidationJobResponse, ValidationJobStatusResponse
+from adapters.dtos.upload_session_dto import (
+    UploadSessionRequest, UploadSessionResponse, UploadSessionCompleteRequest, UploadSessionCompleteResponse
+)
 from usecases.chat_about_image import ChatAboutImageUseCase
 from adapters.gateways.vlm_gateway import VisionLanguageGateway
+from tasks.kafka_producer import get_kafka_producer_metrics
+from tasks.validation_tasks import enqueue_validation_job, get_job_status
+from tasks.tumor_analysis_tasks import get_analysis_stats
+from infrastructure.status_hub import status_hub, TERMINAL_STATUSES
+from usecases.processing_status import build_processing_status, status_event
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -36,12 +62,117 @@ async def health_check():
         "database": "connected"
     }
 
+@router.get("/validation-cache/stats")
+async def validation_cache_stats():
+    """Estadísticas de la caché de veredictos de validación médica"""
+    return validation_cache.get_stats()
+
+@router.get("/storage/stats")
+async def storage_stats():
+    """Métricas de deduplicación del almacenamiento, de la caché de lectura y de la de URLs prefirmadas"""
+    return {
+        **StorageService.get_dedup_stats(),
+        "read_cache": read_cache.get_stats(),
+        "presigned_urls": presigned_url_cache.get_stats(),
+    }
+
+@router.get("/indexes/stats")
+async def indexes_stats():
+    """Plan de las consultas de los repositorios (explain) y consultas lentas que aún hacen COLLSCAN"""
+    return {"query_plans": await explain_query_plans(), "slow_collscans": await slow_collscans()}
+
+@router.get("/events/stats")
+async def events_stats():
+    """Métricas del productor Kafka (latencia de publicación y mensajes sin confirmar)"""
+    return get_kafka_producer_metrics()
+
+@router.get("/tumor-analysis/stats")
+async def tumor_analysis_stats():
+    """Métricas de los workers de tumor_analysis (lotes, imágenes, tiempos de carga, inferencia y escritura)"""
+    return await get_analysis_stats()
+
+# Intervalo de heartbeat de las conexiones SSE (mantiene vivos proxies y balanceadores)
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+@router.get("/status-stream/stats")
+async def status_stream_stats():
+    """Métricas del hub de estados (suscriptores y eventos entregados)"""
+    return status_hub.get_stats()
+
+@router.get("/chat-stream/stats")
+async def chat_stream_stats():
+    """Métricas del chat en streaming (tiempo hasta el primer token, duración, cancelaciones)"""
+    return VisionLanguageGateway.stream_metrics.get_stats()
+
+@router.get("/status-stream")
+async def user_status_stream(request: Request, user_id: str = Query(..., description="Usuario cuyas imágenes se siguen")):
+    """Canal SSE con los cambios de estado de todas las imágenes de un usuario"""
+    key = f"user:{user_id}"
+    queue = status_hub.subscribe(key)
+    return StreamingResponse(
+        _sse_status_events(request, key, queue, [], stop_on_terminal=False),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+async def _sse_status_events(request: Request, key: str, queue: asyncio.Queue, initial: List[Dict[str, Any]],
+                             stop_on_terminal: bool,
+                             refresh: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None) -> AsyncIterator[str]:
+    """Emitir eventos de estado en formato SSE hasta un estado final o la desconexión.
+
+    Sin change streams el hub solo ve las transiciones publicadas por este proceso;
+    con `refresh` se relee el estado en cada heartbeat y se emite si ha cambiado.
+    """
+    last_status = None
+    try:
+        for event in initial:
+            yield f"event: status\ndata: {json.dumps(event)}\n\n"
+            last_status = event.get("status")
+            if stop_on_terminal and last_status in TERMINAL_STATUSES:
+                return
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                event = await _refresh_status(refresh)
+                if event is None or event.get("status") == last_status:
+                    yield ": ping\n\n"
+                    continue
+            yield f"event: status\ndata: {json.dumps(event)}\n\n"
+            last_status = event.get("status")
+            if stop_on_terminal and last_status in TERMINAL_STATUSES:
+                return
+    finally:
+        status_hub.unsubscribe(key, queue)
+
+async def _refresh_status(refresh: Optional[Callable[[], Awaitable[Dict[str, Any]]]]) -> Optional[Dict[str, Any]]:
+    """Releer el estado desde Mongo; si falla, ese heartbeat se queda en un ping"""
+    if refresh is None:
+        return None
+    try:
+        return await refresh()
+    except Exception as e:
+        logger.warning(f"[SSE] No se pudo releer el estado: {e}")
+        return None
+
+async def _iter_upload_file(file: UploadFile, chunk_size: int = UPLOAD_CHUNK_SIZE):
+    """Leer el UploadFile por bloques en lugar de cargarlo entero en memoria"""
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
 # Inyección de dependencias
 def get_image_repository():
     return MongoImageRepository()
 
 def get_storage_service():
-    return StorageService()
+    # Instancia compartida: un solo cliente de almacenamiento por proceso
+    return storage_service
 
 def get_medical_validator():
     return MedicalImageValidator()
@@ -61,6 +192,9 @@ def get_get_image_by_id_use_case(repo: MongoImageRepository = Depends(get_image_
 def get_get_images_by_status_use_case(repo: MongoImageRepository = Depends(get_image_repository)):
     return GetImagesByStatusUseCase(repo)
 
+def get_export_images_use_case(repo: MongoImageRepository = Depends(get_image_repository)):
+    return ExportImagesUseCase(repo)
+
 def get_delete_image_use_case(repo: MongoImageRepository = Depends(get_image_repository)):
     return DeleteImageUseCase(repo)
 
@@ -120,12 +254,9 @@ async def validate_upload(
     try:
         logger.info(f"Iniciando validación de upload para archivo: {file.filename}")
         
-        # Leer contenido del archivo
-        file_content = await file.read()
-        
-        # Ejecutar validación síncrona y guardar imagen
-        result = await validate_upload_use_case.execute(
-            file_content=file_content,
+        # Ejecutar validación síncrona y guardar imagen (lectura por bloques)
+        result = await validate_upload_use_case.execute_stream(
+            chunks=_iter_upload_file(file),
             original_filename=file.filename,
             user_id=user_id,
             custom_filename=custom_filename
@@ -170,6 +301,61 @@ async def validate_upload(
         logger.error(f"Error en validate_upload: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Error en validación: {str(e)}")
 
+@router.post("/validate-upload/async", response_model=ValidationJobResponse, status_code=202)
+async def validate_upload_async(
+    file: UploadFile = File(...),
+    user_id: str = Form(...),
+    custom_filename: Optional[str] = Form(None),
+    storage: StorageService = Depends(get_storage_service)
+):
+    """Encolar la validación y el guardado para el worker de validate_upload (Kafka)."""
+    if not storage.is_valid_image_type(file.filename):
+        raise HTTPException(status_code=400, detail="Tipo de archivo no válido")
+    try:
+        staged = await storage.stage_stream(_iter_upload_file(file), file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if staged.size == 0:
+        storage.discard_staged_path(staged.path)
+        raise HTTPException(status_code=400, detail="El archivo está vacío")
+
+    job_id = uuid.uuid4().hex
+    try:
+        # El worker puede estar en otro pod: el mensaje lleva la ruta en el almacén compartido
+        staging_path = await storage.share_staged(staged, job_id)
+    except Exception as e:
+        logger.error(f"Error publicando el temporal del job {job_id}: {e}")
+        raise HTTPException(status_code=503, detail="Almacenamiento no disponible")
+    message = {
+        "job_id": job_id,
+        "staging_path": staging_path,
+        "original_filename": file.filename,
+        "user_id": user_id,
+        "custom_filename": custom_filename,
+    }
+    try:
+        # Solo se responde 202 cuando el broker ha confirmado el mensaje
+        await enqueue_validation_job(job_id, message)
+    except Exception:
+        await storage.discard_shared_staged(staging_path)
+        raise HTTPException(status_code=503, detail="Cola de validación no disponible")
+
+    return ValidationJobResponse(job_id=job_id, status="queued", message="Imagen en cola de validación")
+
+@router.get("/validation-jobs/{job_id}", response_model=ValidationJobStatusResponse)
+async def get_validation_job(job_id: str):
+    """Estado de un job de validación asíncrona"""
+    job = await get_job_status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    return ValidationJobStatusResponse(
+        job_id=job_id,
+        status=job["status"],
+        message=job.get("message", ""),
+        image_id=job.get("image_id"),
+        error=job.get("error"),
+    )
+
 # Ruta de compatibilidad antigua eliminada: el flujo ahora es síncrono
 
 @router.post("/upload", response_model=ImageUploadResponse)
@@ -179,10 +365,9 @@ async def upload_image(
     custom_filename: Optional[str] = Form(None)
 ):
     try:
-        file_content = await file.read()
         upload_use_case = UploadImageUseCase(get_image_repository(), get_storage_service())
-        result = await upload_use_case.execute(
-            file_content=file_content,
+        result = await upload_use_case.execute_stream(
+            chunks=_iter_upload_file(file),
             original_filename=file.filename,
             user_id=user_id,
             custom_filename=custom_filename
@@ -212,6 +397,97 @@ async def upload_image(
         logger.error(f"[UPLOAD] Error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/bulk-upload")
+async def bulk_upload(
+    files: List[UploadFile] = File(..., description="Imágenes sueltas y/o archivos ZIP/TAR"),
+    user_id: str = Form(...),
+    validate_images: bool = Form(False, description="Validar cada imagen antes de guardarla"),
+):
+    """Subida masiva: devuelve NDJSON con una línea por archivo y un resumen final"""
+    if not files:
+        raise HTTPException(status_code=400, detail="No se recibieron archivos")
+    use_case = BulkUploadUseCase(get_storage_service(), get_image_repository())
+
+    async def ndjson_lines() -> AsyncIterator[str]:
+        try:
+            async for line in use_case.execute([(f.filename, f.file) for f in files], user_id, validate=validate_images):
+                yield json.dumps(line, default=str) + "\n"
+        finally:
+            for f in files:
+                await f.close()
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+# Código de error de las sesiones de subida -> estado HTTP
+UPLOAD_SESSION_ERRORS = {
+    "not_found": 404,
+    "not_supported": 400,
+    "in_progress": 409,
+    "upload_missing": 409,
+    "expired": 410,
+    "size_mismatch": 422,
+    "hash_mismatch": 422,
+}
+
+@router.post("/upload-sessions", response_model=UploadSessionResponse, status_code=201)
+async def create_upload_session(body: UploadSessionRequest, request: Request):
+    """Abrir una subida directa al almacenamiento (los bytes no pasan por el servicio)"""
+    use_case = UploadSessionUseCase(get_storage_service(), get_image_repository())
+    try:
+        result = await use_case.create(body.filename, body.size, body.sha256, body.user_id, body.custom_filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    session = result["session"]
+    upload = result["upload"]
+    if upload is None:
+        # Almacenamiento local (desarrollo): el destino es el endpoint de contenido de la sesión
+        url = request.url_for("upload_session_content", session_id=session["_id"]).include_query_params(token=session["token"])
+        upload = {"method": "PUT", "url": str(url), "fields": {}, "headers": {"Content-Type": session["content_type"]}}
+    return UploadSessionResponse(session_id=session["_id"], expires_at=session["expires_at"], **upload)
+
+@router.put("/upload-sessions/{session_id}/content", name="upload_session_content")
+async def upload_session_content(session_id: str, request: Request, token: str = Query(...)):
+    """Destino de subida de una sesión cuando el almacenamiento es local (desarrollo)"""
+    use_case = UploadSessionUseCase(get_storage_service(), get_image_repository())
+    try:
+        result = await use_case.receive_local(session_id, token, request.stream())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result.get("error_code"):
+        raise HTTPException(status_code=UPLOAD_SESSION_ERRORS.get(result["error_code"], 400), detail=result["message"])
+    return result
+
+@router.post("/upload-sessions/{session_id}/complete", response_model=UploadSessionCompleteResponse)
+async def complete_upload_session(session_id: str, body: UploadSessionCompleteRequest):
+    """Verificar tamaño y hash de la subida, registrar la imagen y encolar su validación"""
+    use_case = UploadSessionUseCase(get_storage_service(), get_image_repository())
+    try:
+        result = await use_case.complete(session_id, body.user_id)
+    except Exception as e:
+        logger.error(f"[UPLOAD_SESSION] Error completando la sesión {session_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="No se pudo completar la subida")
+    if result.get("error_code"):
+        raise HTTPException(status_code=UPLOAD_SESSION_ERRORS.get(result["error_code"], 400), detail=result["message"])
+    image = result["image"]
+    return UploadSessionCompleteResponse(
+        session_id=session_id,
+        message=result["message"],
+        image=ImageResponse(
+            id=str(image.id),
+            filename=image.filename,
+            original_filename=image.original_filename,
+            file_size=image.file_size,
+            mime_type=image.mime_type,
+            width=image.width,
+            height=image.height,
+            user_id=image.user_id,
+            upload_date=image.upload_date,
+            processing_status=image.processing_status,
+            metadata=image.metadata,
+        ),
+        job_id=result.get("job_id"),
+    )
+
 @router.get("/{image_id}/chat", response_model=ChatHistoryResponse)
 async def get_chat_history(
     image_id: str,
@@ -272,113 +548,199 @@ async def chat_about_image(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en chat: {str(e)}")
 
+@router.post("/{image_id}/chat/stream")
+async def chat_about_image_stream(
+    image_id: str,
+    body: ChatRequest,
+    request: Request,
+    user_id: str = Query(..., description="ID del usuario"),
+    chat_use_case: ChatAboutImageUseCase = Depends(get_chat_use_case),
+):
+    """Chat sobre una imagen con la respuesta en streaming (SSE).
+
+    Eventos: `token` ({"text"}) por cada fragmento, `done` con el mensaje guardado y
+    `error` si el VLM falla a mitad de respuesta. Si el cliente se desconecta se
+    cancela la generación en el proveedor y no se guarda la respuesta.
+    """
+    try:
+        chunks = await chat_use_case.ask_stream(image_id=image_id, user_id=user_id, prompt=body.message)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en chat: {str(e)}")
+    return StreamingResponse(_sse_chat_events(request, chunks), media_type="text/event-stream", headers=SSE_HEADERS)
+
+async def _sse_chat_events(request: Request, chunks: AsyncIterator[Any]) -> AsyncIterator[str]:
+    """Reenviar los fragmentos del VLM como eventos SSE, con heartbeat mientras no llega ninguno"""
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(chunks.__anext__())
+            # Sin cancelar la lectura en curso: el modelo puede tardar en dar el primer token
+            done, _ = await asyncio.wait({pending}, timeout=SSE_HEARTBEAT_SECONDS)
+            if not done:
+                if await request.is_disconnected():
+                    return
+                yield ": ping\n\n"
+                continue
+            try:
+                item = pending.result()
+            except StopAsyncIteration:
+                return
+            finally:
+                pending = None
+            if isinstance(item, str):
+                yield f"event: token\ndata: {json.dumps({'text': item})}\n\n"
+            else:
+                message = ChatMessageDTO(
+                    id=item.id,
+                    image_id=item.image_id,
+                    user_id=item.user_id,
+                    role=item.role,
+                    content=item.content,
+                    timestamp=item.timestamp,
+                )
+                yield f"event: done\ndata: {message.model_dump_json()}\n\n"
+    except Exception as e:
+        logger.error(f"[CHAT] Error en el chat en streaming: {e}")
+        yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+    finally:
+        # Desconexión o fin: cancelar la lectura en curso y cerrar el stream (cierra la conexión con el VLM)
+        if pending is not None and not pending.done():
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        await chunks.aclose()
+
 @router.get("/{image_id}/processing-status", response_model=ProcessingStatusResponse)
 async def get_processing_status(
     image_id: str,
     get_image_use_case: GetImageByIdUseCase = Depends(get_get_image_by_id_use_case)
 ):
-    """Obtener el estado del procesamiento de una imagen"""
+    """Obtener el estado del procesamiento de una imagen (consulta puntual; ver también /processing-status/stream)"""
     try:
         image = await get_image_use_case.execute(image_id)
-        
-        # Extraer información del procesamiento
-        processing_started = None
-        processing_completed = None
-        prediction = None
-
-        if image.metadata:
-            if 'processing_started' in image.metadata:
-                processing_started = image.metadata['processing_started']
-            if 'processing_completed' in image.metadata:
-                processing_completed = image.metadata['processing_completed']
-            if 'prediction' in image.metadata:
-                pred_data = image.metadata['prediction']
-                # Normalizar datos de predicción del colab-service
-                pred_label = str(pred_data.get('prediction', ''))
-                # Determinar si es tumor basado en el label
-                import re
-                es_tumor = bool(re.search(r'tumor|sí|si|true|1', pred_label, re.IGNORECASE)) if isinstance(pred_label, str) else bool(pred_label)
-                prediction = TumorPredictionResult(
-                    es_tumor=es_tumor,
-                    clase_predicha=pred_label,
-                    confianza=float(pred_data.get('mean_score', 0)),
-                    probabilidades={},  # El colab-service no devuelve probabilidades detalladas
-                    recomendacion=''  # El colab-service no incluye recomendación
-                )
-        
-        # Generar mensaje según el estado
-        if image.processing_status == "pending":
-            message = "La imagen está en cola para procesamiento"
-        elif image.processing_status == "processing":
-            message = "La imagen se está procesando actualmente"
-        elif image.processing_status == "completed":
-            message = "El análisis se ha completado exitosamente"
-        elif image.processing_status == "failed":
-            error_msg = image.metadata.get('processing_error', 'Error desconocido') if image.metadata else 'Error desconocido'
-            message = f"El procesamiento falló: {error_msg}"
-        else:
-            message = f"Estado desconocido: {image.processing_status}"
-        
-        return ProcessingStatusResponse(
-            image_id=str(image.id),
-            status=image.processing_status,
-            message=message,
-            prediction=prediction,
-            processing_started=processing_started,
-            processing_completed=processing_completed
-        )
+        return build_processing_status(image)
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
+@router.get("/{image_id}/processing-status/stream")
+async def stream_processing_status(
+    image_id: str,
+    request: Request,
+    get_image_use_case: GetImageByIdUseCase = Depends(get_get_image_by_id_use_case)
+):
+    """Canal SSE con los cambios de estado de una imagen.
+
+    Envía el estado actual y después cada transición; se cierra al llegar a
+    'completed' o 'failed'. Las transiciones de otros procesos (workers, réplicas)
+    llegan por change streams o, si están desactivados, al releer Mongo en cada
+    heartbeat. GET /{image_id}/processing-status sigue disponible como polling.
+    """
+    key = f"image:{image_id}"
+    # Suscribirse antes de leer el estado actual para no perder transiciones intermedias
+    queue = status_hub.subscribe(key)
+    try:
+        image = await get_image_use_case.execute(image_id)
+    except ValueError as e:
+        status_hub.unsubscribe(key, queue)
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception:
+        status_hub.unsubscribe(key, queue)
+        raise
+    return StreamingResponse(
+        _sse_status_events(request, key, queue, [status_event(image)], stop_on_terminal=True,
+                           refresh=lambda: _current_status_event(get_image_use_case, image_id)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+async def _current_status_event(get_image_use_case: GetImageByIdUseCase, image_id: str) -> Dict[str, Any]:
+    """Estado actual de la imagen leído de Mongo (respaldo del hub en cada heartbeat)"""
+    return status_event(await get_image_use_case.execute(image_id))
+
+@router.get("/export")
+async def export_images(
+    status: Optional[str] = Query(None, description="Filtrar por estado de procesamiento"),
+    user_id: Optional[str] = Query(None, description="Filtrar por ID de usuario"),
+    date_from: Optional[datetime] = Query(None, description="upload_date desde (incluida)"),
+    date_to: Optional[datetime] = Query(None, description="upload_date hasta (excluida)"),
+    resume_token: Optional[str] = Query(None, description="resume_token del último checkpoint recibido"),
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=5000, description="Imágenes por lote"),
+    export_images_use_case: ExportImagesUseCase = Depends(get_export_images_use_case),
+):
+    """Exportar imágenes en NDJSON (más recientes primero), sin límite de tamaño.
+
+    Una línea por imagen; tras cada lote, una línea {"checkpoint": {...}} con el
+    resume_token para continuar desde ahí, y al final {"summary": {...}}. Cada lote
+    se pide a Mongo cuando el anterior se ha enviado, así la memoria no depende
+    del tamaño del resultado y un cliente lento frena la exportación.
+    """
+    try:
+        batches = export_images_use_case.execute(
+            status=status, user_id=user_id, date_from=date_from, date_to=date_to,
+            resume_token=resume_token, batch_size=batch_size,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def ndjson_batches() -> AsyncIterator[bytes]:
+        exported = 0
+        resume = resume_token
+        try:
+            async for batch in batches:
+                exported += len(batch["images"])
+                resume = batch["resume_token"]
+                # Un bloque por lote: el envío espera a que el cliente lo consuma antes de pedir el siguiente
+                yield b"".join(ndjson_line(image) for image in batch["images"]) + ndjson_line(
+                    {"checkpoint": {"resume_token": resume, "exported": exported}}
+                )
+            yield ndjson_line({"summary": {"exported": exported, "complete": True}})
+            logger.info(f"[EXPORT] Exportación completa: {exported} imágenes")
+        except asyncio.CancelledError:
+            logger.info(f"[EXPORT] Exportación interrumpida tras {exported} imágenes (resume_token={resume})")
+            raise
+        except Exception as e:
+            # Con la respuesta ya empezada no se puede cambiar el estado HTTP: se informa en la última línea
+            logger.error(f"[EXPORT] Error exportando imágenes: {e}")
+            yield ndjson_line({"summary": {"exported": exported, "complete": False, "resume_token": resume,
+                                           "error": str(e)}})
+
+    return StreamingResponse(ndjson_batches(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-store"})
+
 @router.get("/", response_model=ImageListResponse)
 async def get_images(
     user_id: Optional[str] = Query(None, description="Filtrar por ID de usuario"),
-    skip: int = Query(0, ge=0, description="Número de registros a saltar"),
+    skip: int = Query(0, ge=0, description="Número de registros a saltar (obsoleto: usar cursor)"),
     limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    include_total: bool = Query(False, description="Contar el total de imágenes (consulta adicional)"),
     get_images_use_case: GetImagesUseCase = Depends(get_get_images_use_case)
 ):
-    """Obtener lista de imágenes"""
+    """Obtener lista de imágenes (más recientes primero, paginada por cursor)"""
     try:
-        logger.info(f"Obteniendo imágenes para user_id: {user_id}, skip: {skip}, limit: {limit}")
+        logger.info(f"Obteniendo imágenes para user_id: {user_id}, skip: {skip}, limit: {limit}, cursor: {cursor is not None}")
         
-        # Ejecutar de forma asíncrona
-        images = await get_images_use_case.execute(user_id=user_id, skip=skip, limit=limit)
-        logger.info(f"Imágenes obtenidas: {len(images)}")
-        
-        # Convertir a DTOs de respuesta de forma eficiente
-        image_responses = []
-        for i, image in enumerate(images):
-            try:
-                image_response = ImageResponse(
-                    id=str(image.id),
-                    filename=image.filename,
-                    original_filename=image.original_filename,
-                    file_size=image.file_size,
-                    mime_type=image.mime_type,
-                    width=image.width,
-                    height=image.height,
-                    user_id=image.user_id,
-                    upload_date=image.upload_date,
-                    processing_status=image.processing_status,
-                    metadata=image.metadata
-                )
-                image_responses.append(image_response)
-            except Exception as img_error:
-                logger.error(f"Error convirtiendo imagen {i+1}: {str(img_error)}")
-                # Continuar con las siguientes imágenes en lugar de fallar completamente
-                continue
-        
-        logger.info(f"Total de imágenes convertidas: {len(image_responses)}")
-        return ImageListResponse(
-            images=image_responses,
-            total=len(image_responses),
-            skip=skip,
-            limit=limit
+        page = await get_images_use_case.execute(
+            user_id=user_id, skip=skip, limit=limit, cursor=cursor, include_total=include_total
         )
+        logger.info(f"Imágenes obtenidas: {len(page['images'])}")
+        
+        # Documentos proyectados del repositorio: se serializan directamente, sin DTO por imagen
+        return FastJSONResponse({
+            "images": page["images"],
+            "total": page["total"],
+            "skip": 0 if cursor else skip,
+            "limit": limit,
+            "next_cursor": page["next_cursor"],
+        })
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error en get_images: {str(e)}")
         logger.error(f"Tipo de error: {type(e)}")
@@ -417,36 +779,19 @@ async def get_image(
 @router.get("/status/{status}", response_model=ImageListResponse)
 async def get_images_by_status(
     status: str,
+    limit: int = Query(1000, ge=1, le=1000, description="Número máximo de imágenes (las más recientes)"),
     get_images_by_status_use_case: GetImagesByStatusUseCase = Depends(get_get_images_by_status_use_case)
 ):
-    """Obtener imágenes por estado de procesamiento"""
+    """Obtener imágenes por estado de procesamiento (para resultados grandes, /images/export)"""
     try:
-        images = await get_images_by_status_use_case.execute(status)
-        
-        # Convertir a DTOs de respuesta
-        image_responses = []
-        for image in images:
-            image_response = ImageResponse(
-                id=str(image.id),
-                filename=image.filename,
-                original_filename=image.original_filename,
-                file_size=image.file_size,
-                mime_type=image.mime_type,
-                width=image.width,
-                height=image.height,
-                user_id=image.user_id,
-                upload_date=image.upload_date,
-                processing_status=image.processing_status,
-                metadata=image.metadata
-            )
-            image_responses.append(image_response)
-        
-        return ImageListResponse(
-            images=image_responses,
-            total=len(image_responses),
-            skip=0,
-            limit=len(image_responses)
-        )
+        images = await get_images_by_status_use_case.execute(status, limit)
+        return FastJSONResponse({
+            "images": images,
+            "total": len(images),
+            "skip": 0,
+            "limit": len(images),
+            "next_cursor": None,
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
@@ -473,27 +818,135 @@ async def delete_image(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
-@router.get("/download/{image_id}")
+@router.api_route("/download/{image_id}", methods=["GET", "HEAD"])
 async def download_image(
     image_id: str,
+    request: Request,
     get_image_use_case: GetImageByIdUseCase = Depends(get_get_image_by_id_use_case)
 ):
-    """Descargar una imagen"""
+    """Descargar una imagen (admite Range, If-None-Match e If-Modified-Since)"""
     try:
         image = await get_image_use_case.execute(image_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    # El original es inmutable: el hash de contenido sirve de ETag fuerte
+    content_hash = (image.metadata or {}).get("content_hash")
+    etag = strong_etag(content_hash or f"{image.id}-{image.file_size}")
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(image.upload_date),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+    }
+    # Revalidación resuelta solo con los metadatos, sin tocar el almacenamiento
+    if is_not_modified(request, etag, image.upload_date):
+        return Response(status_code=304, headers=headers)
+
+    try:
         storage = get_storage_service()
-        # Si usamos S3, generar presigned URL y redirigir
-        if hasattr(storage, "generate_presigned_url"):
-            presigned = storage.generate_presigned_url(image.file_path)
-            if presigned:
-                return RedirectResponse(url=presigned, status_code=302)
-        # Local fallback
-        if not os.path.exists(image.file_path):
+        # Si usamos S3, redirigir a la URL prefirmada (reutilizada mientras siga vigente)
+        presigned = storage.presigned_download(image.file_path)
+        if presigned:
+            url, remaining = presigned
+            return RedirectResponse(
+                url=url,
+                status_code=302,
+                headers={"Cache-Control": f"private, max-age={max(remaining - PRESIGNED_URL_REFRESH_SECONDS, 0)}"}
+            )
+
+        stat = await storage.stat(image.file_path)
+        if stat is None:
             logger.error(f"Archivo no encontrado: {image.file_path}")
             raise HTTPException(status_code=404, detail=f"Archivo no encontrado en el servidor: {image.file_path}")
-        return FileResponse(path=image.file_path, filename=image.original_filename, media_type=image.mime_type)
-        
+        size = stat["size"]
+        try:
+            byte_range = parse_range(request, size, etag)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+        headers["Content-Disposition"] = content_disposition(image.original_filename)
+        return StorageObjectResponse(storage, image.file_path, size, byte_range, headers, image.mime_type)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+@router.get("/{image_id}/derivative/{kind}")
+async def get_image_derivative(
+    image_id: str,
+    kind: str,
+    request: Request,
+    get_image_use_case: GetImageByIdUseCase = Depends(get_get_image_by_id_use_case)
+):
+    """Obtener un derivado de la imagen (miniaturas, entrada del modelo o del VLM)"""
+    if kind not in DERIVATIVE_SPECS:
+        raise HTTPException(status_code=400, detail=f"Tipo de derivado no soportado. Disponibles: {', '.join(DERIVATIVE_SPECS)}")
+    try:
+        image = await get_image_use_case.execute(image_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    content_hash = (image.metadata or {}).get("content_hash", image_id)
+    etag = strong_etag(f"{content_hash}-{kind}")
+    # El derivado no cambia mientras no cambie el original: revalidar sin generarlo ni leerlo
+    if is_not_modified(request, etag, None):
+        return Response(status_code=304, headers={"ETag": etag})
+    try:
+        data, mime_type = await DerivativeService(get_storage_service()).get_derivative(image.file_path, kind)
+        return Response(
+            content=data,
+            media_type=mime_type,
+            headers={"ETag": etag}
+        )
     except Exception as e:
+        logger.error(f"Error generando derivado {kind} para {image_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+async def _get_dicom_source(image_id: str, get_image_use_case: GetImageByIdUseCase):
+    """Ruta local (memmap) o bytes del DICOM de una imagen"""
+    try:
+        image = await get_image_use_case.execute(image_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if not is_dicom(filename=image.file_path, mime_type=image.mime_type):
+        raise HTTPException(status_code=400, detail="La imagen no es un DICOM")
+    storage = get_storage_service()
+    if storage.storage_type == "local":
+        return image.file_path
+    return await storage.read(image.file_path)
+
+@router.get("/{image_id}/dicom/header")
+async def get_dicom_header(
+    image_id: str,
+    get_image_use_case: GetImageByIdUseCase = Depends(get_get_image_by_id_use_case)
+):
+    """Cabecera DICOM (sin cargar los píxeles)"""
+    source = await _get_dicom_source(image_id, get_image_use_case)
+    try:
+        return await asyncio.to_thread(read_header, source)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error leyendo cabecera DICOM: {str(e)}")
+
+@router.get("/{image_id}/dicom/frames/{frame}")
+async def get_dicom_frame(
+    image_id: str,
+    frame: int,
+    center: Optional[float] = Query(None, description="Centro de ventana (HU)"),
+    width: Optional[float] = Query(None, gt=0, description="Ancho de ventana (HU)"),
+    get_image_use_case: GetImageByIdUseCase = Depends(get_get_image_by_id_use_case)
+):
+    """Renderizar un frame del DICOM a PNG con ventana/nivel (solo se lee ese frame)"""
+    source = await _get_dicom_source(image_id, get_image_use_case)
+
+    def render() -> bytes:
+        img = DicomPixels(source).render_image(frame, center, width)
+        out = BytesIO()
+        img.save(out, format="PNG", compress_level=1)
+        return out.getvalue()
+
+    try:
+        data = await asyncio.to_thread(render)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error renderizando DICOM: {str(e)}")
+    return Response(content=data, media_type="image/png")
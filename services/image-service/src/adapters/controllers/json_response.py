@@ -0,0 +1,32 @@
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+
+def _json_default(value: Any) -> Any:
+    """Tipos de Mongo que orjson no serializa por sí mismo (datetime lo serializa de forma nativa)"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Tipo no serializable a JSON: {type(value).__name__}")
+
+
+def ndjson_line(value: Any) -> bytes:
+    """Una línea NDJSON serializada con orjson"""
+    return orjson.dumps(value, default=_json_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+
+
+class FastJSONResponse(JSONResponse):
+    """Respuesta JSON serializada con orjson directamente desde documentos de Mongo.
+
+    Para lecturas de confianza (documentos proyectados del propio repositorio): se
+    devuelve tal cual desde el endpoint, así FastAPI no vuelve a validar el
+    response_model ni pasa por jsonable_encoder. ObjectId y datetime se convierten
+    en la misma pasada de serialización.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
@@ -27,9 +27,10 @@ class ImageUploadResponse(BaseModel):
 
 class ImageListResponse(BaseModel):
     images: List[ImageResponse]
-    total: int
+    total: Optional[int] = Field(None, description="Total de imágenes (solo si se pide con include_total)")
     skip: int
     limit: int
+    next_cursor: Optional[str] = Field(None, description="Cursor de la página siguiente (None si no hay más)")
 
 class ImageDeleteResponse(BaseModel):
     message: str
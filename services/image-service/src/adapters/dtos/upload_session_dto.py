@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict
+from datetime import datetime
+
+from adapters.dtos.image_dto import ImageResponse
+
+class UploadSessionRequest(BaseModel):
+    filename: str
+    size: int = Field(..., description="Tamaño exacto del archivo en bytes")
+    sha256: str = Field(..., description="SHA-256 del contenido en hexadecimal")
+    user_id: str
+    custom_filename: Optional[str] = None
+
+class UploadSessionResponse(BaseModel):
+    session_id: str
+    method: str = Field(..., description="Método HTTP de la subida (POST formulario o PUT)")
+    url: str
+    fields: Dict[str, str] = Field(default_factory=dict, description="Campos del formulario (POST) antes del archivo")
+    headers: Dict[str, str] = Field(default_factory=dict, description="Cabeceras obligatorias de la subida")
+    expires_at: datetime
+
+class UploadSessionCompleteRequest(BaseModel):
+    user_id: str
+
+class UploadSessionCompleteResponse(BaseModel):
+    session_id: str
+    message: str
+    image: ImageResponse
+    job_id: Optional[str] = Field(None, description="Job de validación (None si no se pudo encolar; reintentar complete)")
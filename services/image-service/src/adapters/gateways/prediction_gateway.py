@@ -0,0 +1,64 @@
+import os
+import logging
+from typing import Any, Dict, List, Tuple, Union
+
+import httpx
+
+from infrastructure.http_client import http_client
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionError(Exception):
+    """Error devuelto por el servicio de predicción (colab-service)"""
+    def __init__(self, error_code: str, detail: str):
+        super().__init__(detail)
+        self.error_code = error_code
+        self.detail = detail
+
+
+class PredictionGateway:
+    def __init__(self):
+        self.predict_url = os.getenv("COLAB_PREDICT_URL", "http://colab-service:8004/predict")
+        self.timeout = float(os.getenv("PREDICTION_TIMEOUT", "300"))
+        self.predict_batch_url = os.getenv("PREDICTION_BATCH_URL", f"{self.predict_url.rstrip('/')}/batch")
+
+    async def predict(self, image_bytes: bytes, filename: str, mime_type: str) -> Dict[str, Any]:
+        """Enviar la imagen al colab-service y devolver la predicción"""
+        files = {"image": (filename, image_bytes, mime_type)}
+        try:
+            resp = await http_client.get_client().post(self.predict_url, files=files, timeout=self.timeout)
+        except httpx.TimeoutException:
+            raise PredictionError("prediction_exception", f"Timeout en predicción después de {self.timeout} segundos")
+        except httpx.RequestError as e:
+            raise PredictionError("prediction_exception", f"Error de red en predicción: {str(e)}")
+        if resp.status_code != 200:
+            logger.error(f"Error en respuesta de predicción: {resp.status_code} - {resp.text[:500]}")
+            raise PredictionError("prediction_error", resp.text)
+        return resp.json()
+
+    async def predict_batch(self, images: List[Tuple[bytes, str, str]]) -> List[Union[Dict[str, Any], PredictionError]]:
+        """Enviar un lote de imágenes (bytes, filename, mime_type) en una sola petición.
+
+        Devuelve un resultado por imagen, en el mismo orden: la predicción o un
+        PredictionError si esa imagen falló. Un error del lote completo se lanza.
+        """
+        files = [("images", (filename, image_bytes, mime_type)) for image_bytes, filename, mime_type in images]
+        try:
+            resp = await http_client.get_client().post(self.predict_batch_url, files=files, timeout=self.timeout)
+        except httpx.TimeoutException:
+            raise PredictionError("prediction_exception", f"Timeout en predicción por lotes después de {self.timeout} segundos")
+        except httpx.RequestError as e:
+            raise PredictionError("prediction_exception", f"Error de red en predicción por lotes: {str(e)}")
+        if resp.status_code != 200:
+            logger.error(f"Error en respuesta de predicción por lotes: {resp.status_code} - {resp.text[:500]}")
+            raise PredictionError("prediction_error", resp.text)
+
+        results = resp.json().get("results", [])
+        if len(results) != len(images):
+            raise PredictionError("prediction_error", f"Se esperaban {len(images)} resultados y se recibieron {len(results)}")
+        return [
+            PredictionError("prediction_error", result.get("error") or "Error en predicción")
+            if result.get("status") == "error" else result
+            for result in results
+        ]
@@ -1,14 +1,64 @@
 import os
+import json
+import asyncio
 import base64
 import logging
-import requests
-from typing import Optional
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Optional
+import httpx
 from botocore.config import Config as BotoConfig
 import boto3
 
+from infrastructure.http_client import http_client
+
 logger = logging.getLogger(__name__)
 
+# Marca de fin del stream de Bedrock (hilo productor -> event loop)
+_STREAM_END = object()
+
+class StreamMetrics:
+    """Métricas de las respuestas en streaming: tiempo hasta el primer token y duración total"""
+
+    def __init__(self, window: int = 1000):
+        self.counters = {"started": 0, "completed": 0, "cancelled": 0, "failed": 0}
+        self._ttft_ms = deque(maxlen=window)
+        self._duration_ms = deque(maxlen=window)
+
+    def record_first_token(self, elapsed_ms: float) -> None:
+        self._ttft_ms.append(elapsed_ms)
+
+    def record_end(self, outcome: str, elapsed_ms: float) -> None:
+        self.counters[outcome] += 1
+        if outcome == "completed":
+            self._duration_ms.append(elapsed_ms)
+
+    @staticmethod
+    def _percentile(samples, pct: float) -> Optional[float]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return round(ordered[min(int(len(ordered) * pct), len(ordered) - 1)], 1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "ttft_ms_p50": self._percentile(self._ttft_ms, 0.5),
+            "ttft_ms_p95": self._percentile(self._ttft_ms, 0.95),
+            "duration_ms_p50": self._percentile(self._duration_ms, 0.5),
+            "duration_ms_p95": self._percentile(self._duration_ms, 0.95),
+        }
+
 class VisionLanguageGateway:
+    # Recursos compartidos por proceso: cliente Bedrock y executor acotado para sus llamadas bloqueantes
+    _bedrock_client = None
+    _bedrock_executor: Optional[ThreadPoolExecutor] = None
+    _lock = threading.Lock()
+    # Métricas de streaming compartidas por todas las instancias del proceso
+    stream_metrics = StreamMetrics()
+
     def __init__(self):
         self.provider = os.getenv("VLM_PROVIDER", "ollama")
         self.model = os.getenv("VLM_MODEL", "llava")  # Solo para Ollama
@@ -20,19 +70,46 @@ class VisionLanguageGateway:
         self.aws_region = os.getenv("AWS_REGION", os.getenv("AWS_DEFAULT_REGION", "us-east-1"))
         self.bedrock_model_id = os.getenv("BEDROCK_MODEL_ID", "amazon.nova-lite-v1:0")
         
-        # Log con el modelo correcto según el proveedor
-        model_name = self.bedrock_model_id if self.provider == "bedrock" else self.model
-        logger.info(f"VLM Gateway inicializado: provider={self.provider}, model={model_name}, timeout={self.timeout}s")
+        # Modelo efectivo según el proveedor
+        self.model_id = self.bedrock_model_id if self.provider == "bedrock" else self.model
+        logger.info(f"VLM Gateway inicializado: provider={self.provider}, model={self.model_id}, timeout={self.timeout}s")
     
-    def ask_about_image(self, prompt: str, image_bytes: bytes, mime_type: str) -> str:
+    @classmethod
+    def _get_bedrock_client(cls, region: str, timeout: int):
+        """Cliente bedrock-runtime creado una sola vez por proceso"""
+        if cls._bedrock_client is None:
+            with cls._lock:
+                if cls._bedrock_client is None:
+                    max_workers = int(os.getenv("VLM_MAX_CONCURRENCY", "8"))
+                    cls._bedrock_client = boto3.client(
+                        "bedrock-runtime",
+                        region_name=region,
+                        config=BotoConfig(
+                            read_timeout=timeout,
+                            retries={"max_attempts": 2},
+                            max_pool_connections=max_workers,
+                        )
+                    )
+                    cls._bedrock_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bedrock")
+        return cls._bedrock_client
+
+    @classmethod
+    def shutdown(cls):
+        """Liberar el executor de Bedrock (llamado desde lifespan)"""
+        if cls._bedrock_executor is not None:
+            cls._bedrock_executor.shutdown(wait=False, cancel_futures=True)
+            cls._bedrock_executor = None
+        cls._bedrock_client = None
+
+    async def ask_about_image(self, prompt: str, image_bytes: bytes, mime_type: str) -> str:
         """Hacer una pregunta sobre una imagen usando el VLM configurado"""
         try:
             logger.info(f"Enviando pregunta al VLM: {prompt[:100]}...")
             
             if self.provider == "ollama":
-                return self._ask_ollama(prompt, image_bytes, mime_type)
+                return await self._ask_ollama(prompt, image_bytes, mime_type)
             if self.provider == "bedrock":
-                return self._ask_bedrock(prompt, image_bytes, mime_type)
+                return await self._ask_bedrock(prompt, image_bytes, mime_type)
             else:
                 raise ValueError(f"Proveedor VLM no soportado: {self.provider}")
                 
@@ -40,26 +117,65 @@ class VisionLanguageGateway:
             logger.error(f"Error en VLM Gateway: {str(e)}")
             raise
     
-    def _ask_ollama(self, prompt: str, image_bytes: bytes, mime_type: str) -> str:
+    async def stream_about_image(self, prompt: str, image_bytes: bytes, mime_type: str) -> AsyncIterator[str]:
+        """Hacer una pregunta sobre una imagen y devolver la respuesta por fragmentos según se genera.
+
+        Si el consumidor deja de iterar (p. ej. el cliente se desconecta), se cierra la
+        conexión con el proveedor y la generación se cancela allí también.
+        """
+        if self.provider == "ollama":
+            chunks = self._stream_ollama(prompt, image_bytes)
+        elif self.provider == "bedrock":
+            chunks = self._stream_bedrock(prompt, image_bytes, mime_type)
+        else:
+            raise ValueError(f"Proveedor VLM no soportado: {self.provider}")
+
+        logger.info(f"Enviando pregunta al VLM (streaming): {prompt[:100]}...")
+        metrics = self.stream_metrics
+        metrics.counters["started"] += 1
+        start = time.perf_counter()
+        first = True
+        outcome = "failed"
+        try:
+            async for chunk in chunks:
+                if first:
+                    first = False
+                    ttft_ms = (time.perf_counter() - start) * 1000
+                    metrics.record_first_token(ttft_ms)
+                    logger.info(f"[VLM] Primer token en {ttft_ms:.0f} ms (provider={self.provider})")
+                yield chunk
+            outcome = "completed"
+        except (asyncio.CancelledError, GeneratorExit):
+            outcome = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Error en VLM Gateway (streaming): {str(e)}")
+            raise
+        finally:
+            await chunks.aclose()
+            metrics.record_end(outcome, (time.perf_counter() - start) * 1000)
+
+    def _ollama_messages(self, prompt: str, image_bytes: bytes) -> list:
+        # Codificar imagen a base64
+        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+        logger.info(f"Imagen codificada en base64: {len(image_base64)} caracteres")
+        
+        # Preparar payload para Ollama con formato más simple
+        messages = []
+        if self.system_prompt:
+            messages.append({"role": "system", "content": self.system_prompt})
+        
+        messages.append({
+            "role": "user",
+            "content": prompt,  # Usar el prompt directamente sin wrapper adicional
+            "images": [image_base64]  # Formato más simple para llava
+        })
+        return messages
+
+    async def _ask_ollama(self, prompt: str, image_bytes: bytes, mime_type: str) -> str:
         """Hacer pregunta a Ollama"""
         try:
-            # Codificar imagen a base64
-            image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-            logger.info(f"Imagen codificada en base64: {len(image_base64)} caracteres")
-            
-            # Preparar prompt con instrucciones específicas
-            wrapped_prompt = prompt  # Usar el prompt directamente sin wrapper adicional
-            
-            # Preparar payload para Ollama con formato más simple
-            messages = []
-            if self.system_prompt:
-                messages.append({"role": "system", "content": self.system_prompt})
-            
-            messages.append({
-                "role": "user",
-                "content": wrapped_prompt,
-                "images": [image_base64]  # Formato más simple para llava
-            })
+            messages = self._ollama_messages(prompt, image_bytes)
             
             payload = {
                 "model": self.model,
@@ -73,8 +189,8 @@ class VisionLanguageGateway:
             logger.info(f"Messages count: {len(messages)}")
             logger.info(f"Images count: {len(messages[-1].get('images', []))}")
             
-            # Hacer request con timeout configurado
-            response = requests.post(
+            # Hacer request con timeout configurado (cliente asíncrono compartido)
+            response = await http_client.get_client().post(
                 f"{self.base_url}/api/chat",
                 json=payload,
                 timeout=self.timeout,  # Usar timeout configurado
@@ -105,51 +221,95 @@ class VisionLanguageGateway:
             logger.warning("No se encontró respuesta válida en la respuesta de Ollama")
             return ""
             
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             logger.error(f"Timeout en request a Ollama después de {self.timeout} segundos")
             raise Exception(f"Timeout en VLM después de {self.timeout} segundos")
-        except requests.exceptions.RequestException as e:
+        except httpx.RequestError as e:
             logger.error(f"Error de red en request a Ollama: {str(e)}")
             raise Exception(f"Error de red en VLM: {str(e)}")
         except Exception as e:
             logger.error(f"Error inesperado en Ollama: {str(e)}")
             raise
 
-    def _ask_bedrock(self, prompt: str, image_bytes: bytes, mime_type: str) -> str:
-        """Hacer pregunta a AWS Bedrock (Nova vision)."""
+    async def _stream_ollama(self, prompt: str, image_bytes: bytes) -> AsyncIterator[str]:
+        """Respuesta de Ollama en streaming (una línea JSON por fragmento)"""
+        payload = {
+            "model": self.model,
+            "messages": self._ollama_messages(prompt, image_bytes),
+            "stream": True
+        }
+        logger.info(f"Enviando request a Ollama (streaming): {self.base_url}/api/chat, modelo: {self.model}")
         try:
-            logger.info(f"Enviando request a Bedrock model={self.bedrock_model_id} region={self.aws_region}")
-            # Bedrock converse API
-            client = boto3.client(
-                "bedrock-runtime",
-                region_name=self.aws_region,
-                config=BotoConfig(read_timeout=self.timeout, retries={"max_attempts": 2})
-            )
+            # El timeout se aplica a cada lectura: tiempo máximo hasta el primer token y entre fragmentos
+            async with http_client.get_client().stream(
+                "POST", f"{self.base_url}/api/chat", json=payload, timeout=self.timeout
+            ) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    logger.error(f"Error en respuesta de Ollama: {response.status_code} - {body[:500]!r}")
+                    raise Exception(f"Error en respuesta de Ollama: {response.status_code}")
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise Exception(f"Error en respuesta de Ollama: {data['error']}")
+                    content = (data.get("message") or {}).get("content")
+                    if content:
+                        yield content
+                    if data.get("done"):
+                        return
+            # Al salir del bloque se cierra la conexión: Ollama detiene la generación
+        except httpx.TimeoutException:
+            logger.error(f"Timeout en streaming de Ollama tras {self.timeout} segundos sin datos")
+            raise Exception(f"Timeout en VLM después de {self.timeout} segundos")
+        except httpx.RequestError as e:
+            logger.error(f"Error de red en streaming de Ollama: {str(e)}")
+            raise Exception(f"Error de red en VLM: {str(e)}")
+
+    def _bedrock_messages(self, prompt: str, image_bytes: bytes, mime_type: str) -> list:
+        # Construir contenido: Bedrock Nova solo permite roles 'user' o 'assistant'
+        # Inyectamos el system prompt como prefijo del mensaje de usuario
+        combined_text = f"{self.system_prompt}\n\n{prompt}" if self.system_prompt else prompt
+        user_parts = [{"text": combined_text}]
 
-            # Construir contenido: Bedrock Nova solo permite roles 'user' o 'assistant'
-            # Inyectamos el system prompt como prefijo del mensaje de usuario
-            combined_text = f"{self.system_prompt}\n\n{prompt}" if self.system_prompt else prompt
-            user_parts = [{"text": combined_text}]
-
-            # Imagen como bytes (Nova acepta bytes con formato)
-            img_format = "png" if "/png" in mime_type or mime_type.endswith("png") else "jpeg"
-            image_part = {
-                "image": {
-                    "format": img_format,
-                    "source": {"bytes": image_bytes}
-                }
+        # Imagen como bytes (Nova acepta bytes con formato)
+        if mime_type.endswith("png"):
+            img_format = "png"
+        elif mime_type.endswith("webp"):
+            img_format = "webp"
+        else:
+            img_format = "jpeg"
+        image_part = {
+            "image": {
+                "format": img_format,
+                "source": {"bytes": image_bytes}
             }
-            user_parts.append(image_part)
+        }
+        user_parts.append(image_part)
 
-            messages = [{"role": "user", "content": user_parts}]
+        return [{"role": "user", "content": user_parts}]
 
-            resp = client.converse(
-                modelId=self.bedrock_model_id,
-                messages=messages,
-                inferenceConfig={
-                    "maxTokens": 256,
-                    "temperature": 0.2,
-                },
+    async def _ask_bedrock(self, prompt: str, image_bytes: bytes, mime_type: str) -> str:
+        """Hacer pregunta a AWS Bedrock (Nova vision)."""
+        try:
+            logger.info(f"Enviando request a Bedrock model={self.bedrock_model_id} region={self.aws_region}")
+            # Bedrock converse API (cliente reutilizado)
+            client = self._get_bedrock_client(self.aws_region, self.timeout)
+            messages = self._bedrock_messages(prompt, image_bytes, mime_type)
+
+            # boto3 es bloqueante: ejecutar en el executor acotado
+            loop = asyncio.get_running_loop()
+            resp = await loop.run_in_executor(
+                self._bedrock_executor,
+                lambda: client.converse(
+                    modelId=self.bedrock_model_id,
+                    messages=messages,
+                    inferenceConfig={
+                        "maxTokens": 256,
+                        "temperature": 0.2,
+                    },
+                ),
             )
 
             # Parsear salida
@@ -168,3 +328,70 @@ class VisionLanguageGateway:
             raise Exception(f"Error en Bedrock VLM: {str(e)}")
 
 
+
+    async def _stream_bedrock(self, prompt: str, image_bytes: bytes, mime_type: str) -> AsyncIterator[str]:
+        """Respuesta de Bedrock con converse_stream.
+
+        El EventStream de boto3 es bloqueante: se recorre en el executor de Bedrock y los
+        fragmentos llegan al event loop por una cola. Al cancelar se cierra el stream, lo
+        que corta la conexión HTTP con Bedrock y detiene la generación.
+        """
+        logger.info(f"Enviando request a Bedrock (streaming) model={self.bedrock_model_id} region={self.aws_region}")
+        client = self._get_bedrock_client(self.aws_region, self.timeout)
+        messages = self._bedrock_messages(prompt, image_bytes, mime_type)
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        streams = []
+
+        def emit(item) -> None:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # El event loop ya se cerró: nadie espera el resultado
+                stop.set()
+
+        def produce() -> None:
+            try:
+                resp = client.converse_stream(
+                    modelId=self.bedrock_model_id,
+                    messages=messages,
+                    inferenceConfig={
+                        "maxTokens": 256,
+                        "temperature": 0.2,
+                    },
+                )
+                stream = resp["stream"]
+                streams.append(stream)
+                try:
+                    for event in stream:
+                        if stop.is_set():
+                            break
+                        text = event.get("contentBlockDelta", {}).get("delta", {}).get("text")
+                        if text:
+                            emit(text)
+                finally:
+                    stream.close()
+                emit(_STREAM_END)
+            except Exception as e:
+                emit(e)
+
+        producer = loop.run_in_executor(self._bedrock_executor, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_END:
+                    return
+                if isinstance(item, Exception):
+                    logger.error(f"Error en Bedrock VLM (streaming): {item}")
+                    raise Exception(f"Error en Bedrock VLM: {str(item)}")
+                yield item
+        finally:
+            stop.set()
+            if not producer.done():
+                for stream in streams:
+                    try:
+                        # Desbloquea la lectura en curso del hilo productor
+                        stream.close()
+                    except Exception:
+                        pass
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from ..entities.Image import Image
 
 class ImageRepository(ABC):
@@ -8,6 +9,11 @@ class ImageRepository(ABC):
         """Guardar una imagen en el repositorio"""
         pass
     
+    @abstractmethod
+    async def save_many(self, images: List[Image]) -> List[Image]:
+        """Guardar varias imágenes en una sola operación"""
+        pass
+    
     @abstractmethod
     async def find_by_id(self, image_id: str) -> Optional[Image]:
         """Buscar una imagen por su ID"""
@@ -23,6 +29,25 @@ class ImageRepository(ABC):
         """Obtener todas las imágenes con paginación"""
         pass
     
+    @abstractmethod
+    async def find_page(self, user_id: Optional[str], limit: int, after: Optional[Tuple[datetime, str]] = None,
+                        skip: int = 0) -> List[Image]:
+        """Página de imágenes ordenada por (upload_date, id) descendente, tras la posición `after`"""
+        pass
+    
+    @abstractmethod
+    async def find_page_documents(self, user_id: Optional[str], limit: int,
+                                  after: Optional[Tuple[datetime, str]] = None, skip: int = 0,
+                                  status: Optional[str] = None, date_from: Optional[datetime] = None,
+                                  date_to: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Como find_page, con los documentos en la forma de la respuesta (sin entidades) y filtros opcionales"""
+        pass
+    
+    @abstractmethod
+    async def count(self, user_id: Optional[str] = None) -> int:
+        """Contar las imágenes, opcionalmente de un usuario"""
+        pass
+    
     @abstractmethod
     async def update(self, image_id: str, image_data: dict) -> Optional[Image]:
         """Actualizar una imagen"""
@@ -37,3 +62,23 @@ class ImageRepository(ABC):
     async def find_by_status(self, status: str) -> List[Image]:
         """Buscar imágenes por estado de procesamiento"""
         pass
+    
+    @abstractmethod
+    async def find_by_status_documents(self, status: str, limit: int = 0) -> List[Dict[str, Any]]:
+        """Como find_by_status, con los documentos en la forma de la respuesta (sin entidades)"""
+        pass
+    
+    @abstractmethod
+    async def find_by_validation_job(self, job_id: str) -> Optional[Image]:
+        """Buscar la imagen guardada por un job de validación asíncrona"""
+        pass
+    
+    @abstractmethod
+    async def count_by_file_path(self, file_path: str) -> int:
+        """Contar las imágenes que referencian un archivo (blob deduplicado) por su ruta"""
+        pass
+    
+    @abstractmethod
+    def iter_file_paths(self, prefix: str, batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """Recorrer {id, file_path, upload_date} de las imágenes bajo un prefijo, ordenadas por file_path"""
+        pass
@@ -0,0 +1,49 @@
+import os
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+from pymongo import IndexModel
+
+from domain.repositories.ImageRepository import ImageRepository
+from infrastructure.database import database
+
+logger = logging.getLogger(__name__)
+
+# Margen antes de borrar un objeto sin registro. Cubre tanto las subidas en curso
+# (el blob se escribe antes que su registro) como la deduplicación: una subida que
+# encuentra el blob ya existente no lo reescribe, así que entre esa comprobación y
+# la inserción de su registro el blob puede no tener ninguna referencia.
+ORPHAN_GRACE_SECONDS = int(os.getenv("ORPHAN_GRACE_SECONDS", "3600"))
+
+# Blobs que se han quedado sin referencias al borrar o rechazar una imagen
+RELEASED_BLOBS_COLLECTION = "released_blobs"
+# Una liberación más antigua que el margen ya no protege el blob: expira por TTL
+RELEASED_BLOBS_INDEXES = [
+    IndexModel("released_at", expireAfterSeconds=2 * ORPHAN_GRACE_SECONDS, name="released_at_ttl"),
+]
+
+
+async def release_blob(image_repository: ImageRepository, file_path: str) -> bool:
+    """Liberar un blob direccionado por contenido si ninguna imagen lo referencia ya.
+
+    No se borra aquí: una subida concurrente puede haberlo encontrado por
+    deduplicación y estar a punto de insertar su registro. Se anota la fecha de
+    liberación y el reconciliador lo borra pasado ORPHAN_GRACE_SECONDS si sigue
+    sin referencias. Devuelve si el blob ha quedado sin referencias.
+    """
+    if await image_repository.count_by_file_path(file_path) > 0:
+        return False
+    await database.get_collection(RELEASED_BLOBS_COLLECTION).update_one(
+        {"_id": file_path}, {"$set": {"released_at": datetime.utcnow()}}, upsert=True
+    )
+    logger.info(f"[BLOBS] Blob sin referencias, pendiente de reconciliación: {file_path}")
+    return True
+
+
+async def released_at(file_paths: List[str]) -> Dict[str, datetime]:
+    """Fecha de liberación de los blobs indicados que la tengan"""
+    cursor = database.get_collection(RELEASED_BLOBS_COLLECTION).find(
+        {"_id": {"$in": file_paths}}, {"released_at": 1}
+    )
+    return {doc["_id"]: doc["released_at"] async for doc in cursor}
@@ -0,0 +1,111 @@
+import os
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Umbrales por defecto: nombre -> (variable de entorno, valor)
+DEFAULT_THRESHOLDS = {
+    "max_colorfulness": ("PREFILTER_MAX_COLORFULNESS", 0.08),
+    "min_dark_ratio": ("PREFILTER_MIN_DARK_RATIO", 0.15),
+    "dark_level": ("PREFILTER_DARK_LEVEL", 30.0),
+    "min_aspect_ratio": ("PREFILTER_MIN_ASPECT_RATIO", 0.5),
+    "max_aspect_ratio": ("PREFILTER_MAX_ASPECT_RATIO", 2.0),
+    "min_symmetry": ("PREFILTER_MIN_SYMMETRY", 0.3),
+    "min_center_border_ratio": ("PREFILTER_MIN_CENTER_BORDER_RATIO", 1.2),
+    "min_entropy": ("PREFILTER_MIN_ENTROPY", 1.5),
+    "max_failed_checks": ("PREFILTER_MAX_FAILED_CHECKS", 3),
+}
+
+REJECT = "reject"
+ESCALATE = "escalate"
+
+
+class CTPreFilter:
+    """Pre-filtro estadístico local para descartar imágenes que claramente no son CT.
+
+    Trabaja sobre una versión reducida de la imagen con NumPy y solo rechaza;
+    todo lo que no sea claramente descartable se escala al VLM.
+    """
+
+    def __init__(self, thresholds: Optional[Dict[str, float]] = None, sample_size: int = 128):
+        self.enabled = os.getenv("PREFILTER_ENABLED", "true").lower() == "true"
+        self.sample_size = sample_size
+        self.thresholds = {
+            name: float(os.getenv(env_var, default)) for name, (env_var, default) in DEFAULT_THRESHOLDS.items()
+        }
+        if thresholds:
+            self.thresholds.update(thresholds)
+
+    def extract_features(self, img: Image.Image) -> Dict[str, float]:
+        """Calcular las características estadísticas sobre la imagen reducida"""
+        small = img.convert("RGB")
+        small.thumbnail((self.sample_size, self.sample_size))
+        rgb = np.asarray(small, dtype=np.float32)
+        gray = rgb.mean(axis=2)
+        h, w = gray.shape
+
+        # Grado de color: desviación media de los canales respecto al gris
+        colorfulness = float(np.abs(rgb - gray[..., None]).mean() / 255.0)
+
+        # Fondo oscuro característico de los cortes de CT
+        dark_ratio = float((gray < self.thresholds["dark_level"]).mean())
+
+        # Forma del histograma de intensidades
+        hist = np.histogram(gray, bins=32, range=(0, 255))[0] / gray.size
+        nonzero = hist[hist > 0]
+        entropy = float(-(nonzero * np.log2(nonzero)).sum())
+
+        # Simetría izquierda-derecha (correlación con la imagen espejada)
+        centered = gray - gray.mean()
+        mirrored = centered[:, ::-1]
+        denom = float(np.sqrt((centered * centered).sum() * (mirrored * mirrored).sum()))
+        symmetry = float((centered * mirrored).sum() / denom) if denom > 0 else 0.0
+
+        # Simetría radial: el centro (cráneo) más brillante que el borde
+        bh, bw = max(1, h // 8), max(1, w // 8)
+        border = np.concatenate([
+            gray[:bh].ravel(), gray[-bh:].ravel(), gray[:, :bw].ravel(), gray[:, -bw:].ravel()
+        ])
+        center = gray[h // 4: max(1, 3 * h // 4), w // 4: max(1, 3 * w // 4)]
+        center_border_ratio = float((center.mean() + 1.0) / (border.mean() + 1.0))
+
+        return {
+            "colorfulness": round(colorfulness, 4),
+            "dark_ratio": round(dark_ratio, 4),
+            "aspect_ratio": round(img.width / img.height, 4) if img.height else 0.0,
+            "entropy": round(entropy, 4),
+            "symmetry": round(symmetry, 4),
+            "center_border_ratio": round(center_border_ratio, 4),
+        }
+
+    def evaluate(self, img: Image.Image) -> Tuple[str, Dict[str, Any]]:
+        """Devolver ("reject" | "escalate", detalle con características y checks fallidos)"""
+        t = self.thresholds
+        features = self.extract_features(img)
+        failed = []
+        if features["colorfulness"] > t["max_colorfulness"]:
+            failed.append("colorfulness")
+        if features["dark_ratio"] < t["min_dark_ratio"]:
+            failed.append("dark_ratio")
+        if not t["min_aspect_ratio"] <= features["aspect_ratio"] <= t["max_aspect_ratio"]:
+            failed.append("aspect_ratio")
+        if features["entropy"] < t["min_entropy"]:
+            failed.append("entropy")
+        if features["symmetry"] < t["min_symmetry"]:
+            failed.append("symmetry")
+        if features["center_border_ratio"] < t["min_center_border_ratio"]:
+            failed.append("center_border_ratio")
+
+        # Una imagen a color es un rechazo directo; el resto requiere varias señales
+        if "colorfulness" in failed or len(failed) >= t["max_failed_checks"]:
+            decision = REJECT
+        else:
+            decision = ESCALATE
+        return decision, {"decision": decision, "features": features, "failed_checks": failed}
+
+# Instancia global del pre-filtro
+ct_prefilter = CTPreFilter()
@@ -0,0 +1,127 @@
+import os
+import asyncio
+import logging
+from io import BytesIO
+from typing import Tuple
+
+from PIL import Image
+
+from infrastructure.storage import StorageService
+from infrastructure.dicom import is_dicom, render_png
+from infrastructure.vlm_encoder import vlm_encoder
+
+logger = logging.getLogger(__name__)
+
+# Derivados disponibles: tamaño (lado máximo o tamaño exacto), formato y calidad
+DERIVATIVE_SPECS = {
+    "thumb_128": {"max_side": 128, "format": "WEBP", "quality": 80},
+    "thumb_256": {"max_side": 256, "format": "WEBP", "quality": 80},
+    "thumb_512": {"max_side": 512, "format": "JPEG", "quality": 85},
+    # Entrada del modelo de clasificación (300x300 RGB)
+    "model": {"size": (300, 300), "format": "PNG"},
+    # Imagen reducida para el VLM (mismo lado máximo que el codificador, VLM_IMAGE_MAX_SIDE)
+    "vlm": {"max_side": vlm_encoder.max_side, "format": "PNG"},
+}
+
+FORMAT_EXTENSIONS = {"WEBP": ".webp", "JPEG": ".jpg", "PNG": ".png"}
+FORMAT_MIME_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg", "PNG": "image/png"}
+
+
+def render_derivative(image_bytes: bytes, kind: str) -> bytes:
+    """Generar el derivado indicado a partir de los bytes del original (CPU, síncrono)"""
+    spec = DERIVATIVE_SPECS[kind]
+    with BytesIO(image_bytes) as bio:
+        img = Image.open(bio)
+        if "max_side" in spec:
+            # JPEG: decodificar directamente a escala reducida
+            img.draft("RGB", (spec["max_side"], spec["max_side"]))
+        img = img.convert("RGB")
+        if "size" in spec:
+            # Mismo resize que el preprocesado del modelo
+            img = img.resize(spec["size"])
+        else:
+            img.thumbnail((spec["max_side"], spec["max_side"]), Image.BILINEAR)
+        out = BytesIO()
+        if spec["format"] == "PNG":
+            img.save(out, format="PNG", compress_level=1)
+        else:
+            img.save(out, format=spec["format"], quality=spec["quality"])
+        return out.getvalue()
+
+
+class DerivativeService:
+    """Derivados (miniaturas, entrada del modelo, entrada del VLM) generados bajo demanda.
+
+    Se guardan junto al original (<original>.<tipo>.<ext>) y se reutilizan en
+    peticiones posteriores; como el original es inmutable, también lo son ellos.
+    Para DICOM, los derivados parten de una vista renderizada (<original>.rendered.png)
+    que también queda guardada, de modo que el DICOM solo se decodifica una vez.
+    """
+
+    def __init__(self, storage: StorageService):
+        self.storage = storage
+
+    @staticmethod
+    def derivative_path(file_path: str, kind: str) -> str:
+        """Ruta del derivado junto al original"""
+        root, _ = os.path.splitext(file_path)
+        return f"{root}.{kind}{FORMAT_EXTENSIONS[DERIVATIVE_SPECS[kind]['format']]}"
+
+    @staticmethod
+    def mime_type(kind: str) -> str:
+        return FORMAT_MIME_TYPES[DERIVATIVE_SPECS[kind]["format"]]
+
+    async def get_derivative(self, file_path: str, kind: str) -> Tuple[bytes, str]:
+        """Devolver (bytes, mime) del derivado, generándolo y guardándolo si aún no existe"""
+        if kind not in DERIVATIVE_SPECS:
+            raise ValueError(f"Tipo de derivado no soportado: {kind}")
+        path = self.derivative_path(file_path, kind)
+        mime_type = self.mime_type(kind)
+
+        if await self.storage.exists(path):
+            return await self.storage.read(path), mime_type
+
+        logger.info(f"[DERIVATIVES] Generando derivado '{kind}' para {file_path}")
+        source = await self.get_source(file_path)
+        data = await asyncio.to_thread(render_derivative, source, kind)
+        await self._store(path, data, mime_type)
+        return data, mime_type
+
+    async def get_source(self, file_path: str) -> bytes:
+        """Bytes decodificables por PIL del original (para DICOM, la vista renderizada cacheada)"""
+        if not is_dicom(filename=file_path):
+            return await self.storage.read(file_path)
+
+        rendered_path = self.rendered_path(file_path)
+        if await self.storage.exists(rendered_path):
+            return await self.storage.read(rendered_path)
+
+        logger.info(f"[DERIVATIVES] Renderizando DICOM {file_path}")
+        if self.storage.storage_type == "local":
+            # Ruta local: los píxeles se mapean en memoria en lugar de leerse enteros
+            data = await asyncio.to_thread(render_png, file_path)
+        else:
+            original = await self.storage.read(file_path)
+            data = await asyncio.to_thread(render_png, original)
+        await self._store(rendered_path, data, "image/png")
+        return data
+
+    @staticmethod
+    def rendered_path(file_path: str) -> str:
+        """Ruta de la vista renderizada de un DICOM"""
+        root, _ = os.path.splitext(file_path)
+        return f"{root}.rendered.png"
+
+    async def _store(self, path: str, data: bytes, mime_type: str) -> None:
+        try:
+            await self.storage.write_bytes(path, data, mime_type)
+        except Exception as e:
+            # Si no se puede persistir, se sirve igualmente el derivado generado
+            logger.warning(f"[DERIVATIVES] No se pudo guardar el derivado {path}: {e}")
+
+    async def delete_derivatives(self, file_path: str) -> None:
+        """Eliminar todos los derivados de un original"""
+        for kind in DERIVATIVE_SPECS:
+            await self.storage.delete_image(self.derivative_path(file_path, kind))
+        if is_dicom(filename=file_path):
+            await self.storage.delete_image(self.rendered_path(file_path))
@@ -0,0 +1,199 @@
+import os
+import logging
+from io import BytesIO
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+import numpy as np
+import pydicom
+from pydicom.dataelem import RawDataElement
+from pydicom.multival import MultiValue
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+DICOM_EXTENSIONS = {".dcm", ".dicom"}
+DICOM_MIME_TYPE = "application/dicom"
+# Ventana cerebral por defecto para CT sin ventana en cabecera (centro, ancho) en HU
+DEFAULT_CT_WINDOW = (40.0, 80.0)
+
+# Origen de un DICOM: ruta local (permite memmap) o bytes ya en memoria
+DicomSource = Union[str, bytes]
+
+
+def is_dicom(file_content: Optional[bytes] = None, filename: str = "", mime_type: str = "") -> bool:
+    """Detectar DICOM por MIME, extensión o preámbulo 'DICM'"""
+    if mime_type == DICOM_MIME_TYPE or os.path.splitext(filename)[1].lower() in DICOM_EXTENSIONS:
+        return True
+    return file_content is not None and len(file_content) > 132 and file_content[128:132] == b"DICM"
+
+
+def _read(source: DicomSource, **kwargs) -> pydicom.Dataset:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return pydicom.dcmread(BytesIO(source), force=True, **kwargs)
+    return pydicom.dcmread(source, force=True, **kwargs)
+
+
+def _first(value: Any, default: Optional[float] = None) -> Optional[float]:
+    """Primer valor de un elemento que puede ser multivalor"""
+    if value is None or value == "":
+        return default
+    if isinstance(value, (list, tuple, MultiValue)):
+        value = value[0] if len(value) else None
+    return float(value) if value is not None else default
+
+
+def read_header(source: DicomSource) -> Dict[str, Any]:
+    """Leer la cabecera sin cargar los píxeles"""
+    ds = _read(source, stop_before_pixels=True)
+    return _header_from_dataset(ds)
+
+
+def _header_from_dataset(ds: pydicom.Dataset) -> Dict[str, Any]:
+    transfer_syntax = getattr(getattr(ds, "file_meta", None), "TransferSyntaxUID", None)
+    return {
+        "modality": str(ds.get("Modality", "")),
+        "rows": int(ds.get("Rows", 0) or 0),
+        "columns": int(ds.get("Columns", 0) or 0),
+        "number_of_frames": int(ds.get("NumberOfFrames", 1) or 1),
+        "samples_per_pixel": int(ds.get("SamplesPerPixel", 1) or 1),
+        "bits_allocated": int(ds.get("BitsAllocated", 16) or 16),
+        "pixel_representation": int(ds.get("PixelRepresentation", 0) or 0),
+        "photometric_interpretation": str(ds.get("PhotometricInterpretation", "MONOCHROME2")),
+        "rescale_slope": _first(ds.get("RescaleSlope"), 1.0),
+        "rescale_intercept": _first(ds.get("RescaleIntercept"), 0.0),
+        "window_center": _first(ds.get("WindowCenter")),
+        "window_width": _first(ds.get("WindowWidth")),
+        "transfer_syntax": str(transfer_syntax) if transfer_syntax else None,
+        "study_instance_uid": str(ds.get("StudyInstanceUID", "")),
+        "series_instance_uid": str(ds.get("SeriesInstanceUID", "")),
+        "sop_instance_uid": str(ds.get("SOPInstanceUID", "")),
+    }
+
+
+def apply_window(pixels: np.ndarray, slope: float, intercept: float, center: float, width: float,
+                 invert: bool = False) -> np.ndarray:
+    """Aplicar rescale + ventana/nivel y llevar a 8 bits (vectorizado)"""
+    width = max(float(width), 1.0)
+    values = pixels.astype(np.float32, copy=False) * np.float32(slope) + np.float32(intercept)
+    low = np.float32(center - width / 2.0)
+    out = (values - low) * np.float32(255.0 / width)
+    np.clip(out, 0, 255, out=out)
+    out = out.astype(np.uint8)
+    return 255 - out if invert else out
+
+
+class DicomPixels:
+    """Acceso perezoso a los píxeles de un DICOM.
+
+    Para archivos locales sin comprimir los píxeles se mapean en memoria (np.memmap),
+    de modo que solo se leen del disco los frames que se usan. Desde bytes en memoria
+    se usa una vista sin copia. Los formatos comprimidos se decodifican con pydicom.
+    """
+
+    def __init__(self, source: DicomSource):
+        self.source = source
+        if isinstance(source, str):
+            # defer_size: el valor de PixelData no se lee, solo su posición en el archivo
+            ds = _read(source, defer_size=1024)
+        else:
+            ds = _read(source)
+        self.header = _header_from_dataset(ds)
+        self._frames = self._map_pixels(ds)
+
+    @property
+    def number_of_frames(self) -> int:
+        return int(self._frames.shape[0])
+
+    def _dtype(self) -> np.dtype:
+        bits = self.header["bits_allocated"]
+        signed = self.header["pixel_representation"] == 1
+        if bits == 8:
+            return np.dtype(np.int8 if signed else np.uint8)
+        if bits == 32:
+            return np.dtype("<i4" if signed else "<u4")
+        return np.dtype("<i2" if signed else "<u2")
+
+    def _frame_shape(self) -> Tuple[int, ...]:
+        h = self.header
+        frames, rows, cols, spp = h["number_of_frames"], h["rows"], h["columns"], h["samples_per_pixel"]
+        return (frames, rows, cols, spp) if spp > 1 else (frames, rows, cols)
+
+    def _map_pixels(self, ds: pydicom.Dataset) -> np.ndarray:
+        transfer_syntax = ds.file_meta.TransferSyntaxUID if hasattr(ds, "file_meta") and "TransferSyntaxUID" in ds.file_meta else None
+        uncompressed = transfer_syntax is None or (not transfer_syntax.is_compressed and transfer_syntax.is_little_endian)
+        planar = int(ds.get("PlanarConfiguration", 0) or 0)
+        shape = self._frame_shape()
+        dtype = self._dtype()
+        expected = int(np.prod(shape)) * dtype.itemsize
+
+        if uncompressed and planar == 0 and "PixelData" in ds:
+            raw = ds.get_item("PixelData", keep_deferred=True)
+            if isinstance(self.source, str) and isinstance(raw, RawDataElement) and raw.value is None:
+                if raw.length >= expected:
+                    return np.memmap(self.source, dtype=dtype, mode="r", offset=raw.value_tell, shape=shape)
+            else:
+                data = raw.value if isinstance(raw, RawDataElement) else ds.PixelData
+                if data is not None and len(data) >= expected:
+                    return np.frombuffer(data, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+        # Comprimido o no mapeable: decodificación completa con pydicom
+        logger.info("[DICOM] Píxeles no mapeables, decodificando con pydicom")
+        if isinstance(self.source, str):
+            ds = _read(self.source)
+        arr = ds.pixel_array
+        if self.header["number_of_frames"] == 1:
+            arr = arr[np.newaxis, ...]
+        return arr
+
+    def frame(self, index: int) -> np.ndarray:
+        """Píxeles crudos de un frame"""
+        if not 0 <= index < self.number_of_frames:
+            raise ValueError(f"Frame fuera de rango: {index} (total {self.number_of_frames})")
+        return self._frames[index]
+
+    def default_window(self, pixels: np.ndarray) -> Tuple[float, float]:
+        """Ventana de la cabecera, ventana cerebral para CT o rango min/max del frame"""
+        h = self.header
+        if h["window_center"] is not None and h["window_width"]:
+            return h["window_center"], h["window_width"]
+        if h["modality"] == "CT":
+            return DEFAULT_CT_WINDOW
+        values = pixels.astype(np.float32, copy=False) * h["rescale_slope"] + h["rescale_intercept"]
+        low, high = float(values.min()), float(values.max())
+        return (low + high) / 2.0, max(high - low, 1.0)
+
+    def render(self, index: int = 0, center: Optional[float] = None, width: Optional[float] = None) -> np.ndarray:
+        """Frame en 8 bits con ventana/nivel aplicados"""
+        pixels = self.frame(index)
+        h = self.header
+        if h["samples_per_pixel"] > 1:
+            # Color: se asume ya en rango de visualización
+            return pixels if pixels.dtype == np.uint8 else np.clip(pixels, 0, 255).astype(np.uint8)
+        if center is None or width is None:
+            default_center, default_width = self.default_window(pixels)
+            center = default_center if center is None else center
+            width = default_width if width is None else width
+        return apply_window(
+            pixels, h["rescale_slope"], h["rescale_intercept"], center, width,
+            invert=h["photometric_interpretation"] == "MONOCHROME1",
+        )
+
+    def iter_frames(self, center: Optional[float] = None, width: Optional[float] = None) -> Iterator[np.ndarray]:
+        """Recorrer la serie frame a frame sin cargarla entera"""
+        for index in range(self.number_of_frames):
+            yield self.render(index, center, width)
+
+    def render_image(self, index: Optional[int] = None, center: Optional[float] = None, width: Optional[float] = None) -> Image.Image:
+        """Frame renderizado como imagen PIL RGB (por defecto el frame central de la serie)"""
+        if index is None:
+            index = self.number_of_frames // 2
+        return Image.fromarray(self.render(index, center, width)).convert("RGB")
+
+
+def render_png(source: DicomSource, index: Optional[int] = None, center: Optional[float] = None,
+               width: Optional[float] = None) -> bytes:
+    """Renderizar un frame a PNG"""
+    img = DicomPixels(source).render_image(index, center, width)
+    out = BytesIO()
+    img.save(out, format="PNG", compress_level=1)
+    return out.getvalue()
@@ -0,0 +1,42 @@
+import os
+import logging
+import httpx
+
+logger = logging.getLogger(__name__)
+
+class HttpClient:
+    client: httpx.AsyncClient = None
+
+    @classmethod
+    async def connect(cls):
+        """Crear el cliente HTTP asíncrono compartido (pool de conexiones por proceso)"""
+        if cls.client is None:
+            cls.client = cls._build_client()
+            logger.info("Cliente HTTP asíncrono inicializado")
+
+    @classmethod
+    async def close(cls):
+        """Cerrar el cliente HTTP y liberar las conexiones del pool"""
+        if cls.client is not None:
+            await cls.client.aclose()
+            cls.client = None
+            logger.info("Cliente HTTP asíncrono cerrado")
+
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        """Obtener el cliente compartido (se crea perezosamente fuera de lifespan, p.ej. en workers)"""
+        if cls.client is None:
+            cls.client = cls._build_client()
+        return cls.client
+
+    @staticmethod
+    def _build_client() -> httpx.AsyncClient:
+        max_connections = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+        max_keepalive = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+        return httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+            timeout=httpx.Timeout(60.0),
+        )
+
+# Instancia global del cliente HTTP
+http_client = HttpClient()
@@ -0,0 +1,110 @@
+import asyncio
+from io import BytesIO
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from infrastructure.dicom import DicomPixels, is_dicom, read_header
+from infrastructure.vlm_encoder import VLMEncoder, vlm_encoder
+
+# Lado máximo de la imagen enviada al VLM
+VLM_MAX_SIDE = vlm_encoder.max_side
+# Tamaño de entrada del modelo de clasificación (EfficientNetB3)
+MODEL_INPUT_SIZE = (300, 300)
+
+
+class ImageContext:
+    """Contexto de imagen por petición: decodifica una sola vez y memoriza las formas derivadas.
+
+    Cada etapa (almacenamiento, validación, predicción) pide la forma que necesita;
+    el trabajo de CPU se ejecuta fuera del event loop y las peticiones concurrentes
+    de la misma forma comparten el mismo cálculo.
+    """
+
+    def __init__(self, file_content: bytes, filename: str = "", mime_type: str = "application/octet-stream",
+                 encoder: Optional[VLMEncoder] = None):
+        self.file_content = file_content
+        self.filename = filename
+        self.mime_type = mime_type
+        self.encoder = encoder or vlm_encoder
+        self.is_dicom = is_dicom(file_content, filename, mime_type)
+        self._results: Dict[str, "asyncio.Future[Any]"] = {}
+
+    async def _memoized(self, key: str, fn: Callable[..., Any], *args: Any) -> Any:
+        future = self._results.get(key)
+        if future is None:
+            future = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+            self._results[key] = future
+        # shield: cancelar a un consumidor no cancela el cálculo compartido
+        return await asyncio.shield(future)
+
+    async def dimensions(self) -> Tuple[Optional[int], Optional[int]]:
+        """(ancho, alto) leídos de la cabecera, sin decodificar los píxeles"""
+        decoded = self._results.get("rgb")
+        if decoded is not None and decoded.done() and not decoded.exception():
+            return decoded.result().size
+        return await self._memoized("dimensions", self._read_dimensions)
+
+    async def rgb_image(self) -> Image.Image:
+        """Imagen RGB a resolución completa (decodificada una vez)"""
+        return await self._memoized("rgb", self._decode_rgb)
+
+    async def rgb_array(self) -> np.ndarray:
+        """Píxeles RGB como array uint8 (alto, ancho, 3)"""
+        img = await self.rgb_image()
+        return await self._memoized("rgb_array", np.asarray, img)
+
+    async def vlm_image(self) -> Image.Image:
+        """Imagen RGB reducida al lado máximo del encoder para el VLM y el pre-filtro"""
+        img = await self.rgb_image()
+        return await self._memoized("vlm_image", self.encoder.resize, img)
+
+    async def vlm_payload(self) -> Tuple[bytes, str]:
+        """(bytes, mime_type) de la imagen reducida en el formato configurado para el VLM"""
+        img = await self.vlm_image()
+        return await self._memoized("vlm_payload", self.encoder.encode, img)
+
+    async def vlm_png(self) -> bytes:
+        """PNG de la imagen reducida"""
+        img = await self.vlm_image()
+        return await self._memoized("vlm_png", self._encode_png, img)
+
+    async def rendered_png(self) -> bytes:
+        """PNG a resolución completa (para DICOM: frame renderizado con ventana/nivel)"""
+        img = await self.rgb_image()
+        return await self._memoized("rendered_png", self._encode_png, img)
+
+    async def model_input(self) -> Image.Image:
+        """Imagen redimensionada a la entrada del modelo (mismo resize que el servicio de predicción)"""
+        img = await self.rgb_image()
+        return await self._memoized("model_input", img.resize, MODEL_INPUT_SIZE)
+
+    async def model_input_png(self) -> bytes:
+        """PNG sin pérdida de la entrada del modelo (300x300)"""
+        img = await self.model_input()
+        return await self._memoized("model_input_png", self._encode_png, img)
+
+    def _read_dimensions(self) -> Tuple[Optional[int], Optional[int]]:
+        try:
+            if self.is_dicom:
+                header = read_header(self.file_content)
+                return header["columns"] or None, header["rows"] or None
+            with Image.open(BytesIO(self.file_content)) as img:
+                return img.size
+        except Exception:
+            return None, None
+
+    def _decode_rgb(self) -> Image.Image:
+        if self.is_dicom:
+            # Frame representativo de la serie con la ventana por defecto
+            return DicomPixels(self.file_content).render_image()
+        with Image.open(BytesIO(self.file_content)) as img:
+            return img.convert("RGB") if img.mode != "RGB" else img.copy()
+
+    @staticmethod
+    def _encode_png(img: Image.Image) -> bytes:
+        out = BytesIO()
+        # compress_level=1: sin pérdida y mucho más rápido que optimize=True
+        img.save(out, format="PNG", compress_level=1)
+        return out.getvalue()
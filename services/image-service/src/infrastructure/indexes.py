@@ -0,0 +1,144 @@
+import os
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterator, List
+
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+
+from infrastructure.database import database
+from infrastructure.repositories.MongoImageRepository import MongoImageRepository, LIST_SORT
+from infrastructure.repositories.MongoChatRepository import MongoChatRepository
+from infrastructure.validation_cache import validation_cache
+from infrastructure.blob_releases import RELEASED_BLOBS_COLLECTION, RELEASED_BLOBS_INDEXES
+from tasks.validation_tasks import VALIDATION_JOBS_COLLECTION, VALIDATION_JOBS_INDEXES
+from usecases.upload_session import UPLOAD_SESSIONS_COLLECTION, UPLOAD_SESSIONS_INDEXES
+
+logger = logging.getLogger(__name__)
+
+# Posición de página de ejemplo: las consultas keyset añaden el $or de _page_query
+SAMPLE_CURSOR = (datetime(2024, 1, 1), "0" * 24)
+_page_query = MongoImageRepository._page_query
+
+# Consultas representativas de cada repositorio: todas deben resolverse con un índice.
+# Los listados usan el mismo _page_query que el repositorio, así un cambio en él se comprueba aquí.
+QUERY_PLANS = [
+    {"name": "images.find_page", "collection": MongoImageRepository.COLLECTION,
+     "filter": _page_query("u", None), "sort": LIST_SORT},
+    {"name": "images.find_page (cursor)", "collection": MongoImageRepository.COLLECTION,
+     "filter": _page_query("u", SAMPLE_CURSOR), "sort": LIST_SORT},
+    {"name": "images.find_page (sin usuario)", "collection": MongoImageRepository.COLLECTION,
+     "filter": _page_query(None, None), "sort": LIST_SORT},
+    {"name": "images.find_page (sin usuario, cursor)", "collection": MongoImageRepository.COLLECTION,
+     "filter": _page_query(None, SAMPLE_CURSOR), "sort": LIST_SORT},
+    {"name": "images.find_by_status", "collection": MongoImageRepository.COLLECTION,
+     "filter": {"processing_status": "pending"}},
+    {"name": "images.export (estado)", "collection": MongoImageRepository.COLLECTION,
+     "filter": _page_query(None, SAMPLE_CURSOR, status="failed"), "sort": LIST_SORT},
+    {"name": "images.export (usuario y fechas)", "collection": MongoImageRepository.COLLECTION,
+     "filter": _page_query("u", SAMPLE_CURSOR, date_from=datetime(2023, 1, 1), date_to=datetime(2025, 1, 1)),
+     "sort": LIST_SORT},
+    {"name": "images.count_by_file_path", "collection": MongoImageRepository.COLLECTION,
+     "filter": {"file_path": "blobs/ab/cd/h.png"}},
+    {"name": "images.find_by_validation_job", "collection": MongoImageRepository.COLLECTION,
+     "filter": {"metadata.validation_job_id": "j"}},
+    {"name": "images.iter_file_paths", "collection": MongoImageRepository.COLLECTION,
+     "filter": {"file_path": {"$gte": "a", "$lt": "b"}}, "sort": [("file_path", 1)]},
+    {"name": "image_chats.get_history", "collection": MongoChatRepository.COLLECTION,
+     "filter": {"image_id": "i", "user_id": "u"}, "sort": [("timestamp", 1)]},
+    {"name": "validation_jobs.get_job_status", "collection": VALIDATION_JOBS_COLLECTION,
+     "filter": {"job_id": "j"}},
+]
+
+
+def declared_indexes() -> Dict[str, List[IndexModel]]:
+    """Índices requeridos por colección, tal como los declara cada repositorio"""
+    return {
+        MongoImageRepository.COLLECTION: MongoImageRepository.INDEXES,
+        MongoChatRepository.COLLECTION: MongoChatRepository.INDEXES,
+        VALIDATION_JOBS_COLLECTION: VALIDATION_JOBS_INDEXES,
+        UPLOAD_SESSIONS_COLLECTION: UPLOAD_SESSIONS_INDEXES,
+        RELEASED_BLOBS_COLLECTION: RELEASED_BLOBS_INDEXES,
+        validation_cache.COLLECTION: validation_cache.index_models(),
+    }
+
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """Crear los índices declarados (idempotente: los existentes con la misma definición no se tocan)"""
+    created: Dict[str, List[str]] = {}
+    for collection_name, models in declared_indexes().items():
+        try:
+            created[collection_name] = await database.get_collection(collection_name).create_indexes(models)
+        except Exception as e:
+            # Un índice con el mismo nombre y otra definición (p. ej. otro TTL) no se sustituye automáticamente
+            logger.error(f"[INDEXES] No se pudieron crear los índices de {collection_name}: {e}")
+    return created
+
+
+def _plan_stages(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    if "inputStage" in plan:
+        yield from _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+async def explain_query_plans() -> List[Dict[str, Any]]:
+    """Plan ganador de cada consulta representativa (explain) y si sigue haciendo COLLSCAN"""
+    results = []
+    for query in QUERY_PLANS:
+        cursor = database.get_collection(query["collection"]).find(query["filter"])
+        if query.get("sort"):
+            cursor = cursor.sort(query["sort"])
+        explain = await cursor.limit(1).explain()
+        results.append(summarize_plan(query, explain))
+    return results
+
+
+def summarize_plan(query: Dict[str, Any], explain: Dict[str, Any]) -> Dict[str, Any]:
+    """Etapas e índices del plan ganador de un explain() y si recorre la colección entera"""
+    winning = explain["queryPlanner"]["winningPlan"]
+    # Con el motor SBE (MongoDB 7+) el plan de consulta va anidado
+    stages = list(_plan_stages(winning.get("queryPlan", winning)))
+    return {
+        "name": query["name"],
+        "collection": query["collection"],
+        "stages": [stage["stage"] for stage in stages],
+        "indexes": [stage["indexName"] for stage in stages if "indexName" in stage],
+        "collscan": any(stage["stage"] == "COLLSCAN" for stage in stages),
+    }
+
+
+async def slow_collscans(limit: int = 20) -> List[Dict[str, Any]]:
+    """Consultas lentas registradas por el profiler de MongoDB que aún recorren la colección entera"""
+    try:
+        cursor = database.database["system.profile"].find(
+            {"planSummary": "COLLSCAN"},
+            {"ns": 1, "op": 1, "command": 1, "millis": 1, "docsExamined": 1, "ts": 1},
+        ).sort("ts", -1).limit(limit)
+        return [{k: v for k, v in doc.items() if k != "_id"} async for doc in cursor]
+    except OperationFailure as e:
+        logger.warning(f"[INDEXES] No se pudo leer system.profile: {e}")
+        return []
+
+
+async def bootstrap_indexes() -> None:
+    """Tarea de arranque: crear índices, comprobar los planes y activar el profiler de consultas lentas.
+
+    Sin índices el servicio funciona igual (más lento): los errores se registran sin bloquear el arranque.
+    """
+    created = await ensure_indexes()
+    logger.info(f"[INDEXES] Índices asegurados: {created}")
+    try:
+        for plan in await explain_query_plans():
+            if plan["collscan"]:
+                logger.warning(f"[INDEXES] La consulta {plan['name']} sigue haciendo COLLSCAN: {plan['stages']}")
+    except Exception as e:
+        logger.warning(f"[INDEXES] No se pudieron comprobar los planes de consulta: {e}")
+    slow_ms = os.getenv("MONGO_PROFILE_SLOW_MS")
+    if slow_ms:
+        try:
+            # Nivel 1: solo se registran las operaciones más lentas que slowms
+            await database.database.command("profile", 1, slowms=int(slow_ms))
+        except Exception as e:
+            logger.warning(f"[INDEXES] No se pudo activar el profiler de MongoDB: {e}")
@@ -2,14 +2,27 @@ import logging
 logger = logging.getLogger(__name__)
 logger.info('[MEDICAL_IMAGE_VALIDATOR] Archivo medical_image_validator.py cargado')
 import os
+import re
+import asyncio
 import logging
-from typing import Tuple, Dict, Any
-from io import BytesIO
-from PIL import Image
+from typing import Tuple, Dict, Any, Optional
 from adapters.gateways.vlm_gateway import VisionLanguageGateway
+from infrastructure.validation_cache import validation_cache
+from infrastructure.ct_prefilter import ct_prefilter, REJECT
+from infrastructure.image_context import ImageContext
 
 logger = logging.getLogger(__name__)
 
+# Prompt simplificado y directo
+VALIDATION_PROMPT = """
+            ¿Es esta imagen una tomografía del cerebro?
+            
+            Responde solo: SÍ o NO
+            """
+
+# SÍ/NO como palabra completa: condición para guardar el veredicto en caché
+EXPLICIT_VERDICT = re.compile(r"(?<!\w)(sí|si|yes|no)(?!\w)", re.IGNORECASE)
+
 class MedicalImageValidator:
     logger.info('[MEDICAL_IMAGE_VALIDATOR] Instanciando MedicalImageValidator')
     def __init__(self):
@@ -26,56 +39,62 @@ class MedicalImageValidator:
         
         logger.info(f"MedicalImageValidator inicializado con system prompt: {self.validator_system_prompt[:50]}...")
         
-    async def validate_brain_ct(self, image_bytes: bytes, mime_type: str) -> Tuple[bool, Dict[str, Any]]:
+    async def validate_brain_ct(self, image_bytes: bytes, mime_type: str, context: Optional[ImageContext] = None) -> Tuple[bool, Dict[str, Any]]:
         logger.info(f'[MEDICAL_IMAGE_VALIDATOR] validate_brain_ct llamada con mime_type={mime_type}, bytes={len(image_bytes)}')
         """
         Valida si la imagen es una tomografía del cerebro válida.
 
+        Si se recibe un ImageContext se reutilizan sus formas ya decodificadas.
+
         Returns:
             Tuple[bool, Dict]: (es_valida, informacion_detallada)
         """
         try:
             logger.info("Iniciando validación de imagen médica")
             
-            # Prompt simplificado y directo
-            validation_prompt = """
-            ¿Es esta imagen una tomografía del cerebro?
+            validation_prompt = VALIDATION_PROMPT
             
-            Responde solo: SÍ o NO
-            """
-            
-            # Preprocesar imagen: convertir a PNG RGB y limitar resolución
+            # Preprocesar imagen: RGB reducida y re-codificada según VLM_IMAGE_* (decodificada una sola vez)
+            if context is None:
+                context = ImageContext(image_bytes, mime_type=mime_type)
             try:
-                with BytesIO(image_bytes) as bio:
-                    img = Image.open(bio)
-                    if img.mode != 'RGB':
-                        img = img.convert('RGB')
-                    # Reducción de tamaño: lado largo máx 1024 px
-                    max_side = 1024
-                    w, h = img.size
-                    scale = min(1.0, max_side / max(w, h))
-                    if scale < 1.0:
-                        new_size = (int(w * scale), int(h * scale))
-                        img = img.resize(new_size)
-                    out = BytesIO()
-                    img.save(out, format='PNG', optimize=True)
-                    out_bytes = out.getvalue()
-                    out.close()
-                    preprocessed_bytes = out_bytes
-                    preprocessed_mime = 'image/png'
+                img = await context.vlm_image()
+                # Pre-filtro estadístico local: descarta lo que claramente no es CT sin llamar al VLM
+                if ct_prefilter.enabled:
+                    decision, prefilter_info = await asyncio.to_thread(ct_prefilter.evaluate, img)
+                    if decision == REJECT:
+                        logger.info(f"Imagen descartada por pre-filtro: {prefilter_info['failed_checks']}")
+                        return False, {
+                            "es_tomografia_cerebral": False,
+                            "muestra_estructuras_cerebrales": False,
+                            "calidad_suficiente": False,
+                            "descripcion": "La imagen no presenta las características de una tomografía cerebral",
+                            "prefilter": prefilter_info,
+                        }
+                preprocessed_bytes, preprocessed_mime = await context.vlm_payload()
             except Exception as prep_err:
                 logger.error(f"Error preprocesando imagen: {prep_err}")
                 return False, {
                     "es_tomografia_cerebral": False,
                     "muestra_estructuras_cerebrales": False,
                     "calidad_suficiente": False,
-                    "descripcion": "Error al convertir la imagen a PNG RGB",
+                    "descripcion": "Error al preparar la imagen para el VLM",
                     "error": str(prep_err),
                     "validation_error": True
                 }
 
+            # Consultar la caché de veredictos antes de llamar al VLM
+            cache_key = validation_cache.make_key(
+                preprocessed_bytes, validation_prompt, self.validator_system_prompt, self.vlm.model_id
+            )
+            cached = await validation_cache.get(cache_key)
+            if cached is not None:
+                cached_valid, cached_info = cached
+                logger.info(f"Veredicto de validación obtenido de caché: {cached_valid}")
+                return cached_valid, {**cached_info, "cache_hit": True}
+
             # Usar el VLM para analizar la imagen (base64 + JSON)
-            response = self.vlm.ask_about_image(
+            response = await self.vlm.ask_about_image(
                 prompt=validation_prompt,
                 image_bytes=preprocessed_bytes,
                 mime_type=preprocessed_mime
@@ -83,22 +102,19 @@ class MedicalImageValidator:
             
             logger.info(f"Respuesta del VLM para validación: {response}")
             
-            # Analizar respuesta simple
-            response_lower = response.lower().strip()
-            
-            # Buscar respuestas afirmativas
-            is_valid = any(keyword in response_lower for keyword in [
-                "sí", "si", "yes", "true", "correcto", "correcta", "es una", "tomografía", "ct", "cerebral"
-            ])
-            
-            # Buscar respuestas negativas
-            is_invalid = any(keyword in response_lower for keyword in [
-                "no", "false", "incorrecto", "incorrecta", "no es", "no es una"
-            ])
+            if not (response or "").strip():
+                # Una respuesta vacía no es un veredicto: se trata como fallo técnico (reintentable)
+                logger.warning("El VLM devolvió una respuesta vacía")
+                return False, {
+                    "es_tomografia_cerebral": False,
+                    "muestra_estructuras_cerebrales": False,
+                    "calidad_suficiente": False,
+                    "descripcion": "El VLM devolvió una respuesta vacía - se requiere revisión manual.",
+                    "error": "empty_vlm_response",
+                    "validation_error": True
+                }
             
-            # Si hay conflicto, ser más estricto
-            if is_invalid:
-                is_valid = False
+            is_valid = self.parse_verdict(response)
             
             validation_result = {
                 "es_tomografia_cerebral": is_valid,
@@ -110,6 +126,13 @@ class MedicalImageValidator:
             
             logger.info(f"Resultado de validación: {is_valid}")
             logger.info(f"Respuesta original: {response.strip()}")
+
+            # Solo se cachean veredictos explícitos (SÍ/NO): una respuesta ambigua no debe
+            # quedar fijada como rechazo durante todo el TTL de la caché
+            if self.is_explicit_verdict(response):
+                await validation_cache.set(cache_key, is_valid, validation_result)
+            else:
+                logger.warning("Respuesta del VLM sin SÍ/NO explícito: no se guarda en caché")
             
             return is_valid, validation_result
             
@@ -125,6 +148,30 @@ class MedicalImageValidator:
                 "validation_error": True
             }
     
+    @staticmethod
+    def is_explicit_verdict(response: str) -> bool:
+        """La respuesta contiene un SÍ/NO explícito (y no solo palabras sueltas)"""
+        return bool(EXPLICIT_VERDICT.search(response or ""))
+    
+    @staticmethod
+    def parse_verdict(response: str) -> bool:
+        """Interpretar la respuesta SÍ/NO del VLM"""
+        # Analizar respuesta simple
+        response_lower = response.lower().strip()
+        
+        # Buscar respuestas afirmativas
+        is_valid = any(keyword in response_lower for keyword in [
+            "sí", "si", "yes", "true", "correcto", "correcta", "es una", "tomografía", "ct", "cerebral"
+        ])
+        
+        # Buscar respuestas negativas
+        is_invalid = any(keyword in response_lower for keyword in [
+            "no", "false", "incorrecto", "incorrecta", "no es", "no es una"
+        ])
+        
+        # Si hay conflicto, ser más estricto
+        return is_valid and not is_invalid
+    
     def _parse_text_response(self, response: str) -> Dict[str, Any]:
         """
         Parsea una respuesta de texto del VLM para extraer información de validación.
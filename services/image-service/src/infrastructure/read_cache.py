@@ -0,0 +1,245 @@
+import os
+import asyncio
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TieredReadCache:
+    """Caché de lectura en dos niveles delante del almacenamiento remoto (S3).
+
+    Nivel 1: LRU en memoria acotada por bytes para las imágenes calientes.
+    Nivel 2: LRU en disco local acotada por bytes, que sobrevive a reinicios.
+    Las claves identifican el contenido (hash del blob o ETag del objeto), así
+    que una entrada nunca queda obsoleta: si el objeto cambia, cambia la clave.
+    Las lecturas concurrentes de la misma clave comparten una sola descarga.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("READ_CACHE_ENABLED", "true").lower() == "true"
+        self.memory_max_bytes = int(os.getenv("READ_CACHE_MEMORY_BYTES", str(256 * 1024 * 1024)))
+        # Objetos mayores no entran en memoria (solo en disco) para no vaciar el nivel 1
+        self.memory_max_object_bytes = int(os.getenv("READ_CACHE_MEMORY_MAX_OBJECT_BYTES", str(32 * 1024 * 1024)))
+        self.disk_max_bytes = int(os.getenv("READ_CACHE_DISK_BYTES", str(2 * 1024 * 1024 * 1024)))
+        self.disk_dir = os.getenv("READ_CACHE_DIR", os.path.join(tempfile.gettempdir(), "image-service-read-cache"))
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_ready = False
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {
+            "memory_hits": 0, "disk_hits": 0, "misses": 0,
+            "bytes_from_memory": 0, "bytes_from_disk": 0, "bytes_from_origin": 0,
+            "memory_evictions": 0, "disk_evictions": 0,
+        }
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Devolver el objeto desde memoria, disco o, si no está, cargarlo con loader y guardarlo"""
+        if not self.enabled:
+            return await loader()
+        data = self._memory_get(key)
+        if data is not None:
+            return data
+
+        loop = asyncio.get_running_loop()
+        future = self._inflight.get(key)
+        if future is None or future.get_loop() is not loop:
+            future = loop.create_task(self._load(key, loader))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._inflight.pop(key, None) if self._inflight.get(key) is f else None)
+        # shield: si una petición se cancela, la descarga sigue para las demás que la esperan
+        return await asyncio.shield(future)
+
+    async def put(self, key: str, data: bytes) -> None:
+        """Guardar un objeto recién escrito (write-through) en ambos niveles"""
+        if not self.enabled:
+            return
+        self._memory_put(key, data)
+        await self._disk_put(key, data)
+
+    async def discard(self, key: str) -> None:
+        """Eliminar una entrada de ambos niveles (p. ej. al borrar el objeto)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            data = self._memory.pop(key, None)
+            if data is not None:
+                self._memory_bytes -= len(data)
+            size = self._disk.pop(self._disk_name(key), None)
+            if size is not None:
+                self._disk_bytes -= size
+        await asyncio.to_thread(self._remove_file, self._disk_path(self._disk_name(key)))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores de aciertos/fallos por nivel, bytes servidos y ocupación"""
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[bytes]]) -> bytes:
+        data = await self._disk_get(key)
+        if data is not None:
+            self._memory_put(key, data)
+            return data
+        data = await loader()
+        self.stats["misses"] += 1
+        self.stats["bytes_from_origin"] += len(data)
+        self._memory_put(key, data)
+        await self._disk_put(key, data)
+        return data
+
+    def _memory_get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is None:
+                return None
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            self.stats["bytes_from_memory"] += len(data)
+            return data
+
+    def _memory_put(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_max_object_bytes or len(data) > self.memory_max_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.memory_max_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+                self.stats["memory_evictions"] += 1
+
+    @staticmethod
+    def _disk_name(key: str) -> str:
+        # El nombre del fichero es el hash de la clave: válido en cualquier sistema de ficheros
+        # y recuperable tras un reinicio sin guardar un índice aparte
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, name: str) -> str:
+        return os.path.join(self.disk_dir, name[:2], name)
+
+    async def _disk_get(self, key: str) -> Optional[bytes]:
+        if self.disk_max_bytes <= 0:
+            return None
+        await self._ensure_disk_index()
+        name = self._disk_name(key)
+        with self._lock:
+            if name not in self._disk:
+                return None
+            self._disk.move_to_end(name)
+        try:
+            data = await asyncio.to_thread(self._read_file, self._disk_path(name))
+        except OSError as e:
+            logger.warning(f"[READ_CACHE] Entrada de disco ilegible, se descarta: {e}")
+            with self._lock:
+                size = self._disk.pop(name, None)
+                if size is not None:
+                    self._disk_bytes -= size
+            return None
+        self.stats["disk_hits"] += 1
+        self.stats["bytes_from_disk"] += len(data)
+        return data
+
+    async def _disk_put(self, key: str, data: bytes) -> None:
+        if len(data) > self.disk_max_bytes:
+            return
+        await self._ensure_disk_index()
+        name = self._disk_name(key)
+        try:
+            await asyncio.to_thread(self._write_file, self._disk_path(name), data)
+        except OSError as e:
+            # La caché es un acelerador: un disco lleno o sin permisos no debe romper la lectura
+            logger.warning(f"[READ_CACHE] No se pudo guardar en disco: {e}")
+            return
+        evicted = []
+        with self._lock:
+            previous = self._disk.pop(name, None)
+            if previous is not None:
+                self._disk_bytes -= previous
+            self._disk[name] = len(data)
+            self._disk_bytes += len(data)
+            while self._disk_bytes > self.disk_max_bytes:
+                old_name, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                self.stats["disk_evictions"] += 1
+                evicted.append(self._disk_path(old_name))
+        for old_path in evicted:
+            await asyncio.to_thread(self._remove_file, old_path)
+
+    async def _ensure_disk_index(self) -> None:
+        if not self._disk_ready:
+            await asyncio.to_thread(self._build_disk_index)
+
+    def _build_disk_index(self) -> None:
+        """Recuperar las entradas de disco de ejecuciones anteriores (más antiguas primero)"""
+        with self._lock:
+            if self._disk_ready:
+                return
+            os.makedirs(self.disk_dir, exist_ok=True)
+            entries = []
+            for root, _, files in os.walk(self.disk_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if name.endswith(".tmp"):
+                        self._remove_file(path)
+                        continue
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, name, st.st_size))
+            for _, name, size in sorted(entries):
+                self._disk[name] = size
+                self._disk_bytes += size
+            self._disk_ready = True
+
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        with open(path, "rb") as f:
+            data = f.read()
+        # Marca de uso para ordenar la LRU si el proceso se reinicia
+        os.utime(path)
+        return data
+
+    @staticmethod
+    def _write_file(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            TieredReadCache._remove_file(tmp_path)
+            raise
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"[READ_CACHE] No se pudo eliminar {path}: {e}")
+
+
+# Instancia global de la caché de lectura
+read_cache = TieredReadCache()
@@ -1,13 +1,20 @@
 from typing import List
 from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
 from domain.entities.ChatMessage import ChatMessage
 from domain.repositories.ChatRepository import ChatRepository
 from infrastructure.database import database
 
 
 class MongoChatRepository(ChatRepository):
+    COLLECTION = "image_chats"
+    # get_history: filtro por imagen y usuario, orden por timestamp
+    INDEXES = [
+        IndexModel([("image_id", ASCENDING), ("user_id", ASCENDING), ("timestamp", ASCENDING)], name="image_user_timestamp"),
+    ]
+
     def __init__(self):
-        self.collection = database.get_collection("image_chats")
+        self.collection = database.get_collection(self.COLLECTION)
 
     async def add_message(self, message: ChatMessage) -> ChatMessage:
         doc = message.model_dump(by_alias=True)
@@ -1,12 +1,53 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from domain.entities.Image import Image
 from domain.repositories.ImageRepository import ImageRepository
 from infrastructure.database import database
 
+# Campos que necesitan las vistas de listado (sin el resto de metadatos: predicción, tiempos, validación)
+LIST_PROJECTION = {
+    "filename": 1,
+    "original_filename": 1,
+    "file_path": 1,
+    "file_size": 1,
+    "mime_type": 1,
+    "width": 1,
+    "height": 1,
+    "user_id": 1,
+    "upload_date": 1,
+    "processing_status": 1,
+    "metadata.content_hash": 1,
+    "metadata.medical_validation.status": 1,
+}
+
+# Campos de ImageResponse: los listados servidos como documentos no necesitan file_path
+RESPONSE_PROJECTION = {field: 1 for field in LIST_PROJECTION if field != "file_path"}
+
+# Orden de los listados: más recientes primero, _id como desempate estable
+LIST_SORT = [("upload_date", DESCENDING), ("_id", DESCENDING)]
+
 class MongoImageRepository(ImageRepository):
+    COLLECTION = "images"
+    # Índices que necesitan las consultas del repositorio (los crea infrastructure.indexes al arrancar)
+    INDEXES = [
+        # find_page / find_by_user_id / count por usuario
+        IndexModel([("user_id", ASCENDING), ("upload_date", DESCENDING), ("_id", DESCENDING)], name="user_upload_date"),
+        # find_page sin usuario
+        IndexModel([("upload_date", DESCENDING), ("_id", DESCENDING)], name="upload_date"),
+        # find_by_status / exportación por estado (mismo orden que los listados)
+        IndexModel([("processing_status", ASCENDING), ("upload_date", DESCENDING), ("_id", DESCENDING)],
+                   name="status_upload_date"),
+        # iter_file_paths (reconciliación con el almacenamiento) y count_by_file_path (referencias a un blob)
+        IndexModel([("file_path", ASCENDING)], name="file_path"),
+        # find_by_validation_job: un job de validación asíncrona guarda como mucho una imagen
+        IndexModel([("metadata.validation_job_id", ASCENDING)], name="validation_job_id", unique=True,
+                   partialFilterExpression={"metadata.validation_job_id": {"$exists": True}}),
+    ]
+
     def __init__(self):
-        self.collection = database.get_collection("images")
+        self.collection = database.get_collection(self.COLLECTION)
     
     async def save(self, image: Image) -> Image:
         """Guardar una imagen en MongoDB"""
@@ -19,6 +60,22 @@ class MongoImageRepository(ImageRepository):
         image.id = str(result.inserted_id)
         return image
     
+    async def save_many(self, images: List[Image]) -> List[Image]:
+        """Guardar varias imágenes con un único insert_many"""
+        if not images:
+            return []
+        docs = []
+        for image in images:
+            image_dict = image.model_dump(by_alias=True)
+            if image_dict.get("_id") is None:
+                image_dict["_id"] = ObjectId()
+            docs.append(image_dict)
+        
+        result = await self.collection.insert_many(docs, ordered=False)
+        for image, inserted_id in zip(images, result.inserted_ids):
+            image.id = str(inserted_id)
+        return images
+    
     async def find_by_id(self, image_id: str) -> Optional[Image]:
         """Buscar una imagen por su ID"""
         try:
@@ -51,6 +108,69 @@ class MongoImageRepository(ImageRepository):
             images.append(Image.model_validate(doc))
         return images
     
+    @staticmethod
+    def _page_query(user_id: Optional[str], after: Optional[Tuple[datetime, str]], status: Optional[str] = None,
+                    date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> Dict[str, Any]:
+        query: Dict[str, Any] = {"user_id": user_id} if user_id else {}
+        if status:
+            query["processing_status"] = status
+        if date_from or date_to:
+            query["upload_date"] = {}
+            if date_from:
+                query["upload_date"]["$gte"] = date_from
+            if date_to:
+                query["upload_date"]["$lt"] = date_to
+        if after is not None:
+            upload_date, image_id = after
+            query["$or"] = [
+                {"upload_date": {"$lt": upload_date}},
+                {"upload_date": upload_date, "_id": {"$lt": ObjectId(image_id)}},
+            ]
+        return query
+    
+    @staticmethod
+    def _response_document(doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Documento proyectado con la forma de ImageResponse, sin validarlo con Pydantic"""
+        doc["id"] = str(doc.pop("_id"))
+        doc.setdefault("width", None)
+        doc.setdefault("height", None)
+        doc.setdefault("metadata", None)
+        return doc
+    
+    async def find_page(self, user_id: Optional[str], limit: int, after: Optional[Tuple[datetime, str]] = None,
+                        skip: int = 0) -> List[Image]:
+        """Página de imágenes (más recientes primero) tras la posición (upload_date, id) dada.
+
+        Con el índice (user_id, upload_date, _id) el coste no depende de la profundidad de la página.
+        """
+        cursor = self.collection.find(self._page_query(user_id, after), LIST_PROJECTION,
+                                      sort=LIST_SORT, skip=skip, limit=limit)
+        images = []
+        async for doc in cursor:
+            doc["_id"] = str(doc["_id"])
+            images.append(Image.model_validate(doc))
+        return images
+    
+    async def find_page_documents(self, user_id: Optional[str], limit: int,
+                                  after: Optional[Tuple[datetime, str]] = None, skip: int = 0,
+                                  status: Optional[str] = None, date_from: Optional[datetime] = None,
+                                  date_to: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Como find_page, pero devuelve los documentos listos para serializar (lectura de confianza).
+
+        Admite además filtro por estado y rango [date_from, date_to) de upload_date.
+        """
+        query = self._page_query(user_id, after, status=status, date_from=date_from, date_to=date_to)
+        cursor = self.collection.find(query, RESPONSE_PROJECTION, sort=LIST_SORT, skip=skip, limit=limit,
+                                      batch_size=limit)
+        return [self._response_document(doc) async for doc in cursor]
+    
+    async def count(self, user_id: Optional[str] = None) -> int:
+        """Total de imágenes (de un usuario o de toda la colección)"""
+        if user_id:
+            return await self.collection.count_documents({"user_id": user_id})
+        # Sin filtro basta con los metadatos de la colección
+        return await self.collection.estimated_document_count()
+    
     async def update(self, image_id: str, image_data: dict) -> Optional[Image]:
         """Actualizar una imagen"""
         try:
@@ -80,4 +200,32 @@ class MongoImageRepository(ImageRepository):
             # Convertir ObjectId a string
             doc["_id"] = str(doc["_id"])
             images.append(Image.model_validate(doc))
-        return images 
\ No newline at end of file
+        return images
+    
+    async def find_by_status_documents(self, status: str, limit: int = 0) -> List[Dict[str, Any]]:
+        """Como find_by_status, pero devuelve los documentos listos para serializar (más recientes primero)"""
+        return await self.find_page_documents(None, limit, status=status)
+    
+    async def find_by_validation_job(self, job_id: str) -> Optional[Image]:
+        """Buscar la imagen guardada por un job de validación asíncrona"""
+        doc = await self.collection.find_one({"metadata.validation_job_id": job_id})
+        if doc is None:
+            return None
+        doc["_id"] = str(doc["_id"])
+        return Image.model_validate(doc)
+    
+    async def count_by_file_path(self, file_path: str) -> int:
+        """Contar las imágenes que referencian un archivo (blob deduplicado) por su ruta"""
+        return await self.collection.count_documents({"file_path": file_path})
+    
+    async def iter_file_paths(self, prefix: str, batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """Recorrer por lotes las rutas de las imágenes bajo un prefijo, en el orden de file_path"""
+        cursor = self.collection.find(
+            {"file_path": {"$gte": prefix, "$lt": prefix + "\uffff"}},
+            {"file_path": 1, "upload_date": 1},
+            sort=[("file_path", 1)],
+            batch_size=batch_size,
+            allow_disk_use=True,
+        )
+        async for doc in cursor:
+            yield {"id": str(doc["_id"]), "file_path": doc["file_path"], "upload_date": doc.get("upload_date")}
@@ -0,0 +1,99 @@
+import os
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Estados en los que el procesamiento ya no cambia
+TERMINAL_STATUSES = {"completed", "failed"}
+
+
+class StatusHub:
+    """Pub/sub en proceso para los cambios de estado de procesamiento de las imágenes.
+
+    Los suscriptores (conexiones SSE) reciben eventos por imagen (`image:<id>`) o
+    por usuario (`user:<id>`). Los cambios hechos en este proceso se publican
+    directamente; los de otros procesos (workers de Kafka, otras réplicas) llegan
+    por un change stream de Mongo si STATUS_HUB_CHANGE_STREAMS=true (requiere replica set).
+    """
+
+    def __init__(self):
+        self.queue_size = int(os.getenv("STATUS_HUB_QUEUE_SIZE", "32"))
+        self.use_change_streams = os.getenv("STATUS_HUB_CHANGE_STREAMS", "false").lower() == "true"
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._watch_task: Optional[asyncio.Task] = None
+        self._stats = {"published": 0, "delivered": 0, "dropped": 0}
+
+    async def start(self, collection: Any, to_event: Callable[[Dict[str, Any]], Dict[str, Any]]) -> None:
+        """Arrancar el change stream de `images` (si está habilitado)"""
+        if self.use_change_streams and self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch(collection, to_event))
+
+    async def stop(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            await asyncio.gather(self._watch_task, return_exceptions=True)
+            self._watch_task = None
+
+    def subscribe(self, key: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(key, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, key: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(key)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[key]
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        """Entregar un evento a los suscriptores de su imagen y de su usuario (no bloquea)"""
+        self._stats["published"] += 1
+        keys = [f"image:{event.get('image_id')}"]
+        if event.get("user_id"):
+            keys.append(f"user:{event['user_id']}")
+        for key in keys:
+            for queue in list(self._subscribers.get(key, ())):
+                if queue.full():
+                    # Cliente lento: se descarta el evento más antiguo, el último estado es el que importa
+                    queue.get_nowait()
+                    self._stats["dropped"] += 1
+                queue.put_nowait(event)
+                self._stats["delivered"] += 1
+
+    def publish_local(self, event: Dict[str, Any]) -> None:
+        """Publicar un cambio hecho en este proceso (si hay change stream, ya llegará por él)"""
+        if self._watch_task is None:
+            self.publish(event)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "change_streams": self._watch_task is not None,
+        }
+
+    async def _watch(self, collection: Any, to_event: Callable[[Dict[str, Any]], Dict[str, Any]]) -> None:
+        pipeline = [{"$match": {"$or": [
+            {"operationType": "insert"},
+            {"operationType": "update", "updateDescription.updatedFields.processing_status": {"$exists": True}},
+        ]}}]
+        while True:
+            try:
+                async with collection.watch(pipeline, full_document="updateLookup") as stream:
+                    logger.info("[STATUS_HUB] Change stream de 'images' activo")
+                    async for change in stream:
+                        doc = change.get("fullDocument")
+                        if doc:
+                            self.publish(to_event(doc))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[STATUS_HUB] Change stream interrumpido, reintentando: {e}")
+                await asyncio.sleep(5)
+
+
+# Instancia global del hub de estados
+status_hub = StatusHub()
@@ -1,17 +1,95 @@
 import os
+import io
+import re
+import time
 import uuid
+import base64
+import asyncio
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
 import aiofiles
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 from PIL import Image as PILImage
-import io
+from infrastructure.dicom import is_dicom, read_header
+from infrastructure.storage_backends import StorageBackend, S3StorageBackend, backend_for_path, get_backend, MEMORY_SCHEME
+from infrastructure.read_cache import read_cache
 from dotenv import load_dotenv
-import boto3
-from botocore.client import Config as BotoConfig
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Tamaño de bloque para la lectura de subidas en streaming
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+# Objetos direccionados por contenido: el nombre empieza por el SHA-256 (blobs y sus derivados)
+CONTENT_ADDRESSED_NAME = re.compile(r"^[0-9a-f]{64}(\.|$)")
+
+
+class StagedUpload:
+    """Subida volcada a un archivo temporal, con hash y tamaño ya calculados"""
+    def __init__(self, path: str, content_hash: str, size: int, file_extension: str):
+        self.path = path
+        self.content_hash = content_hash
+        self.size = size
+        self.file_extension = file_extension
+
+class PresignedUrlCache:
+    """URLs prefirmadas reutilizadas por objeto hasta poco antes de caducar (LRU acotada).
+
+    Firmar es barato, pero una URL estable permite al navegador y a las cachés
+    intermedias reutilizar la descarga en lugar de ver una URL nueva cada vez.
+    """
+
+    def __init__(self, max_entries: int, refresh_margin: int):
+        self.max_entries = max_entries
+        self.refresh_margin = refresh_margin
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key: Tuple[str, int]) -> Optional[Tuple[str, int]]:
+        """(url, segundos de validez restantes) si la URL cacheada sigue siendo utilizable"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                remaining = entry[1] - time.monotonic()
+                if remaining > self.refresh_margin:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[0], int(remaining)
+                del self._entries[key]
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: Tuple[str, int], url: str, expires_in: int) -> None:
+        with self._lock:
+            self._entries[key] = (url, time.monotonic() + expires_in)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "entries": len(self._entries)}
+
+
+# Una URL prefirmada se renueva cuando le quedan menos de estos segundos de validez
+PRESIGNED_URL_REFRESH_SECONDS = int(os.getenv("PRESIGNED_URL_REFRESH_SECONDS", "300"))
+
+# Caché de URLs prefirmadas de descarga compartida por proceso
+presigned_url_cache = PresignedUrlCache(
+    max_entries=int(os.getenv("PRESIGNED_URL_CACHE_SIZE", "10000")),
+    refresh_margin=PRESIGNED_URL_REFRESH_SECONDS,
+)
+
 class StorageService:
+    # Métricas de deduplicación compartidas por proceso
+    dedup_stats = {"uploads": 0, "deduplicated": 0, "bytes_received": 0, "bytes_written": 0}
+
     def __init__(self):
         self.storage_type = os.getenv("STORAGE_TYPE", "local")
         self.local_storage_path = os.getenv("LOCAL_STORAGE_PATH", "./storage")
@@ -20,12 +98,17 @@ class StorageService:
         self.s3_prefix = os.getenv("S3_PREFIX", "").strip()
         if self.s3_prefix and not self.s3_prefix.endswith("/"):
             self.s3_prefix += "/"
+        # Backend de las escrituras nuevas (compartido por proceso: un solo cliente S3)
+        self.backend: StorageBackend = get_backend(self.storage_type)
         if self.storage_type == "s3":
-            self.s3_client = boto3.client(
-                "s3",
-                region_name=os.getenv("AWS_REGION", os.getenv("AWS_DEFAULT_REGION", None)),
-                config=BotoConfig(signature_version="s3v4")
-            )
+            self.s3_client = self.backend.client
+            # Subidas directas del cliente: POST prefirmado (formulario) o PUT prefirmado
+            self.s3_upload_method = os.getenv("S3_UPLOAD_METHOD", "post").lower()
+        # Los temporales de subida viven junto al almacenamiento local para poder moverlos con os.replace
+        if self.storage_type == "local":
+            self.upload_tmp_dir = os.path.join(self.local_storage_path, "staging")
+        else:
+            self.upload_tmp_dir = os.getenv("UPLOAD_TMP_DIR", tempfile.gettempdir())
         self._ensure_storage_directory()
     
     def _ensure_storage_directory(self):
@@ -34,63 +117,367 @@ class StorageService:
             os.makedirs(self.local_storage_path, exist_ok=True)
             os.makedirs(os.path.join(self.local_storage_path, "images"), exist_ok=True)
             os.makedirs(os.path.join(self.local_storage_path, "staging"), exist_ok=True)
-    
-    async def save_image(self, file_content: bytes, original_filename: str, user_id: str) -> Tuple[str, dict]:
-        import logging
-        logger = logging.getLogger(__name__)
+            os.makedirs(os.path.join(self.local_storage_path, "blobs"), exist_ok=True)
+
+    @staticmethod
+    def compute_content_hash(file_content: bytes) -> str:
+        """SHA-256 del contenido (clave del almacenamiento direccionado por contenido)"""
+        return hashlib.sha256(file_content).hexdigest()
+
+    @staticmethod
+    def _blob_relpath(content_hash: str, file_extension: str) -> str:
+        """Ruta relativa del blob con reparto por prefijo del hash: blobs/ab/cd/<hash><ext>"""
+        return f"blobs/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}{file_extension}"
+
+    def _location(self, relpath: str) -> str:
+        """Ruta completa de un objeto (s3://bucket/key, memory://key o ruta local)"""
+        if self.storage_type == "s3":
+            return f"s3://{self.s3_bucket}/{self.s3_prefix}{relpath}"
+        if self.storage_type == "memory":
+            return f"{MEMORY_SCHEME}{relpath}"
+        return os.path.join(self.local_storage_path, *relpath.split("/"))
+
+    def _blob_location(self, content_hash: str, file_extension: str) -> str:
+        """Ruta completa del blob"""
+        return self._location(self._blob_relpath(content_hash, file_extension))
+
+    @staticmethod
+    def backend_for(file_path: str) -> StorageBackend:
+        """Backend de una ruta guardada (las rutas antiguas pueden ser de otro tipo que el actual)"""
+        return backend_for_path(file_path)
+
+    async def exists(self, file_path: str) -> bool:
+        """Comprobar si el objeto ya está almacenado"""
+        return await self.backend_for(file_path).exists(file_path)
+
+    async def read(self, file_path: str) -> bytes:
+        """Leer un objeto completo sin bloquear el event loop.
+
+        Los objetos de S3 pasan por la caché de lectura (memoria + disco local);
+        el disco local y la memoria ya se sirven desde RAM/page cache.
+        """
+        backend = self.backend_for(file_path)
+        if not isinstance(backend, S3StorageBackend) or not read_cache.enabled:
+            return await backend.read(file_path)
+        key = self._read_cache_key(file_path)
+        if key is None:
+            # Objeto no direccionado por contenido: el ETag identifica su versión
+            stat = await backend.stat(file_path)
+            if stat is None or not stat.get("etag"):
+                return await backend.read(file_path)
+            key = f"{file_path}@{stat['etag']}"
+        return await read_cache.get_or_load(key, lambda: backend.read(file_path))
+
+    async def read_view(self, file_path: str) -> memoryview:
+        """Vista del objeto; en disco local es un mmap (sin copia)"""
+        backend = self.backend_for(file_path)
+        if isinstance(backend, S3StorageBackend):
+            return memoryview(await self.read(file_path))
+        return await backend.read_view(file_path)
+
+    @staticmethod
+    def _read_cache_key(file_path: str) -> Optional[str]:
+        """Clave de caché de un objeto inmutable (su nombre contiene el hash del contenido)"""
+        name = file_path.rsplit("/", 1)[-1]
+        return f"blob:{name}" if CONTENT_ADDRESSED_NAME.match(name) else None
+
+    async def read_range(self, file_path: str, start: int, end: Optional[int] = None) -> bytes:
+        """Leer los bytes [start, end] (end inclusivo) de un objeto"""
+        return await self.backend_for(file_path).read_range(file_path, start, end)
+
+    def stream(self, file_path: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Recorrer un objeto (o un rango) por bloques"""
+        return self.backend_for(file_path).stream(file_path, start, end)
+
+    async def save_image(self, file_content: bytes, original_filename: str, user_id: str,
+                         dimensions: Optional[Tuple[Optional[int], Optional[int]]] = None) -> Tuple[str, dict]:
+        """Guardar una imagen (deduplicada por contenido) y retornar información del archivo"""
         logger.info(f"[STORAGE] Guardando imagen para user_id={user_id}, original_filename={original_filename}")
-        """Guardar una imagen y retornar información del archivo"""
-        # Generar nombre único para el archivo
+        # El nombre del archivo es el hash del contenido: mismos bytes, mismo blob
         file_extension = os.path.splitext(original_filename)[1].lower()
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        logger.info(f"[STORAGE] Nombre único generado: {unique_filename}")
+        content_hash = self.compute_content_hash(file_content)
+        file_path = self._blob_location(content_hash, file_extension)
 
-        if self.storage_type == "s3":
-            key = f"{self.s3_prefix}images/{user_id}/{unique_filename}"
-            content_type = self._get_mime_type(file_extension)
-            self.s3_client.put_object(
-                Bucket=self.s3_bucket,
-                Key=key,
-                Body=file_content,
-                ContentType=content_type
+        deduplicated = await self.exists(file_path)
+        if deduplicated:
+            logger.info(f"[STORAGE] Contenido ya almacenado, se reutiliza el blob: {file_path}")
+        else:
+            await self.write_bytes(file_path, file_content, self._get_mime_type(file_extension))
+            logger.info(f"[STORAGE] Archivo guardado: {file_path}")
+
+        width, height = dimensions if dimensions else await self._get_image_dimensions(file_content)
+        return self._build_file_info(
+            original_filename, file_extension, file_path, len(file_content), content_hash, deduplicated, width, height
+        )
+
+    async def write_bytes(self, file_path: str, data: bytes, content_type: str) -> None:
+        """Escribir un objeto inmutable (en disco, escritura atómica)"""
+        backend = self.backend_for(file_path)
+        await backend.write(file_path, data, content_type)
+        key = self._read_cache_key(file_path)
+        if isinstance(backend, S3StorageBackend) and key is not None:
+            # Derivados recién generados: la siguiente lectura no vuelve a S3
+            await read_cache.put(key, data)
+
+    async def stage_stream(self, chunks: AsyncIterator[bytes], original_filename: str) -> StagedUpload:
+        """Volcar una subida por bloques a un archivo temporal, calculando hash y tamaño de forma incremental.
+
+        Lanza ValueError si se supera el tamaño máximo; en ese caso el temporal se elimina.
+        """
+        file_extension = os.path.splitext(original_filename)[1].lower()
+        os.makedirs(self.upload_tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(self.upload_tmp_dir, f"{uuid.uuid4().hex}{file_extension}.part")
+        hasher = hashlib.sha256()
+        size = 0
+        max_size = self.get_max_file_size()
+        try:
+            async with aiofiles.open(tmp_path, 'wb') as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_size:
+                        raise ValueError("El archivo es demasiado grande")
+                    hasher.update(chunk)
+                    await f.write(chunk)
+        except BaseException:
+            self.discard_staged_path(tmp_path)
+            raise
+        return StagedUpload(tmp_path, hasher.hexdigest(), size, file_extension)
+
+    def stage_fileobj(self, fileobj, original_filename: str) -> StagedUpload:
+        """Variante síncrona de stage_stream para objetos tipo archivo (entradas de ZIP/TAR).
+
+        Pensada para ejecutarse en un hilo; lanza ValueError si se supera el tamaño máximo.
+        """
+        file_extension = os.path.splitext(original_filename)[1].lower()
+        os.makedirs(self.upload_tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(self.upload_tmp_dir, f"{uuid.uuid4().hex}{file_extension}.part")
+        hasher = hashlib.sha256()
+        size = 0
+        max_size = self.get_max_file_size()
+        try:
+            with open(tmp_path, 'wb') as f:
+                while True:
+                    chunk = fileobj.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_size:
+                        raise ValueError("El archivo es demasiado grande")
+                    hasher.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            self.discard_staged_path(tmp_path)
+            raise
+        return StagedUpload(tmp_path, hasher.hexdigest(), size, file_extension)
+
+    async def save_staged(self, staged: StagedUpload, original_filename: str, user_id: str,
+                          dimensions: Optional[Tuple[Optional[int], Optional[int]]] = None) -> Tuple[str, dict]:
+        """Mover una subida preparada con stage_stream a su blob definitivo"""
+        logger.info(f"[STORAGE] Guardando subida por bloques para user_id={user_id}, original_filename={original_filename}")
+        file_path = self._blob_location(staged.content_hash, staged.file_extension)
+        # Las dimensiones se leen de la cabecera, sin decodificar la imagen completa
+        # (en un hilo: PIL y la cabecera DICOM se leen con E/S síncrona)
+        width, height = dimensions if dimensions else await asyncio.to_thread(
+            self._get_image_dimensions_from_path, staged.path
+        )
+
+        deduplicated = await self.exists(file_path)
+        if deduplicated:
+            logger.info(f"[STORAGE] Contenido ya almacenado, se reutiliza el blob: {file_path}")
+            self.discard_staged_path(staged.path)
+        else:
+            # En disco se mueve el temporal; en S3 se sube por multipart con partes en paralelo
+            try:
+                await self.backend_for(file_path).write_file(
+                    file_path, staged.path, self._get_mime_type(staged.file_extension)
+                )
+            finally:
+                self.discard_staged_path(staged.path)
+            logger.info(f"[STORAGE] Archivo guardado: {file_path}")
+
+        return self._build_file_info(
+            original_filename, staged.file_extension, file_path, staged.size, staged.content_hash, deduplicated, width, height
+        )
+
+    def staging_location(self, name: str) -> str:
+        """Ruta de un temporal de validación asíncrona visible para los workers.
+
+        En local es el staging del propio almacenamiento (mismo volumen que los
+        blobs); con S3 es un objeto bajo staging/, porque el directorio temporal
+        del sistema es de cada pod.
+        """
+        if self.storage_type == "local":
+            return os.path.join(self.upload_tmp_dir, name)
+        return self._location(f"staging/{name}")
+
+    async def share_staged(self, staged: StagedUpload, name: str) -> str:
+        """Publicar una subida preparada en el staging compartido y devolver su ruta"""
+        location = self.staging_location(f"{name}{staged.file_extension}")
+        try:
+            await self.backend_for(location).write_file(
+                location, staged.path, self._get_mime_type(staged.file_extension)
             )
-            file_path = f"s3://{self.s3_bucket}/{key}"
-            logger.info(f"[STORAGE] Archivo subido a S3: {file_path}")
+        finally:
+            self.discard_staged_path(staged.path)
+        return location
+
+    async def read_shared_staged(self, location: str) -> bytes:
+        """Leer un temporal compartido (sin pasar por la caché de lectura: se lee una vez)"""
+        return await self.backend_for(location).read(location)
+
+    async def discard_shared_staged(self, location: str) -> None:
+        """Eliminar un temporal compartido si existe"""
+        try:
+            await self.backend_for(location).delete(location)
+        except Exception as e:
+            logger.warning(f"[STORAGE] No se pudo eliminar el temporal {location}: {e}")
+
+    def uploads_location(self) -> str:
+        """Prefijo de los objetos de las sesiones de subida directa"""
+        if self.storage_type == "local":
+            return os.path.join(self.upload_tmp_dir, "uploads")
+        return self._location("uploads")
+
+    def upload_location(self, session_id: str, file_extension: str) -> str:
+        """Ruta del objeto de una sesión de subida directa (uploads/<session_id><ext>)"""
+        if self.storage_type == "local":
+            return os.path.join(self.uploads_location(), f"{session_id}{file_extension}")
+        return f"{self.uploads_location()}/{session_id}{file_extension}"
+
+    def create_presigned_upload(self, file_path: str, size: int, content_hash: str, content_type: str,
+                                expires_in: int = 900) -> Optional[Dict[str, Any]]:
+        """Destino prefirmado para que el cliente suba directamente a S3 (None en almacenamiento local).
+
+        El tamaño queda fijado por la política (POST) o por la firma (PUT) y el
+        SHA-256 declarado viaja como x-amz-checksum-sha256, que S3 comprueba al recibir.
+        """
+        if self.storage_type != "s3" or not file_path.startswith("s3://"):
+            return None
+        _, rest = file_path.split("s3://", 1)
+        bucket, key = rest.split("/", 1)
+        checksum = base64.b64encode(bytes.fromhex(content_hash)).decode()
+        if self.s3_upload_method == "put":
+            url = self.s3_client.generate_presigned_url(
+                "put_object",
+                Params={
+                    "Bucket": bucket,
+                    "Key": key,
+                    "ContentType": content_type,
+                    "ContentLength": size,
+                    "ChecksumSHA256": checksum,
+                },
+                ExpiresIn=expires_in,
+            )
+            return {
+                "method": "PUT",
+                "url": url,
+                "fields": {},
+                "headers": {"Content-Type": content_type, "x-amz-checksum-sha256": checksum},
+            }
+        post = self.s3_client.generate_presigned_post(
+            bucket,
+            key,
+            Fields={"Content-Type": content_type, "x-amz-checksum-sha256": checksum},
+            Conditions=[
+                {"Content-Type": content_type},
+                {"x-amz-checksum-sha256": checksum},
+                ["content-length-range", size, size],
+            ],
+            ExpiresIn=expires_in,
+        )
+        return {"method": "POST", "url": post["url"], "fields": post["fields"], "headers": {}}
+
+    async def stat(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """Tamaño, SHA-256 (si el almacén lo conserva), ETag y fecha de un objeto sin descargarlo.
+
+        HEAD en S3 y stat en disco; None si el objeto no existe.
+        """
+        return await self.backend_for(file_path).stat(file_path)
+
+    async def hash_object(self, file_path: str) -> str:
+        """SHA-256 de un objeto (cuando el almacén no conserva el checksum)"""
+        backend = self.backend_for(file_path)
+        if backend is get_backend("local"):
+            # Hash directamente sobre el mmap, sin copiar el archivo a memoria
+            view = await backend.read_view(file_path)
+            return await asyncio.to_thread(lambda: hashlib.sha256(view).hexdigest())
+        hasher = hashlib.sha256()
+        async for chunk in backend.stream(file_path):
+            hasher.update(chunk)
+        return hasher.hexdigest()
+
+    async def save_uploaded(self, upload_path: str, original_filename: str, size: int, content_hash: str,
+                            user_id: str) -> Tuple[str, dict]:
+        """Mover un objeto subido directamente (ya verificado) a su blob definitivo.
+
+        En S3 es una copia en el servidor: los bytes no pasan por el servicio.
+        """
+        logger.info(f"[STORAGE] Guardando subida directa para user_id={user_id}, original_filename={original_filename}")
+        file_extension = os.path.splitext(original_filename)[1].lower()
+        file_path = self._blob_location(content_hash, file_extension)
+        width, height = await self._get_uploaded_dimensions(upload_path)
+
+        deduplicated = await self.exists(file_path)
+        if deduplicated:
+            logger.info(f"[STORAGE] Contenido ya almacenado, se reutiliza el blob: {file_path}")
+            await self.delete_image(upload_path)
         else:
-            # Crear directorio para el usuario si no existe
-            user_dir = os.path.join(self.local_storage_path, "images", user_id)
-            os.makedirs(user_dir, exist_ok=True)
-            logger.info(f"[STORAGE] Directorio de usuario asegurado: {user_dir}")
-
-            # Ruta completa del archivo
-            file_path = os.path.join(user_dir, unique_filename)
-            logger.info(f"[STORAGE] Ruta completa del archivo: {file_path}")
-
-            # Guardar archivo
-            async with aiofiles.open(file_path, 'wb') as f:
-                await f.write(file_content)
-            logger.info(f"[STORAGE] Archivo guardado en disco: {file_path}")
-
-        # Obtener información del archivo
-        file_size = len(file_content)
-        mime_type = self._get_mime_type(file_extension)
-        logger.info(f"[STORAGE] Tamaño: {file_size}, MIME: {mime_type}")
+            await self.backend_for(file_path).move(upload_path, file_path, self._get_mime_type(file_extension))
+            logger.info(f"[STORAGE] Subida directa movida a su blob: {file_path}")
+
+        return self._build_file_info(
+            original_filename, file_extension, file_path, size, content_hash, deduplicated, width, height
+        )
+
+    async def _get_uploaded_dimensions(self, file_path: str) -> Tuple[Optional[int], Optional[int]]:
+        """Dimensiones de un objeto subido leyendo solo su cabecera (petición por rango)"""
+        if self.backend_for(file_path) is get_backend("local"):
+            return await asyncio.to_thread(self._get_image_dimensions_from_path, file_path)
+        try:
+            head = await self.read_range(file_path, 0, 65535)
+        except Exception:
+            return None, None
+        return await self._get_image_dimensions(head)
 
-        # Obtener dimensiones de la imagen
-        width, height = await self._get_image_dimensions(file_content)
-        logger.info(f"[STORAGE] Dimensiones: width={width}, height={height}")
+    async def read_staged(self, staged: StagedUpload) -> bytes:
+        """Leer el contenido completo de una subida preparada (solo si una etapa lo necesita)"""
+        async with aiofiles.open(staged.path, 'rb') as f:
+            return await f.read()
+
+    @staticmethod
+    def discard_staged_path(path: str) -> None:
+        """Eliminar un archivo temporal de subida si existe"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _build_file_info(self, original_filename: str, file_extension: str, file_path: str, file_size: int,
+                         content_hash: str, deduplicated: bool, width: Optional[int], height: Optional[int]) -> Tuple[str, dict]:
+        """Actualizar métricas y construir la información del archivo guardado"""
+        stats = StorageService.dedup_stats
+        stats["uploads"] += 1
+        stats["bytes_received"] += file_size
+        if deduplicated:
+            stats["deduplicated"] += 1
+        else:
+            stats["bytes_written"] += file_size
+
+        mime_type = self._get_mime_type(file_extension)
+        logger.info(f"[STORAGE] Tamaño: {file_size}, MIME: {mime_type}, dimensiones: width={width}, height={height}")
 
         # Crear metadata
         metadata = {
             "original_filename": original_filename,
             "file_extension": file_extension,
+            "content_hash": content_hash,
+            "deduplicated": deduplicated,
             "upload_timestamp": datetime.utcnow().isoformat(),
             "width": width,
             "height": height
         }
-        logger.info(f"[STORAGE] Metadata creada: {metadata}")
 
-        return unique_filename, {
+        return f"{content_hash}{file_extension}", {
             "file_path": file_path,
             "file_size": file_size,
             "mime_type": mime_type,
@@ -106,10 +493,24 @@ class StorageService:
     async def _get_image_dimensions(self, file_content: bytes) -> Tuple[Optional[int], Optional[int]]:
         """Obtener dimensiones de la imagen"""
         try:
+            if is_dicom(file_content):
+                header = read_header(file_content)
+                return header["columns"] or None, header["rows"] or None
             image = PILImage.open(io.BytesIO(file_content))
             return image.size
         except Exception:
             return None, None
+
+    def _get_image_dimensions_from_path(self, path: str) -> Tuple[Optional[int], Optional[int]]:
+        """Obtener dimensiones leyendo solo la cabecera del archivo"""
+        try:
+            if is_dicom(filename=path.removesuffix(".part")):
+                header = read_header(path)
+                return header["columns"] or None, header["rows"] or None
+            with PILImage.open(path) as image:
+                return image.size
+        except Exception:
+            return None, None
     
     def _get_mime_type(self, file_extension: str) -> str:
         """Obtener el tipo MIME basado en la extensión del archivo"""
@@ -127,52 +528,56 @@ class StorageService:
     async def delete_image(self, file_path: str) -> bool:
         """Eliminar una imagen del almacenamiento"""
         try:
-            if self.storage_type == "s3" and file_path.startswith("s3://"):
-                _, rest = file_path.split("s3://", 1)
-                bucket, key = rest.split("/", 1)
-                self.s3_client.delete_object(Bucket=bucket, Key=key)
-                return True
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                return True
-            return False
+            key = self._read_cache_key(file_path)
+            if key is not None:
+                await read_cache.discard(key)
+            return await self.backend_for(file_path).delete(file_path)
         except Exception:
             return False
     
+    @classmethod
+    def get_dedup_stats(cls) -> dict:
+        """Métricas de deduplicación del proceso"""
+        stats = cls.dedup_stats
+        return {
+            **stats,
+            "dedup_ratio": round(stats["deduplicated"] / stats["uploads"], 4) if stats["uploads"] else 0.0,
+            "bytes_saved": stats["bytes_received"] - stats["bytes_written"],
+        }
+
     async def get_image_path(self, filename: str, user_id: str) -> str:
         """Obtener la ruta completa de una imagen"""
-        if self.storage_type == "s3":
-            key = f"{self.s3_prefix}images/{user_id}/{filename}"
-            return f"s3://{self.s3_bucket}/{key}"
-        return os.path.join(self.local_storage_path, "images", user_id, filename)
+        content_hash, file_extension = os.path.splitext(filename)
+        if len(content_hash) == 64:
+            return self._blob_location(content_hash, file_extension)
+        return self._location(f"images/{user_id}/{filename}")
 
     def generate_presigned_url(self, file_path: str, expires_in: int = 3600) -> Optional[str]:
         """Generar URL prefirmada para descarga cuando STORAGE_TYPE=s3"""
+        presigned = self.presigned_download(file_path, expires_in)
+        return presigned[0] if presigned else None
+
+    def presigned_download(self, file_path: str, expires_in: int = 3600) -> Optional[Tuple[str, int]]:
+        """(URL prefirmada, segundos de validez restantes), reutilizando la URL cacheada del objeto"""
         try:
             if self.storage_type != "s3" or not file_path.startswith("s3://"):
                 return None
+            cache_key = (file_path, expires_in)
+            cached = presigned_url_cache.get(cache_key)
+            if cached is not None:
+                return cached
             _, rest = file_path.split("s3://", 1)
             bucket, key = rest.split("/", 1)
-            return self.s3_client.generate_presigned_url(
+            url = self.s3_client.generate_presigned_url(
                 "get_object",
                 Params={"Bucket": bucket, "Key": key},
                 ExpiresIn=expires_in
             )
+            presigned_url_cache.put(cache_key, url, expires_in)
+            return url, expires_in
         except Exception:
             return None
 
-    def read_bytes(self, file_path: str) -> bytes:
-        """Leer bytes del archivo desde S3 o almacenamiento local según corresponda."""
-        if self.storage_type == "s3" and file_path.startswith("s3://"):
-            # Parsear s3://bucket/key
-            _, rest = file_path.split("s3://", 1)
-            bucket, key = rest.split("/", 1)
-            obj = self.s3_client.get_object(Bucket=bucket, Key=key)
-            return obj["Body"].read()
-        # Local
-        with open(file_path, "rb") as f:
-            return f.read()
-    
     def is_valid_image_type(self, filename: str) -> bool:
         """Verificar si el archivo es un tipo de imagen válido"""
         valid_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.dcm'}
@@ -197,5 +602,5 @@ class StorageService:
         
         return staging_path
 
-# Instancia global del servicio de almacenamiento
+# Instancia global del servicio de almacenamiento (compartida por peticiones, casos de uso y workers)
 storage_service = StorageService()
@@ -0,0 +1,444 @@
+import os
+import mmap
+import base64
+import uuid
+import shutil
+import asyncio
+import itertools
+import logging
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import aiofiles
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.client import Config as BotoConfig
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de bloque de las lecturas en streaming
+STREAM_CHUNK_SIZE = int(os.getenv("STORAGE_STREAM_CHUNK_SIZE", str(1024 * 1024)))
+
+# Los objetos son inmutables (direccionados por contenido o derivados de uno)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Objetos por lote al recorrer un prefijo (una página de ListObjectsV2 como máximo)
+LIST_BATCH_SIZE = int(os.getenv("STORAGE_LIST_BATCH_SIZE", "1000"))
+
+S3_SCHEME = "s3://"
+MEMORY_SCHEME = "memory://"
+
+
+class StorageBackend(ABC):
+    """Interfaz asíncrona de un almacén de objetos.
+
+    Las rutas son las que se guardan en `Image.file_path`: s3://bucket/key,
+    memory://key o una ruta local. Los rangos siguen la semántica de HTTP Range
+    (`end` inclusivo); `end=None` llega hasta el final del objeto.
+    """
+
+    @abstractmethod
+    async def read(self, path: str) -> bytes:
+        """Leer el objeto completo"""
+        pass
+
+    @abstractmethod
+    async def read_range(self, path: str, start: int, end: Optional[int] = None) -> bytes:
+        """Leer solo los bytes [start, end] del objeto"""
+        pass
+
+    @abstractmethod
+    def stream(self, path: str, start: int = 0, end: Optional[int] = None,
+               chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Recorrer el objeto (o un rango) por bloques sin cargarlo entero"""
+        pass
+
+    @abstractmethod
+    async def write(self, path: str, data: bytes, content_type: str) -> None:
+        """Escribir un objeto inmutable (visible solo cuando está completo)"""
+        pass
+
+    @abstractmethod
+    async def write_file(self, path: str, local_path: str, content_type: str) -> None:
+        """Guardar un archivo local (p. ej. de staging) como objeto; el archivo puede consumirse"""
+        pass
+
+    @abstractmethod
+    async def move(self, source: str, destination: str, content_type: str) -> None:
+        """Mover un objeto dentro del almacén (en S3, copia en el servidor y borrado)"""
+        pass
+
+    @abstractmethod
+    async def exists(self, path: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def stat(self, path: str) -> Optional[Dict[str, Any]]:
+        """{size, sha256, etag, last_modified} sin leer el contenido; None si no existe.
+
+        sha256 solo se informa si el almacén lo conserva (checksum de S3).
+        """
+        pass
+
+    @abstractmethod
+    async def delete(self, path: str) -> bool:
+        pass
+
+    @abstractmethod
+    def list_objects(self, prefix: str, batch_size: int = LIST_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """Recorrer los objetos bajo un prefijo de directorio, por lotes y ordenados por ruta.
+
+        Cada objeto es {path, size, last_modified}; el orden es el lexicográfico de la
+        ruta completa, el mismo con el que Mongo ordena `file_path`.
+        """
+        pass
+
+    async def read_view(self, path: str) -> memoryview:
+        """Vista de solo lectura del objeto (sin copia en los almacenes que lo permiten)"""
+        return memoryview(await self.read(path))
+
+
+class LocalStorageBackend(StorageBackend):
+    """Disco local: lecturas por mmap (sin copia) y escrituras atómicas con os.replace"""
+
+    async def read(self, path: str) -> bytes:
+        async with aiofiles.open(path, "rb") as f:
+            return await f.read()
+
+    async def read_view(self, path: str) -> memoryview:
+        return await asyncio.to_thread(self._map, path)
+
+    @staticmethod
+    def _map(path: str) -> memoryview:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b"")
+            # La vista mantiene vivo el mapa; el descriptor puede cerrarse
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    async def read_range(self, path: str, start: int, end: Optional[int] = None) -> bytes:
+        view = await self.read_view(path)
+        # Solo se copian (y se leen del disco) las páginas del rango
+        return bytes(view[start:None if end is None else end + 1])
+
+    async def stream(self, path: str, start: int = 0, end: Optional[int] = None,
+                     chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        remaining = None if end is None else end - start + 1
+        async with aiofiles.open(path, "rb") as f:
+            if start:
+                await f.seek(start)
+            while remaining is None or remaining > 0:
+                chunk = await f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    async def write(self, path: str, data: bytes, content_type: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Un archivo visible siempre está completo
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        async with aiofiles.open(tmp_path, "wb") as f:
+            await f.write(data)
+        os.replace(tmp_path, path)
+
+    async def write_file(self, path: str, local_path: str, content_type: str) -> None:
+        await self.move(local_path, path, content_type)
+
+    async def move(self, source: str, destination: str, content_type: str) -> None:
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        try:
+            os.replace(source, destination)
+        except OSError:
+            # Otro sistema de archivos: copia a temporal y renombrado atómico
+            tmp_path = f"{destination}.{uuid.uuid4().hex}.tmp"
+            await asyncio.to_thread(shutil.copyfile, source, tmp_path)
+            os.replace(tmp_path, destination)
+            os.remove(source)
+
+    async def exists(self, path: str) -> bool:
+        return os.path.exists(path)
+
+    async def stat(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return {
+            "size": st.st_size,
+            "sha256": None,
+            "etag": None,
+            "last_modified": datetime.utcfromtimestamp(st.st_mtime),
+        }
+
+    async def delete(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def list_objects(self, prefix: str, batch_size: int = LIST_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        entries = self._walk_sorted(prefix)
+        while True:
+            # El recorrido del disco avanza por lotes en un hilo
+            batch = await asyncio.to_thread(lambda: list(itertools.islice(entries, batch_size)))
+            if not batch:
+                break
+            for entry in batch:
+                yield entry
+
+    @classmethod
+    def _walk_sorted(cls, directory: str):
+        try:
+            with os.scandir(directory) as it:
+                # Un directorio se ordena como "nombre/" para que el recorrido siga el orden de la ruta completa
+                entries = sorted(it, key=lambda e: e.name + "/" if e.is_dir(follow_symlinks=False) else e.name)
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from cls._walk_sorted(entry.path)
+                continue
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            yield {"path": entry.path, "size": st.st_size, "last_modified": datetime.utcfromtimestamp(st.st_mtime)}
+
+
+class S3StorageBackend(StorageBackend):
+    """S3 (o compatible) con un único cliente boto3 por proceso; las llamadas se hacen en hilos"""
+
+    def __init__(self, client: Any, transfer_config: TransferConfig):
+        self.client = client
+        self.transfer_config = transfer_config
+
+    @staticmethod
+    def split(path: str) -> Tuple[str, str]:
+        """s3://bucket/key -> (bucket, key)"""
+        bucket, key = path[len(S3_SCHEME):].split("/", 1)
+        return bucket, key
+
+    async def read(self, path: str) -> bytes:
+        bucket, key = self.split(path)
+        return await asyncio.to_thread(self._get, bucket, key, None)
+
+    async def read_range(self, path: str, start: int, end: Optional[int] = None) -> bytes:
+        bucket, key = self.split(path)
+        return await asyncio.to_thread(self._get, bucket, key, f"bytes={start}-{'' if end is None else end}")
+
+    def _get(self, bucket: str, key: str, byte_range: Optional[str]) -> bytes:
+        kwargs = {"Range": byte_range} if byte_range else {}
+        return self.client.get_object(Bucket=bucket, Key=key, **kwargs)["Body"].read()
+
+    async def stream(self, path: str, start: int = 0, end: Optional[int] = None,
+                     chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        bucket, key = self.split(path)
+        kwargs = {"Range": f"bytes={start}-{'' if end is None else end}"} if start or end is not None else {}
+        response = await asyncio.to_thread(self.client.get_object, Bucket=bucket, Key=key, **kwargs)
+        body = response["Body"]
+        chunks = body.iter_chunks(chunk_size)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def write(self, path: str, data: bytes, content_type: str) -> None:
+        bucket, key = self.split(path)
+        await asyncio.to_thread(
+            self.client.put_object,
+            Bucket=bucket,
+            Key=key,
+            Body=data,
+            ContentType=content_type,
+            CacheControl=IMMUTABLE_CACHE_CONTROL,
+        )
+
+    async def write_file(self, path: str, local_path: str, content_type: str) -> None:
+        bucket, key = self.split(path)
+        # upload_file usa multipart con partes en paralelo a partir del umbral configurado
+        await asyncio.to_thread(
+            self.client.upload_file,
+            local_path,
+            bucket,
+            key,
+            ExtraArgs={"ContentType": content_type, "CacheControl": IMMUTABLE_CACHE_CONTROL},
+            Config=self.transfer_config,
+        )
+
+    async def move(self, source: str, destination: str, content_type: str) -> None:
+        source_bucket, source_key = self.split(source)
+        bucket, key = self.split(destination)
+        await asyncio.to_thread(
+            self.client.copy,
+            {"Bucket": source_bucket, "Key": source_key},
+            bucket,
+            key,
+            ExtraArgs={
+                "ContentType": content_type,
+                "CacheControl": IMMUTABLE_CACHE_CONTROL,
+                "MetadataDirective": "REPLACE",
+            },
+            Config=self.transfer_config,
+        )
+        await self.delete(source)
+
+    async def exists(self, path: str) -> bool:
+        return await self.stat(path) is not None
+
+    async def stat(self, path: str) -> Optional[Dict[str, Any]]:
+        bucket, key = self.split(path)
+        try:
+            head = await asyncio.to_thread(self.client.head_object, Bucket=bucket, Key=key, ChecksumMode="ENABLED")
+        except ClientError:
+            return None
+        checksum = head.get("ChecksumSHA256")
+        # Los checksums compuestos de multipart ("...-N") no son el SHA-256 del objeto
+        sha256 = base64.b64decode(checksum).hex() if checksum and "-" not in checksum else None
+        return {
+            "size": head["ContentLength"],
+            "sha256": sha256,
+            "etag": head.get("ETag", "").strip('"') or None,
+            "last_modified": head.get("LastModified"),
+        }
+
+    async def delete(self, path: str) -> bool:
+        bucket, key = self.split(path)
+        await asyncio.to_thread(self.client.delete_object, Bucket=bucket, Key=key)
+        return True
+
+    async def list_objects(self, prefix: str, batch_size: int = LIST_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        bucket, key = self.split(prefix)
+        # ListObjectsV2 devuelve las claves en orden binario UTF-8
+        pages = iter(self.client.get_paginator("list_objects_v2").paginate(
+            Bucket=bucket,
+            Prefix=key.rstrip("/") + "/",
+            PaginationConfig={"PageSize": min(batch_size, 1000)},
+        ))
+        while True:
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                break
+            for obj in page.get("Contents", []):
+                yield {"path": f"{S3_SCHEME}{bucket}/{obj['Key']}", "size": obj["Size"], "last_modified": obj["LastModified"]}
+
+
+class MemoryStorageBackend(StorageBackend):
+    """Almacén en memoria del proceso (pruebas y desarrollo sin disco ni S3)"""
+
+    def __init__(self):
+        self._objects: Dict[str, Tuple[bytes, str, datetime]] = {}
+
+    def _get(self, path: str) -> bytes:
+        try:
+            return self._objects[path][0]
+        except KeyError:
+            raise FileNotFoundError(path)
+
+    async def read(self, path: str) -> bytes:
+        return self._get(path)
+
+    async def read_view(self, path: str) -> memoryview:
+        return memoryview(self._get(path))
+
+    async def read_range(self, path: str, start: int, end: Optional[int] = None) -> bytes:
+        return self._get(path)[start:None if end is None else end + 1]
+
+    async def stream(self, path: str, start: int = 0, end: Optional[int] = None,
+                     chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        view = memoryview(self._get(path))[start:None if end is None else end + 1]
+        for offset in range(0, len(view), chunk_size):
+            yield bytes(view[offset:offset + chunk_size])
+
+    async def write(self, path: str, data: bytes, content_type: str) -> None:
+        self._objects[path] = (bytes(data), content_type, datetime.utcnow())
+
+    async def write_file(self, path: str, local_path: str, content_type: str) -> None:
+        async with aiofiles.open(local_path, "rb") as f:
+            await self.write(path, await f.read(), content_type)
+        os.remove(local_path)
+
+    async def move(self, source: str, destination: str, content_type: str) -> None:
+        data, _, _ = self._objects.pop(source)
+        await self.write(destination, data, content_type)
+
+    async def exists(self, path: str) -> bool:
+        return path in self._objects
+
+    async def stat(self, path: str) -> Optional[Dict[str, Any]]:
+        if path not in self._objects:
+            return None
+        data, _, modified = self._objects[path]
+        return {"size": len(data), "sha256": None, "etag": None, "last_modified": modified}
+
+    async def delete(self, path: str) -> bool:
+        return self._objects.pop(path, None) is not None
+
+    async def list_objects(self, prefix: str, batch_size: int = LIST_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        prefix = prefix.rstrip("/") + "/"
+        for path in sorted(p for p in self._objects if p.startswith(prefix)):
+            entry = self._objects.get(path)
+            if entry is not None:
+                yield {"path": path, "size": len(entry[0]), "last_modified": entry[2]}
+
+
+def create_s3_client() -> Any:
+    return boto3.client(
+        "s3",
+        region_name=os.getenv("AWS_REGION", os.getenv("AWS_DEFAULT_REGION", None)),
+        # Permite apuntar a un S3 compatible local (MinIO, LocalStack, moto)
+        endpoint_url=os.getenv("S3_ENDPOINT_URL") or None,
+        config=BotoConfig(
+            signature_version="s3v4",
+            # El pool de conexiones debe cubrir las lecturas concurrentes en hilos
+            max_pool_connections=int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32")),
+        ),
+    )
+
+
+# Un backend de cada tipo por proceso (el cliente S3 y su pool de conexiones se comparten)
+_backends: Dict[str, StorageBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(kind: str) -> StorageBackend:
+    """Backend compartido: 'local', 's3' o 'memory'"""
+    with _backends_lock:
+        backend = _backends.get(kind)
+        if backend is None:
+            if kind == "s3":
+                part_size = int(os.getenv("S3_MULTIPART_CHUNK_SIZE", str(8 * 1024 * 1024)))
+                backend = S3StorageBackend(
+                    create_s3_client(),
+                    TransferConfig(
+                        multipart_threshold=part_size,
+                        multipart_chunksize=part_size,
+                        max_concurrency=int(os.getenv("S3_MULTIPART_CONCURRENCY", "4")),
+                    ),
+                )
+            elif kind == "memory":
+                backend = MemoryStorageBackend()
+            elif kind == "local":
+                backend = LocalStorageBackend()
+            else:
+                raise ValueError(f"Backend de almacenamiento no soportado: {kind}")
+            _backends[kind] = backend
+        return backend
+
+
+def backend_for_path(path: str) -> StorageBackend:
+    """Backend que corresponde a una ruta guardada"""
+    if path.startswith(S3_SCHEME):
+        return get_backend("s3")
+    if path.startswith(MEMORY_SCHEME):
+        return get_backend("memory")
+    return get_backend("local")
@@ -0,0 +1,117 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import IndexModel
+
+from infrastructure.database import database
+
+logger = logging.getLogger(__name__)
+
+Verdict = Tuple[bool, Dict[str, Any]]
+
+
+class ValidationCache:
+    """Caché de veredictos de validación médica en dos niveles.
+
+    Nivel 1: LRU en memoria del proceso. Nivel 2: colección Mongo con TTL,
+    compartida entre réplicas. La clave es el hash de la imagen preprocesada
+    junto con el prompt, el system prompt y el modelo del VLM.
+    """
+
+    COLLECTION = "validation_cache"
+
+    def __init__(self):
+        self.enabled = os.getenv("VALIDATION_CACHE_ENABLED", "true").lower() == "true"
+        self.max_entries = int(os.getenv("VALIDATION_CACHE_SIZE", "1024"))
+        self.ttl_seconds = int(os.getenv("VALIDATION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+        self._memory: "OrderedDict[str, Verdict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(image_bytes: bytes, prompt: str, system_prompt: str, model_id: str) -> str:
+        """Clave de caché: SHA-256 de la imagen preprocesada + prompt + modelo"""
+        h = hashlib.sha256()
+        h.update(image_bytes)
+        for part in (prompt, system_prompt or "", model_id or ""):
+            h.update(b"\x00")
+            h.update(part.encode("utf-8"))
+        return h.hexdigest()
+
+    async def get(self, key: str) -> Optional[Verdict]:
+        """Buscar un veredicto en memoria y, si no está, en Mongo"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            verdict = self._memory.get(key)
+            if verdict is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return verdict
+
+        try:
+            collection = await self._get_collection()
+            doc = await collection.find_one({"_id": key}) if collection is not None else None
+        except Exception as e:
+            logger.warning(f"[VALIDATION_CACHE] Error leyendo caché persistente: {e}")
+            doc = None
+
+        if doc is not None:
+            verdict = (bool(doc["is_valid"]), doc.get("validation_info", {}))
+            self._remember(key, verdict)
+            self.stats["persistent_hits"] += 1
+            return verdict
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, is_valid: bool, validation_info: Dict[str, Any]) -> None:
+        """Guardar un veredicto en ambos niveles (nunca un error técnico: no es un veredicto)"""
+        if not self.enabled or validation_info.get("validation_error"):
+            return
+        self._remember(key, (is_valid, validation_info))
+        try:
+            collection = await self._get_collection()
+            if collection is not None:
+                await collection.replace_one(
+                    {"_id": key},
+                    {"_id": key, "is_valid": is_valid, "validation_info": validation_info, "created_at": datetime.utcnow()},
+                    upsert=True,
+                )
+        except Exception as e:
+            logger.warning(f"[VALIDATION_CACHE] Error escribiendo caché persistente: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores de aciertos/fallos y ratio de aciertos"""
+        hits = self.stats["memory_hits"] + self.stats["persistent_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "memory_entries": len(self._memory),
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _remember(self, key: str, verdict: Verdict) -> None:
+        with self._lock:
+            self._memory[key] = verdict
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def index_models(self) -> List[IndexModel]:
+        """TTL del nivel persistente (lo crea infrastructure.indexes al arrancar)"""
+        return [IndexModel("created_at", expireAfterSeconds=self.ttl_seconds)]
+
+    async def _get_collection(self):
+        if database.client is None:
+            return None
+        return database.get_collection(self.COLLECTION)
+
+# Instancia global de la caché de validación
+validation_cache = ValidationCache()
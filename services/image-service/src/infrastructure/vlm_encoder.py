@@ -0,0 +1,78 @@
+import os
+import logging
+from io import BytesIO
+from typing import Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Formatos soportados: formato PIL, tipo MIME y opciones de guardado
+VLM_FORMATS = {
+    # PNG sin pérdida con compresión rápida (optimize=True es mucho más lento y apenas reduce tamaño)
+    "png": {"pil_format": "PNG", "mime_type": "image/png"},
+    "jpeg": {"pil_format": "JPEG", "mime_type": "image/jpeg"},
+    "webp": {"pil_format": "WEBP", "mime_type": "image/webp"},
+}
+
+
+class VLMEncoder:
+    """Re-codificación de las imágenes enviadas al VLM (Bedrock / Ollama).
+
+    Configurable por entorno:
+      - VLM_IMAGE_FORMAT: png | jpeg | webp (por defecto png)
+      - VLM_IMAGE_QUALITY: calidad JPEG/WebP (por defecto 90)
+      - VLM_IMAGE_MAX_SIDE: lado máximo en píxeles (por defecto 1024)
+      - VLM_PNG_COMPRESS_LEVEL: nivel zlib del PNG (por defecto 1, el más rápido)
+    """
+
+    def __init__(self, image_format: Optional[str] = None, quality: Optional[int] = None,
+                 max_side: Optional[int] = None, png_compress_level: Optional[int] = None):
+        image_format = (image_format or os.getenv("VLM_IMAGE_FORMAT", "png")).lower()
+        if image_format == "jpg":
+            image_format = "jpeg"
+        if image_format not in VLM_FORMATS:
+            logger.warning(f"[VLM_ENCODER] Formato no soportado '{image_format}', usando png")
+            image_format = "png"
+        self.image_format = image_format
+        self.quality = quality if quality is not None else int(os.getenv("VLM_IMAGE_QUALITY", "90"))
+        self.max_side = max_side if max_side is not None else int(os.getenv("VLM_IMAGE_MAX_SIDE", "1024"))
+        self.png_compress_level = (
+            png_compress_level if png_compress_level is not None
+            else int(os.getenv("VLM_PNG_COMPRESS_LEVEL", "1"))
+        )
+
+    @property
+    def mime_type(self) -> str:
+        return VLM_FORMATS[self.image_format]["mime_type"]
+
+    @property
+    def label(self) -> str:
+        """Descripción corta de la configuración (para logs y benchmarks)"""
+        if self.image_format == "png":
+            return f"png(level={self.png_compress_level})@{self.max_side}"
+        return f"{self.image_format}(q={self.quality})@{self.max_side}"
+
+    def resize(self, img: Image.Image) -> Image.Image:
+        """Reducir al lado máximo configurado (sin ampliar)"""
+        w, h = img.size
+        scale = min(1.0, self.max_side / max(w, h))
+        if scale < 1.0:
+            return img.resize((int(w * scale), int(h * scale)))
+        return img
+
+    def encode(self, img: Image.Image) -> Tuple[bytes, str]:
+        """Codificar una imagen RGB ya reducida; devuelve (bytes, mime_type)"""
+        out = BytesIO()
+        pil_format = VLM_FORMATS[self.image_format]["pil_format"]
+        if self.image_format == "png":
+            img.save(out, format=pil_format, compress_level=self.png_compress_level)
+        elif self.image_format == "webp":
+            img.save(out, format=pil_format, quality=self.quality, method=4)
+        else:
+            img.save(out, format=pil_format, quality=self.quality)
+        return out.getvalue(), self.mime_type
+
+
+# Instancia global configurada por entorno
+vlm_encoder = VLMEncoder()
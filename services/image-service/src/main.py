@@ -1,11 +1,18 @@
 import os
 import time
+import asyncio
 from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 from infrastructure.database import database
+from infrastructure.http_client import http_client
+from infrastructure.indexes import bootstrap_indexes
+from adapters.gateways.vlm_gateway import VisionLanguageGateway
+from tasks.kafka_producer import close_kafka_producer
+from infrastructure.status_hub import status_hub
+from usecases.processing_status import status_event_from_document
 from adapters.controllers.image_controller import router as image_router
 
 load_dotenv()
@@ -14,9 +21,19 @@ load_dotenv()
 async def lifespan(app: FastAPI):
     # Startup
     await database.connect_db()
+    # Índices en segundo plano: con colecciones grandes crearlos puede tardar
+    index_task = asyncio.create_task(bootstrap_indexes())
+    await http_client.connect()
+    await status_hub.start(database.get_collection("images"), status_event_from_document)
     print("🚀 Image Service iniciado")
     yield
     # Shutdown
+    index_task.cancel()
+    await asyncio.gather(index_task, return_exceptions=True)
+    await status_hub.stop()
+    await close_kafka_producer()
+    await http_client.close()
+    VisionLanguageGateway.shutdown()
     await database.close_db()
     print("👋 Image Service cerrado")
 
@@ -62,16 +79,25 @@ async def add_cache_headers(request: Request, call_next):
     path = request.url.path
     
     if path.startswith("/api/v1/images/download/"):
-        # Imágenes descargables - caché largo
-        response.headers["Cache-Control"] = "public, max-age=31536000"  # 1 año
-        response.headers["Expires"] = "Thu, 31 Dec 2025 23:59:59 GMT"
-    elif path.startswith("/api/v1/images/") and request.method == "GET":
-        # Metadatos de imágenes - caché corto
-        response.headers["Cache-Control"] = "public, max-age=300"  # 5 minutos
+        # El endpoint fija la caché (contenido inmutable, o redirección válida mientras
+        # dure la URL prefirmada); las respuestas de error no se cachean
+        if "cache-control" not in response.headers:
+            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+    elif "/derivative/" in path and path.startswith("/api/v1/images/") and response.status_code in (200, 304):
+        # Derivados de un original inmutable - caché largo
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    elif path == "/api/v1/images/export":
+        # Exportación: resultado cambiante y potencialmente enorme - sin caché
+        response.headers["Cache-Control"] = "no-store"
     elif path == "/api/v1/images/health":
         # Health check - sin caché
         response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    else:
+    elif path.startswith("/api/v1/images/") and request.method == "GET":
+        # Metadatos de imágenes - caché corto, salvo que el endpoint fije la suya
+        # (los canales SSE llevan no-cache: un proxy no debe cachear ni agrupar el stream)
+        if "cache-control" not in response.headers:
+            response.headers["Cache-Control"] = "public, max-age=300"  # 5 minutos
+    elif "cache-control" not in response.headers:
         # APIs dinámicas - sin caché
         response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
         response.headers["Pragma"] = "no-cache"
@@ -94,6 +120,7 @@ async def root():
             "list": "/api/v1/images/",
             "get_by_id": "/api/v1/images/{image_id}",
             "get_by_status": "/api/v1/images/status/{status}",
+            "export": "/api/v1/images/export",
             "delete": "/api/v1/images/{image_id}",
             "processing_status": "/api/v1/images/{image_id}/processing-status"
         },
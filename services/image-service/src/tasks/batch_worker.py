@@ -0,0 +1,267 @@
+# src/tasks/batch_worker.py
+import os
+import json
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentError(Exception):
+    """Error no recuperable: el mensaje va directo al dead-letter topic sin reintentos"""
+
+
+class BatchWorker:
+    """Worker asíncrono de Kafka con lotes, concurrencia acotada y commits manuales.
+
+    - Lee lotes con poll(max_records) (en un hilo, kafka-python es bloqueante).
+    - Procesa cada lote con hasta `concurrency` mensajes en paralelo.
+    - Reintenta los errores transitorios con backoff exponencial.
+    - Los mensajes venenosos (no JSON, PermanentError o reintentos agotados) se
+      publican en `<topic>.dlq` con el error y el mensaje original.
+    - El offset solo se confirma cuando todo el lote está resuelto (procesado o en la DLQ);
+      si algo falla antes, se vuelve al inicio del lote (entrega al menos una vez).
+
+    Con `batch_handler` el lote completo se entrega a una sola llamada (p. ej. una
+    inferencia por lotes); devuelve un resultado por mensaje (None o la excepción de
+    ese mensaje) y los que fallan van a la DLQ. Con `batch_window_ms` se acumulan
+    mensajes de varios poll hasta llenar el lote o agotar la ventana.
+
+    Funciona igual con KafkaConsumer/KafkaProducer que con el broker en memoria
+    (tasks.in_memory_broker).
+    """
+
+    def __init__(
+        self,
+        consumer: Any,
+        producer: Any,
+        handler: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]],
+        topic: str,
+        dlq_topic: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        max_batch_size: Optional[int] = None,
+        poll_timeout_ms: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_backoff_ms: Optional[int] = None,
+        on_dead_letter: Optional[Callable[[Optional[Dict[str, Any]], str], Awaitable[Any]]] = None,
+        batch_handler: Optional[Callable[[List[Dict[str, Any]]], Awaitable[List[Optional[Exception]]]]] = None,
+        batch_window_ms: Optional[int] = None,
+    ):
+        self.consumer = consumer
+        self.producer = producer
+        self.handler = handler
+        self.topic = topic
+        self.dlq_topic = dlq_topic or f"{topic}.dlq"
+        self.concurrency = concurrency or int(os.getenv("WORKER_CONCURRENCY", "4"))
+        self.max_batch_size = max_batch_size or int(os.getenv("WORKER_MAX_BATCH_SIZE", "16"))
+        self.poll_timeout_ms = poll_timeout_ms if poll_timeout_ms is not None else int(os.getenv("WORKER_POLL_TIMEOUT_MS", "1000"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("WORKER_MAX_RETRIES", "3"))
+        self.retry_backoff_ms = retry_backoff_ms if retry_backoff_ms is not None else int(os.getenv("WORKER_RETRY_BACKOFF_MS", "500"))
+        self.max_backoff_ms = int(os.getenv("WORKER_MAX_BACKOFF_MS", "30000"))
+        self.on_dead_letter = on_dead_letter
+        self.batch_handler = batch_handler
+        self.batch_window_ms = batch_window_ms if batch_window_ms is not None else int(os.getenv("WORKER_BATCH_WINDOW_MS", "0"))
+        if handler is None and batch_handler is None:
+            raise ValueError("Se requiere handler o batch_handler")
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._stopping = asyncio.Event()
+        self.metrics = {
+            "batches": 0,
+            "processed": 0,
+            "retries": 0,
+            "dead_lettered": 0,
+            "batch_failures": 0,
+            "last_batch_size": 0,
+            "last_batch_ms": 0.0,
+            "last_batch_msgs_per_s": 0.0,
+            "total_messages": 0,
+            "total_batch_ms": 0.0,
+        }
+
+    def stop(self) -> None:
+        """Pedir la parada tras el lote en curso"""
+        self._stopping.set()
+
+    async def run(self, max_batches: Optional[int] = None) -> None:
+        """Bucle principal; `max_batches` limita los lotes procesados (útil en pruebas)"""
+        logger.info(f"[BATCH_WORKER] Escuchando '{self.topic}' (concurrencia={self.concurrency}, lote={self.max_batch_size})")
+        batches = 0
+        try:
+            while not self._stopping.is_set():
+                records = await self._poll_batch()
+                if not records:
+                    if max_batches is not None:
+                        break
+                    continue
+                await self.process_batch(records)
+                batches += 1
+                if max_batches is not None and batches >= max_batches:
+                    break
+        finally:
+            await asyncio.to_thread(self.consumer.close)
+            logger.info(f"[BATCH_WORKER] Consumidor de '{self.topic}' cerrado. Métricas: {self.get_metrics()}")
+
+    async def _poll_batch(self) -> Dict[Any, List[Any]]:
+        """Leer hasta max_batch_size mensajes, esperando como mucho batch_window_ms
+        desde el primero para completar el lote"""
+        batch: Dict[Any, List[Any]] = {}
+        count = 0
+        deadline = None
+        while count < self.max_batch_size:
+            if deadline is None:
+                timeout_ms = self.poll_timeout_ms
+            else:
+                timeout_ms = int((deadline - time.perf_counter()) * 1000)
+                if timeout_ms <= 0:
+                    break
+            records = await asyncio.to_thread(
+                self.consumer.poll, timeout_ms=timeout_ms, max_records=self.max_batch_size - count
+            )
+            for partition, partition_records in records.items():
+                batch.setdefault(partition, []).extend(partition_records)
+                count += len(partition_records)
+            if not batch or self.batch_window_ms <= 0 or self._stopping.is_set():
+                break
+            if deadline is None:
+                deadline = time.perf_counter() + self.batch_window_ms / 1000
+        return batch
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas acumuladas, con el rendimiento medio por lote"""
+        metrics = dict(self.metrics)
+        batches = metrics["batches"]
+        metrics["avg_batch_size"] = round(metrics["total_messages"] / batches, 2) if batches else 0.0
+        metrics["avg_msgs_per_s"] = (
+            round(metrics["total_messages"] / (metrics["total_batch_ms"] / 1000), 2) if metrics["total_batch_ms"] else 0.0
+        )
+        return metrics
+
+    async def process_batch(self, records: Dict[Any, List[Any]]) -> None:
+        """Procesar un lote {partición: [mensajes]} y confirmar sus offsets"""
+        start = time.perf_counter()
+        messages = [record for partition_records in records.values() for record in partition_records]
+        try:
+            if self.batch_handler is not None:
+                await self._process_as_batch(messages)
+            else:
+                await asyncio.gather(*(self._process_record(record) for record in messages))
+            await asyncio.to_thread(self.consumer.commit)
+        except Exception as e:
+            # No se confirma: volver al inicio del lote para reprocesarlo
+            self.metrics["batch_failures"] += 1
+            logger.error(f"[BATCH_WORKER] Lote no confirmado, se reintentará: {e}")
+            for partition, partition_records in records.items():
+                self.consumer.seek(partition, partition_records[0].offset)
+            await asyncio.sleep(self._backoff_seconds(self.max_retries))
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.metrics["batches"] += 1
+        self.metrics["last_batch_size"] = len(messages)
+        self.metrics["last_batch_ms"] = round(elapsed_ms, 2)
+        self.metrics["last_batch_msgs_per_s"] = round(len(messages) / (elapsed_ms / 1000), 2) if elapsed_ms else 0.0
+        self.metrics["total_messages"] += len(messages)
+        self.metrics["total_batch_ms"] = round(self.metrics["total_batch_ms"] + elapsed_ms, 2)
+        logger.info(
+            f"[BATCH_WORKER] Lote de '{self.topic}': {len(messages)} mensajes en {elapsed_ms:.1f} ms "
+            f"({self.metrics['last_batch_msgs_per_s']} msg/s)"
+        )
+
+    async def _process_as_batch(self, records: List[Any]) -> None:
+        """Entregar el lote completo a batch_handler; reintentar el lote si falla entero"""
+        valid = []
+        for record in records:
+            try:
+                valid.append((record, self._deserialize(record.value)))
+            except ValueError as e:
+                await self._dead_letter(record, None, f"Mensaje no es JSON válido: {e}", attempts=0)
+        if not valid:
+            return
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                results = await self.batch_handler([message for _, message in valid])
+                break
+            except Exception as e:
+                if attempt > self.max_retries:
+                    for record, message in valid:
+                        await self._dead_letter(record, message, str(e), attempts=attempt)
+                    return
+                self.metrics["retries"] += 1
+                delay = self._backoff_seconds(attempt)
+                logger.warning(f"[BATCH_WORKER] Error en lote de {len(valid)} mensajes (intento {attempt}), reintento en {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+
+        for (record, message), error in zip(valid, results):
+            if error is None:
+                self.metrics["processed"] += 1
+            else:
+                await self._dead_letter(record, message, str(error), attempts=attempt)
+
+    async def _process_record(self, record: Any) -> None:
+        async with self._semaphore:
+            try:
+                message = self._deserialize(record.value)
+            except ValueError as e:
+                await self._dead_letter(record, None, f"Mensaje no es JSON válido: {e}", attempts=0)
+                return
+
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    await self.handler(message)
+                    self.metrics["processed"] += 1
+                    return
+                except PermanentError as e:
+                    await self._dead_letter(record, message, str(e), attempts=attempt)
+                    return
+                except Exception as e:
+                    if attempt > self.max_retries:
+                        await self._dead_letter(record, message, str(e), attempts=attempt)
+                        return
+                    self.metrics["retries"] += 1
+                    delay = self._backoff_seconds(attempt)
+                    logger.warning(f"[BATCH_WORKER] Error en offset {record.offset} (intento {attempt}), reintento en {delay:.2f}s: {e}")
+                    await asyncio.sleep(delay)
+
+    def _backoff_seconds(self, attempt: int) -> float:
+        return min(self.retry_backoff_ms * (2 ** (attempt - 1)), self.max_backoff_ms) / 1000
+
+    @staticmethod
+    def _deserialize(value: Any) -> Dict[str, Any]:
+        if isinstance(value, dict):
+            return value
+        message = json.loads(value.decode("utf-8") if isinstance(value, (bytes, bytearray)) else value)
+        if not isinstance(message, dict):
+            raise ValueError("se esperaba un objeto JSON")
+        return message
+
+    async def _dead_letter(self, record: Any, message: Optional[Dict[str, Any]], error: str, attempts: int) -> None:
+        """Publicar el mensaje en la DLQ y esperar la confirmación del broker"""
+        value = record.value
+        if isinstance(value, (bytes, bytearray)):
+            value = value.decode("utf-8", errors="replace")
+        envelope = {
+            "topic": record.topic,
+            "partition": record.partition,
+            "offset": record.offset,
+            "value": value,
+            "error": error,
+            "attempts": attempts,
+            "failed_at": datetime.utcnow().isoformat(),
+        }
+        future = self.producer.send(self.dlq_topic, envelope)
+        # Si la DLQ falla, la excepción impide el commit del lote
+        await asyncio.to_thread(future.get, 10)
+        self.metrics["dead_lettered"] += 1
+        logger.error(f"[BATCH_WORKER] Mensaje {record.topic}@{record.offset} enviado a '{self.dlq_topic}': {error}")
+        if self.on_dead_letter is not None:
+            try:
+                await self.on_dead_letter(message, error)
+            except Exception as e:
+                logger.warning(f"[BATCH_WORKER] Error en on_dead_letter: {e}")
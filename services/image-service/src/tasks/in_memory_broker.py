@@ -0,0 +1,138 @@
+# src/tasks/in_memory_broker.py
+"""Broker en memoria que imita la parte de la API de kafka-python usada por los workers.
+
+Permite ejecutar los workers sin Kafka (pruebas, desarrollo local):
+
+    broker = InMemoryBroker()
+    producer = broker.producer()
+    producer.send("validate_upload", {"job_id": "1", ...})
+    consumer = broker.consumer("validate_upload", group_id="image-service-validate")
+    worker = BatchWorker(consumer, producer, handler, topic="validate_upload")
+"""
+import json
+import asyncio
+import threading
+from collections import namedtuple
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+TopicPartition = namedtuple("TopicPartition", ["topic", "partition"])
+ConsumerRecord = namedtuple("ConsumerRecord", ["topic", "partition", "offset", "key", "value"])
+RecordMetadata = namedtuple("RecordMetadata", ["topic", "partition", "offset"])
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    return json.dumps(value).encode("utf-8")
+
+
+class InMemoryBroker:
+    """Tópicos de una sola partición con offsets confirmados por grupo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.topics: Dict[str, List[ConsumerRecord]] = {}
+        self.committed: Dict[str, Dict[TopicPartition, int]] = {}
+
+    def append(self, topic: str, value: Any, key: Optional[bytes] = None) -> RecordMetadata:
+        with self._lock:
+            records = self.topics.setdefault(topic, [])
+            record = ConsumerRecord(topic, 0, len(records), key, _encode(value))
+            records.append(record)
+            return RecordMetadata(topic, 0, record.offset)
+
+    def messages(self, topic: str) -> List[Any]:
+        """Valores (JSON decodificado) publicados en un tópico"""
+        with self._lock:
+            return [json.loads(r.value) for r in self.topics.get(topic, [])]
+
+    def committed_offset(self, group_id: str, topic: str) -> int:
+        with self._lock:
+            return self.committed.get(group_id, {}).get(TopicPartition(topic, 0), 0)
+
+    def consumer(self, topic: str, group_id: str) -> "InMemoryConsumer":
+        return InMemoryConsumer(self, topic, group_id)
+
+    def producer(self) -> "InMemoryProducer":
+        return InMemoryProducer(self)
+
+
+class InMemoryConsumer:
+    """Equivalente a KafkaConsumer(enable_auto_commit=False) sin deserializador"""
+
+    def __init__(self, broker: InMemoryBroker, topic: str, group_id: str):
+        self.broker = broker
+        self.topic = topic
+        self.group_id = group_id
+        self.partition = TopicPartition(topic, 0)
+        # Posición de lectura: empieza en el último offset confirmado del grupo
+        self.position = broker.committed_offset(group_id, topic)
+        self.closed = False
+
+    def poll(self, timeout_ms: int = 0, max_records: Optional[int] = None) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        with self.broker._lock:
+            records = self.broker.topics.get(self.topic, [])[self.position:]
+            if max_records is not None:
+                records = records[:max_records]
+        if not records:
+            if timeout_ms:
+                threading.Event().wait(min(timeout_ms, 50) / 1000)
+            return {}
+        self.position = records[-1].offset + 1
+        return {self.partition: list(records)}
+
+    def commit(self, offsets: Optional[Dict[TopicPartition, Any]] = None) -> None:
+        """Confirmar la posición actual (o los offsets indicados)"""
+        with self.broker._lock:
+            group = self.broker.committed.setdefault(self.group_id, {})
+            if offsets is None:
+                group[self.partition] = self.position
+            else:
+                for tp, offset in offsets.items():
+                    group[tp] = getattr(offset, "offset", offset)
+
+    def seek(self, partition: TopicPartition, offset: int) -> None:
+        self.position = offset
+
+    def close(self, autocommit: bool = False) -> None:
+        self.closed = True
+
+
+class DeliveryFuture(Future):
+    """Future con la interfaz de kafka-python (get / add_callback / add_errback)"""
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        return self.result(timeout)
+
+    def add_callback(self, fn, *args, **kwargs) -> "DeliveryFuture":
+        self.add_done_callback(lambda f: f.exception() is None and fn(*args, f.result(), **kwargs))
+        return self
+
+    def add_errback(self, fn, *args, **kwargs) -> "DeliveryFuture":
+        self.add_done_callback(lambda f: f.exception() is not None and fn(*args, f.exception(), **kwargs))
+        return self
+
+
+class InMemoryProducer:
+    """Equivalente a KafkaProducer: send devuelve un future ya resuelto"""
+
+    def __init__(self, broker: InMemoryBroker):
+        self.broker = broker
+
+    def send(self, topic: str, value: Any = None, key: Optional[bytes] = None) -> DeliveryFuture:
+        future = DeliveryFuture()
+        future.set_result(self.broker.append(topic, value, key))
+        return future
+
+    async def send_async(self, topic: str, value: Any = None, key: Optional[bytes] = None) -> "asyncio.Future":
+        """Como ImageKafkaProducer.send_async: future de asyncio con la entrega ya confirmada"""
+        delivery = asyncio.get_running_loop().create_future()
+        delivery.set_result(self.broker.append(topic, value, key))
+        return delivery
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        pass
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        pass
@@ -44,19 +44,24 @@ class ImageKafkaConsumer:
             self.consumer.close()
             logger.info("Consumidor cerrado")
 
+def create_batch_consumer(topic: str, group_id: str) -> KafkaConsumer:
+    """Consumidor para BatchWorker: sin auto-commit y con los valores en bytes crudos
+    (la deserialización se hace por mensaje para poder enviar los inválidos a la DLQ)"""
+    broker = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092")
+    logger.info(f"Inicializando consumidor por lotes para tópico '{topic}' con broker '{broker}' y group_id '{group_id}'")
+    return KafkaConsumer(
+        topic,
+        bootstrap_servers=[broker],
+        group_id=group_id,
+        enable_auto_commit=False,
+        auto_offset_reset=os.getenv("KAFKA_AUTO_OFFSET_RESET", "earliest"),
+        max_poll_records=int(os.getenv("WORKER_MAX_BATCH_SIZE", "16")),
+        # Un lote puede tardar (VLM + predicción): margen antes de que el grupo lo dé por muerto
+        max_poll_interval_ms=int(os.getenv("KAFKA_MAX_POLL_INTERVAL_MS", "600000")),
+    )
+
 # Función simple para compatibilidad con el archivo anterior
 def start_validate_upload_consumer():
-    """Inicia el consumidor para validate_upload"""
-    from tasks.validation_tasks import validate_upload_task
-    
-    def process_message(message):
-        validate_upload_task(
-            message.get("job_id"),
-            message.get("staging_path"),
-            message.get("original_filename"),
-            message.get("user_id"),
-            message.get("custom_filename"),
-        )
-    
-    consumer = ImageKafkaConsumer("validate_upload")
-    consumer.listen(process_message)
\ No newline at end of file
+    """Inicia el worker de validate_upload"""
+    from tasks.worker_validate_upload import main
+    main()
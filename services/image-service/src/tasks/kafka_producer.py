@@ -1,24 +1,171 @@
 import json
 import os
+import time
+import asyncio
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
 from kafka import KafkaProducer
 
 logger = logging.getLogger(__name__)
 
+
+def _parse_acks(value: str):
+    return value if value == "all" else int(value)
+
+
 class ImageKafkaProducer:
-    def __init__(self, kafka_server=None):
+    """Productor Kafka sin flush por mensaje.
+
+    Los mensajes se agrupan en el cliente (linger_ms / batch_size) y se comprimen;
+    cada envío devuelve un future de entrega y flush() solo se llama al cerrar o
+    cuando se pide explícitamente. Desde asyncio se usa send_async, que encola en un
+    hilo propio (send puede bloquear si el buffer está lleno o falta metadata) y
+    devuelve un asyncio.Future resuelto por el callback de entrega.
+
+    Configurable por entorno: KAFKA_LINGER_MS, KAFKA_BATCH_SIZE, KAFKA_COMPRESSION_TYPE,
+    KAFKA_ACKS, KAFKA_BUFFER_MEMORY, KAFKA_MAX_BLOCK_MS.
+    """
+
+    def __init__(self, kafka_server=None, **config):
         if kafka_server is None:
             kafka_server = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092")
-        
+
         logger.info(f"Inicializando producer Kafka con servidor: {kafka_server}")
-        
+
+        settings = {
+            "linger_ms": int(os.getenv("KAFKA_LINGER_MS", "10")),
+            "batch_size": int(os.getenv("KAFKA_BATCH_SIZE", "65536")),
+            "compression_type": os.getenv("KAFKA_COMPRESSION_TYPE", "gzip") or None,
+            "acks": _parse_acks(os.getenv("KAFKA_ACKS", "1")),
+            "buffer_memory": int(os.getenv("KAFKA_BUFFER_MEMORY", str(32 * 1024 * 1024))),
+            "max_block_ms": int(os.getenv("KAFKA_MAX_BLOCK_MS", "10000")),
+        }
+        settings.update(config)
         self.producer = KafkaProducer(
             bootstrap_servers=[kafka_server],
-            value_serializer=lambda v: json.dumps(v).encode('utf-8')
+            value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+            key_serializer=lambda k: k.encode('utf-8') if isinstance(k, str) else k,
+            **settings
         )
+        # Un único hilo: conserva el orden de envío y no bloquea el event loop
+        self._send_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kafka-send")
+        self._metrics = {
+            "sent": 0,
+            "delivered": 0,
+            "failed": 0,
+            "latency_ms_total": 0.0,
+            "latency_ms_max": 0.0,
+            "last_latency_ms": 0.0,
+        }
+
+    def send(self, topic, message, key=None, callback: Optional[Callable[[Any, Optional[Exception]], None]] = None):
+        """Encolar un mensaje y devolver el future de kafka-python (no espera la entrega).
+
+        `callback(record_metadata, error)` se invoca al confirmarse o fallar la entrega.
+        """
+        logger.debug(f"Encolando mensaje en tópico '{topic}'")
+        started = time.perf_counter()
+        future = self.producer.send(topic, message, key=key)
+        self._metrics["sent"] += 1
+
+        def on_success(record_metadata):
+            self._record_latency(started)
+            self._metrics["delivered"] += 1
+            if callback is not None:
+                callback(record_metadata, None)
+
+        def on_error(error):
+            self._metrics["failed"] += 1
+            logger.error(f"Error entregando mensaje a '{topic}': {error}")
+            if callback is not None:
+                callback(None, error)
+
+        future.add_callback(on_success)
+        future.add_errback(on_error)
+        return future
+
+    async def send_async(self, topic, message, key=None) -> "asyncio.Future":
+        """Encolar desde asyncio; devuelve un asyncio.Future con el RecordMetadata de la entrega.
+
+        Esperar la llamada solo espera al encolado; esperar el future devuelto espera
+        la confirmación del broker.
+        """
+        loop = asyncio.get_running_loop()
+        delivery = loop.create_future()
+
+        def resolve(record_metadata, error):
+            def set_result():
+                if delivery.done():
+                    return
+                if error is not None:
+                    delivery.set_exception(error)
+                else:
+                    delivery.set_result(record_metadata)
+            loop.call_soon_threadsafe(set_result)
+
+        await loop.run_in_executor(self._send_executor, lambda: self.send(topic, message, key=key, callback=resolve))
+        return delivery
+
+    def _record_latency(self, started: float) -> None:
+        latency_ms = (time.perf_counter() - started) * 1000
+        self._metrics["latency_ms_total"] += latency_ms
+        self._metrics["last_latency_ms"] = round(latency_ms, 2)
+        self._metrics["latency_ms_max"] = round(max(self._metrics["latency_ms_max"], latency_ms), 2)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Latencia de publicación (encolado -> confirmación) y profundidad de la cola"""
+        m = self._metrics
+        return {
+            "sent": m["sent"],
+            "delivered": m["delivered"],
+            "failed": m["failed"],
+            # Mensajes encolados aún sin confirmar
+            "queue_depth": m["sent"] - m["delivered"] - m["failed"],
+            "latency_ms_avg": round(m["latency_ms_total"] / m["delivered"], 2) if m["delivered"] else 0.0,
+            "latency_ms_max": m["latency_ms_max"],
+            "last_latency_ms": m["last_latency_ms"],
+        }
+
+    def flush(self, timeout=None):
+        """Forzar el envío de todo lo encolado (bloqueante)"""
+        self.producer.flush(timeout=timeout)
+
+    async def flush_async(self, timeout=None):
+        await asyncio.to_thread(self.flush, timeout)
+
+    def close(self, timeout=None):
+        """Enviar lo pendiente y cerrar"""
+        self._send_executor.shutdown(wait=True)
+        self.producer.flush(timeout=timeout)
+        self.producer.close(timeout=timeout)
+        logger.info(f"Producer Kafka cerrado. Métricas: {self.get_metrics()}")
+
+
+# Productor compartido por el proceso de la API (se crea al primer uso)
+_shared_producer: Optional[ImageKafkaProducer] = None
+_shared_producer_lock = threading.Lock()
+
+
+def get_kafka_producer() -> ImageKafkaProducer:
+    """Productor compartido (bloqueante la primera vez: conecta con el broker)"""
+    global _shared_producer
+    with _shared_producer_lock:
+        if _shared_producer is None:
+            _shared_producer = ImageKafkaProducer()
+        return _shared_producer
+
+
+def get_kafka_producer_metrics() -> Dict[str, Any]:
+    if _shared_producer is None:
+        return {"started": False}
+    return {"started": True, **_shared_producer.get_metrics()}
+
 
-    def send(self, topic, message):
-        logger.info(f"Enviando mensaje a tópico '{topic}': {message}")
-        future = self.producer.send(topic, message)
-        self.producer.flush()
-        logger.info(f"Mensaje enviado exitosamente a '{topic}'")
\ No newline at end of file
+async def close_kafka_producer() -> None:
+    global _shared_producer
+    if _shared_producer is not None:
+        await asyncio.to_thread(_shared_producer.close)
+        _shared_producer = None
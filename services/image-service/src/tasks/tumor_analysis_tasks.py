@@ -0,0 +1,184 @@
+# src/tasks/tumor_analysis_tasks.py
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from infrastructure.database import database
+from infrastructure.storage import StorageService, storage_service
+from infrastructure.derivatives import DerivativeService
+from infrastructure.dicom import is_dicom
+from adapters.gateways.prediction_gateway import PredictionGateway, PredictionError
+from .batch_worker import PermanentError
+
+logger = logging.getLogger(__name__)
+
+# Lecturas de almacenamiento simultáneas al cargar un lote
+LOAD_CONCURRENCY = int(os.getenv("TUMOR_ANALYSIS_LOAD_CONCURRENCY", "8"))
+
+# Métricas del worker compartidas con la API (el worker es otro proceso): un documento por worker
+WORKER_STATS_COLLECTION = "worker_stats"
+ANALYSIS_STATS_ID = "tumor_analysis"
+
+# Métricas de la última ejecución y acumuladas del proceso (tiempos de carga, inferencia y escritura)
+analysis_stats = {
+    "batches": 0,
+    "images": 0,
+    "prediction_errors": 0,
+    "last_batch_size": 0,
+    "last_load_ms": 0.0,
+    "last_predict_ms": 0.0,
+    "last_write_ms": 0.0,
+}
+
+
+async def _load_image(storage: StorageService, derivatives: DerivativeService, doc: Dict[str, Any],
+                      semaphore: asyncio.Semaphore):
+    """(bytes, filename, mime_type) listos para el servicio de predicción"""
+    async with semaphore:
+        file_path = doc["file_path"]
+        if is_dicom(filename=file_path, mime_type=doc.get("mime_type", "")):
+            # El servicio de predicción no decodifica DICOM: vista renderizada cacheada
+            data = await derivatives.get_source(file_path)
+            return data, f"{os.path.splitext(doc['filename'])[0]}.png", "image/png"
+        data = await storage.read(file_path)
+        return data, doc["filename"], doc["mime_type"]
+
+
+async def analyze_tumor_batch(messages: List[Dict[str, Any]]) -> List[Optional[Exception]]:
+    """Analizar un lote de mensajes {"image_id": ...}: una lectura de Mongo, una
+    petición de predicción por lotes y un único bulk_write con los resultados.
+
+    Devuelve un resultado por mensaje: None si quedó registrado (también cuando la
+    predicción de esa imagen falló, que se guarda como 'failed') o la excepción que
+    impidió procesarlo. Los errores del lote completo (predicción, Mongo) se lanzan
+    para que el worker reintente el lote.
+    """
+    collection = database.get_collection("images")
+    results: List[Optional[Exception]] = [None] * len(messages)
+
+    # 1. Ids válidos del lote
+    object_ids: Dict[int, ObjectId] = {}
+    for index, message in enumerate(messages):
+        image_id = message.get("image_id")
+        if not image_id or not ObjectId.is_valid(str(image_id)):
+            results[index] = PermanentError(f"image_id no válido: {image_id}")
+        else:
+            object_ids[index] = ObjectId(str(image_id))
+    if not object_ids:
+        return results
+
+    # 2. Documentos del lote en una sola consulta
+    docs = {
+        doc["_id"]: doc
+        async for doc in collection.find(
+            {"_id": {"$in": list(set(object_ids.values()))}},
+            {"filename": 1, "file_path": 1, "mime_type": 1},
+        )
+    }
+    pending = []
+    for index, oid in object_ids.items():
+        if oid in docs:
+            pending.append(index)
+        else:
+            results[index] = PermanentError(f"Imagen no encontrada: {oid}")
+    if not pending:
+        return results
+
+    # 3. Cargar las imágenes del almacenamiento en paralelo
+    load_start = time.perf_counter()
+    derivatives = DerivativeService(storage_service)
+    semaphore = asyncio.Semaphore(LOAD_CONCURRENCY)
+    loaded = await asyncio.gather(
+        *(_load_image(storage_service, derivatives, docs[object_ids[index]], semaphore) for index in pending),
+        return_exceptions=True,
+    )
+    batch_indexes, batch_images = [], []
+    for index, item in zip(pending, loaded):
+        if isinstance(item, Exception):
+            logger.error(f"[TUMOR_ANALYSIS] No se pudo leer la imagen {object_ids[index]}: {item}")
+            results[index] = item
+        else:
+            batch_indexes.append(index)
+            batch_images.append(item)
+    load_ms = (time.perf_counter() - load_start) * 1000
+    if not batch_images:
+        return results
+
+    # 4. Una sola petición de inferencia para todo el lote
+    processing_started = datetime.utcnow().isoformat()
+    predict_start = time.perf_counter()
+    predictions = await PredictionGateway().predict_batch(batch_images)
+    predict_ms = (time.perf_counter() - predict_start) * 1000
+
+    # 5. Un único bulk_write con todos los resultados
+    now = datetime.utcnow().isoformat()
+    operations = []
+    prediction_errors = 0
+    for index, prediction in zip(batch_indexes, predictions):
+        if isinstance(prediction, PredictionError):
+            prediction_errors += 1
+            update = {
+                "processing_status": "failed",
+                "metadata.processing_status": "failed",
+                "metadata.prediction_error": {"error_code": prediction.error_code, "detail": prediction.detail},
+                "metadata.processing_completed": now,
+            }
+        else:
+            update = {
+                "processing_status": "completed",
+                "metadata.prediction": prediction,
+                "metadata.processing_status": "completed",
+                "metadata.processing_started": processing_started,
+                "metadata.processing_completed": now,
+            }
+        operations.append(UpdateOne({"_id": object_ids[index]}, {"$set": update}))
+    write_start = time.perf_counter()
+    await collection.bulk_write(operations, ordered=False)
+    write_ms = (time.perf_counter() - write_start) * 1000
+
+    analysis_stats["batches"] += 1
+    analysis_stats["images"] += len(batch_images)
+    analysis_stats["prediction_errors"] += prediction_errors
+    analysis_stats["last_batch_size"] = len(batch_images)
+    analysis_stats["last_load_ms"] = round(load_ms, 2)
+    analysis_stats["last_predict_ms"] = round(predict_ms, 2)
+    analysis_stats["last_write_ms"] = round(write_ms, 2)
+    await _publish_stats({
+        "batches": 1,
+        "images": len(batch_images),
+        "prediction_errors": prediction_errors,
+    })
+    logger.info(
+        f"[TUMOR_ANALYSIS] Lote de {len(batch_images)} imágenes: carga {load_ms:.1f} ms, "
+        f"predicción {predict_ms:.1f} ms, escritura {write_ms:.1f} ms, errores de predicción {prediction_errors}"
+    )
+    return results
+
+
+async def _publish_stats(increments: Dict[str, int]) -> None:
+    """Acumular las métricas del lote en Mongo para el endpoint de estadísticas de la API"""
+    last = {key: value for key, value in analysis_stats.items() if key.startswith("last_")}
+    try:
+        await database.get_collection(WORKER_STATS_COLLECTION).update_one(
+            {"_id": ANALYSIS_STATS_ID},
+            {"$inc": increments, "$set": {**last, "updated_at": datetime.utcnow()}},
+            upsert=True,
+        )
+    except Exception as e:
+        # Las métricas nunca deben hacer fallar un lote ya escrito
+        logger.warning(f"[TUMOR_ANALYSIS] No se pudieron publicar las métricas: {e}")
+
+
+async def get_analysis_stats() -> Dict[str, Any]:
+    """Métricas acumuladas de todos los workers de tumor_analysis (las del último lote, del más reciente)"""
+    doc = await database.get_collection(WORKER_STATS_COLLECTION).find_one({"_id": ANALYSIS_STATS_ID}, {"_id": 0})
+    stats = dict.fromkeys(analysis_stats, 0)
+    stats.update(doc or {})
+    stats["avg_batch_size"] = round(stats["images"] / stats["batches"], 2) if stats["batches"] else 0.0
+    return stats
@@ -0,0 +1,157 @@
+# src/tasks/validation_tasks.py
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pymongo import IndexModel
+
+from infrastructure.database import database
+from infrastructure.storage import storage_service
+from infrastructure.repositories.MongoImageRepository import MongoImageRepository
+from usecases.validate_upload import ValidateUploadUseCase
+from .batch_worker import PermanentError
+
+logger = logging.getLogger(__name__)
+
+# Colección con el estado de los jobs de validación (ValidationJobStatusResponse)
+VALIDATION_JOBS_COLLECTION = "validation_jobs"
+# Consultas y upserts por job_id
+VALIDATION_JOBS_INDEXES = [IndexModel("job_id", unique=True, name="job_id")]
+VALIDATE_UPLOAD_TOPIC = "validate_upload"
+
+
+async def update_job_status(job_id: str, status: str, message: str, image_id: Optional[str] = None,
+                            error: Optional[str] = None) -> None:
+    """Registrar el estado de un job de validación"""
+    await database.get_collection(VALIDATION_JOBS_COLLECTION).update_one(
+        {"job_id": job_id},
+        {
+            "$set": {
+                "status": status,
+                "message": message,
+                "image_id": image_id,
+                "error": error,
+                "updated_at": datetime.utcnow(),
+            },
+            "$setOnInsert": {"created_at": datetime.utcnow()},
+        },
+        upsert=True,
+    )
+
+
+async def get_job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """Estado actual de un job de validación"""
+    return await database.get_collection(VALIDATION_JOBS_COLLECTION).find_one({"job_id": job_id}, {"_id": 0})
+
+
+async def enqueue_validation_job(job_id: str, message: Dict[str, Any]) -> None:
+    """Registrar el job como 'queued' y publicarlo en validate_upload esperando la confirmación del broker.
+
+    Si el broker no confirma a tiempo, el job queda 'failed' y se relanza la excepción.
+    """
+    from .kafka_producer import get_kafka_producer
+
+    await update_job_status(job_id, "queued", "Imagen en cola de validación", image_id=message.get("image_id"))
+    try:
+        producer = await asyncio.to_thread(get_kafka_producer)
+        delivery = await producer.send_async(VALIDATE_UPLOAD_TOPIC, message, key=job_id)
+        await asyncio.wait_for(delivery, timeout=float(os.getenv("KAFKA_DELIVERY_TIMEOUT", "10")))
+    except Exception as e:
+        logger.error(f"Error encolando validate_upload para job {job_id}: {str(e)}")
+        await update_job_status(job_id, "failed", "No se pudo encolar la validación", error=str(e))
+        raise
+
+
+async def validate_upload_task(job_id: str, staging_path: str, original_filename: str, user_id: str,
+                               custom_filename: Optional[str] = None) -> Dict[str, Any]:
+    """Validar y guardar un archivo dejado en el staging compartido por la API.
+
+    staging_path es una ruta del almacén (objeto staging/ en S3, staging local en
+    disco), no un temporal del pod de la API. Los errores transitorios (VLM,
+    almacenamiento, Mongo) se propagan para que el worker reintente; los de datos
+    (archivo inexistente, tipo no válido) son PermanentError. El archivo de staging
+    solo se elimina con un resultado definitivo.
+
+    Es idempotente por job_id: una re-entrega (p. ej. el worker cayó tras guardar
+    la imagen pero antes de confirmar el offset) no crea un segundo registro.
+    """
+    repository = MongoImageRepository()
+    existing = await repository.find_by_validation_job(job_id)
+    if existing is not None:
+        await update_job_status(job_id, "completed", "Imagen ya guardada", image_id=existing.id)
+        await storage_service.discard_shared_staged(staging_path)
+        logger.info(f"[VALIDATION_TASKS] Job {job_id} ya guardado como imagen {existing.id}: re-entrega ignorada")
+        return {"image": existing, "message": "Imagen ya guardada"}
+    job = await get_job_status(job_id)
+    if job is not None and job.get("status") == "rejected":
+        await storage_service.discard_shared_staged(staging_path)
+        return {"image": None, "message": job.get("message", ""), "error_code": job.get("error")}
+
+    if not await storage_service.exists(staging_path):
+        # Puede ser una re-entrega de un job ya terminado
+        await update_job_status(job_id, "failed", "Archivo de staging no encontrado", error="staging_not_found")
+        raise PermanentError(f"Archivo de staging no encontrado: {staging_path}")
+
+    await update_job_status(job_id, "processing", "Validando imagen")
+    file_content = await storage_service.read_shared_staged(staging_path)
+
+    use_case = ValidateUploadUseCase(storage_service, repository)
+    try:
+        result = await use_case.execute(file_content, original_filename, user_id, custom_filename, job_id=job_id)
+    except ValueError as e:
+        await update_job_status(job_id, "failed", "Archivo no válido", error=str(e))
+        await storage_service.discard_shared_staged(staging_path)
+        raise PermanentError(str(e))
+
+    image = result.get("image")
+    if image is None and result.get("error_code") == "validator_error":
+        # El validador no pudo responder: error transitorio, se reintenta (el staging se conserva)
+        await update_job_status(job_id, "processing", "Validador no disponible, reintentando", error="validator_error")
+        raise RuntimeError(result.get("error_detail") or result.get("message"))
+
+    if image is None:
+        await update_job_status(job_id, "rejected", result.get("message", ""), error=result.get("error_code"))
+    else:
+        await update_job_status(
+            job_id, "completed", result.get("message", ""), image_id=image.id, error=result.get("error_code")
+        )
+    await storage_service.discard_shared_staged(staging_path)
+    logger.info(f"[VALIDATION_TASKS] Job {job_id} terminado: {result.get('message')}")
+    return result
+
+
+async def validate_stored_image_task(job_id: str, image_id: str) -> Dict[str, Any]:
+    """Validar una imagen ya registrada tras una subida directa al almacenamiento.
+
+    Misma política de errores que validate_upload_task; una re-entrega de una
+    imagen ya validada solo cierra el job.
+    """
+    repository = MongoImageRepository()
+    image = await repository.find_by_id(image_id)
+    if image is None:
+        # Imagen rechazada en una entrega anterior o eliminada
+        await update_job_status(job_id, "failed", "Imagen no encontrada", image_id=image_id, error="image_not_found")
+        raise PermanentError(f"Imagen no encontrada: {image_id}")
+    if image.metadata.get("medical_validation", {}).get("status") == "completed":
+        await update_job_status(job_id, "completed", "Imagen ya validada", image_id=image_id)
+        return {"image": image, "message": "Imagen ya validada"}
+
+    await update_job_status(job_id, "processing", "Validando imagen", image_id=image_id)
+    result = await ValidateUploadUseCase(storage_service, repository).execute_stored(image)
+    if result.get("image") is None and result.get("error_code") == "validator_error":
+        # La imagen se conserva: se reintenta la validación
+        await update_job_status(
+            job_id, "processing", "Validador no disponible, reintentando", image_id=image_id, error="validator_error"
+        )
+        raise RuntimeError(result.get("error_detail") or result.get("message"))
+
+    if result.get("image") is None:
+        await update_job_status(job_id, "rejected", result.get("message", ""), error=result.get("error_code"))
+    else:
+        await update_job_status(
+            job_id, "completed", result.get("message", ""), image_id=image_id, error=result.get("error_code")
+        )
+    logger.info(f"[VALIDATION_TASKS] Job {job_id} (imagen {image_id}) terminado: {result.get('message')}")
+    return result
@@ -0,0 +1,57 @@
+import os
+import json
+import signal
+import asyncio
+import argparse
+import logging
+
+from infrastructure.database import database
+from infrastructure.storage import storage_service
+from infrastructure.repositories.MongoImageRepository import MongoImageRepository
+from usecases.reconcile_storage import ReconcileStorageUseCase
+
+logger = logging.getLogger(__name__)
+
+# Intervalo entre pasadas del reconciliador en segundo plano
+RECONCILE_INTERVAL_SECONDS = float(os.getenv("RECONCILE_INTERVAL_SECONDS", "3600"))
+
+
+async def run(dry_run: bool, repair_records: bool, once: bool) -> None:
+    await database.connect_db()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        while not stop.is_set():
+            use_case = ReconcileStorageUseCase(storage_service, MongoImageRepository())
+            try:
+                report = await use_case.execute(dry_run=dry_run, repair_records=repair_records)
+                if once:
+                    print(json.dumps(report, indent=2, ensure_ascii=False, default=str))
+                    break
+            except Exception as e:
+                logger.error(f"[RECONCILE] Error en la pasada de reconciliación: {e}")
+                if once:
+                    raise
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=RECONCILE_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await database.close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconciliación entre el almacenamiento de imágenes y MongoDB")
+    parser.add_argument("--dry-run", action="store_true", help="Solo informar, sin borrar nada")
+    parser.add_argument("--repair-records", action="store_true",
+                        help="Eliminar también los registros cuyo archivo no existe")
+    parser.add_argument("--once", action="store_true", help="Una sola pasada e imprimir el resumen")
+    args = parser.parse_args()
+    logger.info("Iniciando reconciliador de almacenamiento...")
+    asyncio.run(run(args.dry_run, args.repair_records, args.once))
+
+
+if __name__ == "__main__":
+    main()
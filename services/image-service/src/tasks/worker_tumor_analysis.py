@@ -1,22 +1,65 @@
+import os
+import signal
+import asyncio
 import logging
-from .kafka_consumer import ImageKafkaConsumer
+from typing import Any, Dict, List, Optional
+
+from infrastructure.database import database
+from infrastructure.http_client import http_client
+from .batch_worker import BatchWorker
+from .tumor_analysis_tasks import analyze_tumor_batch, analysis_stats
 
 logger = logging.getLogger(__name__)
 
+TOPIC = 'tumor_analysis'
+GROUP_ID = 'image-service-analyze'
+
+
+async def process_tumor_analysis(messages: List[Dict[str, Any]]) -> List[Optional[Exception]]:
+    logger.info(f"Lote recibido en worker_tumor_analysis: {len(messages)} mensajes")
+    return await analyze_tumor_batch(messages)
+
+
+def build_worker(consumer: Any, producer: Any, **kwargs) -> BatchWorker:
+    """Worker de tumor_analysis: acumula mensajes hasta el tamaño de lote o la ventana de tiempo"""
+    kwargs.setdefault("max_batch_size", int(os.getenv("TUMOR_ANALYSIS_BATCH_SIZE", "32")))
+    kwargs.setdefault("batch_window_ms", int(os.getenv("TUMOR_ANALYSIS_BATCH_WINDOW_MS", "2000")))
+    return BatchWorker(
+        consumer,
+        producer,
+        None,
+        topic=TOPIC,
+        batch_handler=process_tumor_analysis,
+        **kwargs,
+    )
+
+
+async def run() -> None:
+    from .kafka_consumer import create_batch_consumer
+    from .kafka_producer import ImageKafkaProducer
+
+    await database.connect_db()
+    await http_client.connect()
+    producer = ImageKafkaProducer()
+    worker = build_worker(create_batch_consumer(TOPIC, GROUP_ID), producer)
 
-def process_tumor_analysis(message):
-    logger.info(f"Mensaje recibido en worker_tumor_analysis: {message}")
-    # Aquí iría la lógica de análisis de tumores
-    # Por ahora solo logueamos el mensaje
-    logger.info("Procesando análisis de tumor...")
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        logger.info("Worker de tumor_analysis escuchando...")
+        await worker.run()
+    finally:
+        logger.info(f"Métricas de análisis: {analysis_stats}")
+        producer.close()
+        await http_client.close()
+        await database.close_db()
 
 
 def main():
     logger.info("Iniciando worker de análisis de tumores...")
-    consumer = ImageKafkaConsumer(topic='tumor_analysis', group_id='image-service-analyze')
-    logger.info("Worker de tumor_analysis escuchando...")
-    consumer.listen(process_tumor_analysis)
+    asyncio.run(run())
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
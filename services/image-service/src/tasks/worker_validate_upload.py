@@ -1,34 +1,86 @@
+import signal
+import asyncio
 import logging
-from .kafka_consumer import ImageKafkaConsumer
-from .validation_tasks import validate_upload_task
+from typing import Any, Dict, Optional
+
+from infrastructure.database import database
+from infrastructure.http_client import http_client
+from adapters.gateways.vlm_gateway import VisionLanguageGateway
+from .batch_worker import BatchWorker, PermanentError
+from .validation_tasks import validate_upload_task, validate_stored_image_task, update_job_status
 
 logger = logging.getLogger(__name__)
 
+TOPIC = 'validate_upload'
+GROUP_ID = 'image-service-validate'
+
 
-def process_validate_upload(message):
-    logger.info(f"Mensaje recibido en worker_validate_upload: {message}")
+async def process_validate_upload(message: Dict[str, Any]) -> None:
+    logger.info(f"Mensaje recibido en worker_validate_upload: job_id={message.get('job_id')}")
     job_id = message.get('job_id')
+    if job_id and message.get('image_id'):
+        # Subida directa al almacenamiento: la imagen ya está registrada
+        await validate_stored_image_task(job_id, message['image_id'])
+        logger.info(f"Validación de la imagen {message['image_id']} ejecutada para job_id={job_id}")
+        return
     staging_path = message.get('staging_path')
     original_filename = message.get('original_filename')
     user_id = message.get('user_id')
     custom_filename = message.get('custom_filename')
-    if job_id and staging_path and original_filename and user_id:
-        logger.info(f"Ejecutando validate_upload_task con job_id={job_id}, staging_path={staging_path}, original_filename={original_filename}, user_id={user_id}, custom_filename={custom_filename}")
-        try:
-            validate_upload_task(job_id, staging_path, original_filename, user_id, custom_filename)
-            logger.info(f"Tarea de validación médica ejecutada para job_id={job_id}")
-        except Exception as e:
-            logger.error(f"Error procesando validación/upload para job {job_id}: {str(e)}")
-    else:
-        logger.error(f"Mensaje de validate_upload incompleto: job_id={job_id}, staging_path={staging_path}, original_filename={original_filename}, user_id={user_id}")
+    if not (job_id and staging_path and original_filename and user_id):
+        raise PermanentError(
+            f"Mensaje de validate_upload incompleto: job_id={job_id}, staging_path={staging_path}, "
+            f"original_filename={original_filename}, user_id={user_id}"
+        )
+    logger.info(f"Ejecutando validate_upload_task con job_id={job_id}, staging_path={staging_path}, original_filename={original_filename}, user_id={user_id}, custom_filename={custom_filename}")
+    await validate_upload_task(job_id, staging_path, original_filename, user_id, custom_filename)
+    logger.info(f"Tarea de validación médica ejecutada para job_id={job_id}")
+
+
+async def mark_job_failed(message: Optional[Dict[str, Any]], error: str) -> None:
+    """Al enviar un mensaje a la DLQ, dejar su job en estado 'failed'"""
+    if message and message.get('job_id'):
+        await update_job_status(message['job_id'], "failed", "Error procesando la validación", error=error)
+
+
+def build_worker(consumer: Any, producer: Any, **kwargs) -> BatchWorker:
+    """Worker de validate_upload sobre un consumidor/productor Kafka o en memoria"""
+    return BatchWorker(
+        consumer,
+        producer,
+        process_validate_upload,
+        topic=TOPIC,
+        on_dead_letter=mark_job_failed,
+        **kwargs,
+    )
+
+
+async def run() -> None:
+    from .kafka_consumer import create_batch_consumer
+    from .kafka_producer import ImageKafkaProducer
+
+    await database.connect_db()
+    await http_client.connect()
+    producer = ImageKafkaProducer()
+    worker = build_worker(create_batch_consumer(TOPIC, GROUP_ID), producer)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        logger.info("Worker de validate_upload escuchando...")
+        await worker.run()
+    finally:
+        producer.close()
+        await http_client.close()
+        VisionLanguageGateway.shutdown()
+        await database.close_db()
 
 
 def main():
     logger.info("Iniciando worker de validación de upload...")
-    consumer = ImageKafkaConsumer(topic='validate_upload')
-    logger.info("Worker de validate_upload escuchando...")
-    consumer.listen(process_validate_upload)
+    asyncio.run(run())
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
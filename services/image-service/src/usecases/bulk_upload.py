@@ -0,0 +1,209 @@
+import os
+import time
+import asyncio
+import logging
+import tarfile
+import zipfile
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from infrastructure.storage import StorageService, StagedUpload
+from infrastructure.repositories.MongoImageRepository import MongoImageRepository
+from domain.entities.Image import Image as ImageEntity
+from usecases.upload_image import UploadImageUseCase
+from usecases.validate_upload import ValidateUploadUseCase
+from usecases.processing_status import publish_status
+
+logger = logging.getLogger(__name__)
+
+ZIP_EXTENSIONS = (".zip",)
+TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+# Resultado de preparar una entrada: (nombre, subida en staging o None, error o None)
+StagedEntry = Tuple[str, Optional[StagedUpload], Optional[str]]
+
+
+def is_archive(filename: str) -> bool:
+    name = filename.lower()
+    return name.endswith(ZIP_EXTENSIONS) or name.endswith(TAR_EXTENSIONS)
+
+
+class BulkUploadUseCase:
+    """Subida masiva de varios archivos o de un ZIP/TAR (p. ej. todos los cortes de un estudio).
+
+    Las entradas se extraen en streaming a staging una a una (con contrapresión),
+    se procesan en paralelo con un límite de concurrencia (validación, almacenamiento
+    y metadatos) y los registros se insertan en Mongo con insert_many por grupos.
+    Los resultados por archivo se emiten a medida que quedan persistidos.
+    """
+
+    def __init__(self, storage_service: StorageService, image_repository: MongoImageRepository):
+        self.storage_service = storage_service
+        self.image_repository = image_repository
+        self.concurrency = int(os.getenv("BULK_UPLOAD_CONCURRENCY", "4"))
+        self.insert_batch_size = int(os.getenv("BULK_UPLOAD_INSERT_BATCH_SIZE", "20"))
+        self.insert_window_seconds = int(os.getenv("BULK_UPLOAD_INSERT_WINDOW_MS", "250")) / 1000
+        self.max_files = int(os.getenv("BULK_UPLOAD_MAX_FILES", "500"))
+
+    async def execute(self, files: List[Tuple[str, BinaryIO]], user_id: str, validate: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Procesar los archivos y emitir un resultado por archivo y un resumen final"""
+        start = time.perf_counter()
+        results: asyncio.Queue = asyncio.Queue()
+        producer = asyncio.create_task(self._produce(files, user_id, validate, results))
+        summary = {"total": 0, "ok": 0, "rejected": 0, "failed": 0}
+        pending: List[Tuple[str, ImageEntity, str]] = []
+        done = False
+        try:
+            while not done or pending:
+                item = None
+                if not done:
+                    try:
+                        timeout = self.insert_window_seconds if pending else None
+                        item = await asyncio.wait_for(results.get(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        item = None
+                if item is not None and item.get("done"):
+                    done = True
+                elif item is not None and item.get("image") is not None:
+                    pending.append((item["filename"], item["image"], item["message"]))
+                elif item is not None:
+                    summary["total"] += 1
+                    summary[item["status"] if item["status"] == "rejected" else "failed"] += 1
+                    yield item
+
+                # Insertar al llenar el grupo, al vencer la ventana o al terminar
+                if pending and (len(pending) >= self.insert_batch_size or item is None or done):
+                    for line in await self._insert(pending):
+                        summary["total"] += 1
+                        summary["ok" if line["status"] == "ok" else "failed"] += 1
+                        yield line
+                    pending = []
+        finally:
+            if not producer.done():
+                producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+        summary["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        yield {"summary": summary}
+
+    async def _produce(self, files: List[Tuple[str, BinaryIO]], user_id: str, validate: bool, results: asyncio.Queue) -> None:
+        """Extraer entradas a staging y lanzar su procesamiento con concurrencia acotada"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = []
+        try:
+            entries = self._iter_staged_entries(files)
+            while True:
+                # Contrapresión: no se extrae la siguiente entrada hasta que haya hueco
+                await semaphore.acquire()
+                try:
+                    entry = await asyncio.to_thread(next, entries, None)
+                except Exception as e:
+                    semaphore.release()
+                    await results.put({"filename": None, "status": "error", "message": f"Error leyendo el archivo: {e}"})
+                    break
+                if entry is None:
+                    semaphore.release()
+                    break
+                tasks.append(asyncio.create_task(self._process_entry(entry, user_id, validate, results, semaphore)))
+            await asyncio.gather(*tasks)
+        finally:
+            await results.put({"done": True})
+
+    def _iter_staged_entries(self, files: List[Tuple[str, BinaryIO]]) -> Iterator[StagedEntry]:
+        """Recorrer archivos y entradas de archivos comprimidos volcando cada una a staging (síncrono)"""
+        count = 0
+        for filename, fileobj in files:
+            for name, entry in self._iter_entries(filename, fileobj):
+                count += 1
+                if count > self.max_files:
+                    yield name, None, f"Se supera el máximo de {self.max_files} archivos por subida"
+                    return
+                if not self.storage_service.is_valid_image_type(name):
+                    yield name, None, "Tipo de archivo no válido"
+                    continue
+                try:
+                    yield name, self.storage_service.stage_fileobj(entry, name), None
+                except ValueError as e:
+                    yield name, None, str(e)
+
+    @staticmethod
+    def _iter_entries(filename: str, fileobj: BinaryIO) -> Iterator[Tuple[str, BinaryIO]]:
+        lower = filename.lower()
+        if lower.endswith(ZIP_EXTENSIONS):
+            with zipfile.ZipFile(fileobj) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or BulkUploadUseCase._is_hidden(info.filename):
+                        continue
+                    with archive.open(info) as entry:
+                        yield os.path.basename(info.filename), entry
+        elif lower.endswith(TAR_EXTENSIONS):
+            # Modo stream: el TAR se lee secuencialmente, sin búsquedas
+            with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+                for member in archive:
+                    if not member.isfile() or BulkUploadUseCase._is_hidden(member.name):
+                        continue
+                    entry = archive.extractfile(member)
+                    if entry is not None:
+                        yield os.path.basename(member.name), entry
+        else:
+            yield filename, fileobj
+
+    @staticmethod
+    def _is_hidden(path: str) -> bool:
+        return any(part.startswith(".") or part == "__MACOSX" for part in path.split("/") if part)
+
+    async def _process_entry(self, entry: StagedEntry, user_id: str, validate: bool,
+                             results: asyncio.Queue, semaphore: asyncio.Semaphore) -> None:
+        name, staged, error = entry
+        try:
+            if staged is None:
+                await results.put({"filename": name, "status": "error", "message": error})
+                return
+            if staged.size == 0:
+                await results.put({"filename": name, "status": "error", "message": "El archivo está vacío"})
+                return
+            if validate:
+                file_content = await self.storage_service.read_staged(staged)
+                result = await ValidateUploadUseCase(self.storage_service, self.image_repository).execute(
+                    file_content, name, user_id, staged=staged, persist=False
+                )
+                if result.get("image") is None:
+                    await results.put({
+                        "filename": name,
+                        "status": "rejected",
+                        "message": result.get("message", ""),
+                        "error_code": result.get("error_code"),
+                    })
+                    return
+                await results.put({"filename": name, "image": result["image"], "message": result.get("message", "")})
+            else:
+                unique_filename, file_info = await self.storage_service.save_staged(staged, name, user_id)
+                image = UploadImageUseCase._build_image(unique_filename, file_info, name, user_id, None)
+                await results.put({"filename": name, "image": image, "message": "Imagen subida correctamente"})
+        except Exception as e:
+            logger.error(f"[BULK_UPLOAD] Error procesando {name}: {e}")
+            await results.put({"filename": name, "status": "error", "message": str(e)})
+        finally:
+            if staged is not None:
+                self.storage_service.discard_staged_path(staged.path)
+            semaphore.release()
+
+    async def _insert(self, pending: List[Tuple[str, ImageEntity, str]]) -> List[Dict[str, Any]]:
+        """Insertar un grupo de imágenes con insert_many y construir sus líneas de resultado"""
+        images = [image for _, image, _ in pending]
+        try:
+            saved = await self.image_repository.save_many(images)
+        except Exception as e:
+            logger.error(f"[BULK_UPLOAD] Error insertando {len(images)} imágenes: {e}")
+            return [{"filename": name, "status": "error", "message": f"Error guardando el registro: {e}"}
+                    for name, _, _ in pending]
+        lines = []
+        for (name, _, message), image in zip(pending, saved):
+            publish_status(image)
+            lines.append({
+                "filename": name,
+                "status": "ok",
+                "image_id": image.id,
+                "processing_status": image.processing_status,
+                "message": message,
+            })
+        return lines
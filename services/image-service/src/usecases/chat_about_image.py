@@ -1,9 +1,11 @@
-from typing import List
+from typing import AsyncIterator, List, Tuple, Union
 from domain.entities.ChatMessage import ChatMessage
 from domain.repositories.ChatRepository import ChatRepository
 from domain.repositories.ImageRepository import ImageRepository
 from adapters.gateways.vlm_gateway import VisionLanguageGateway
-from infrastructure.storage import StorageService
+from infrastructure.storage import storage_service
+from infrastructure.derivatives import DerivativeService
+from infrastructure.dicom import is_dicom
 
 
 class ChatAboutImageUseCase:
@@ -15,7 +17,7 @@ class ChatAboutImageUseCase:
     async def get_history(self, image_id: str, user_id: str, limit: int = 50) -> List[ChatMessage]:
         return await self.chat_repo.get_history(image_id=image_id, user_id=user_id, limit=limit)
 
-    async def ask(self, image_id: str, user_id: str, prompt: str) -> ChatMessage:
+    async def _prepare(self, image_id: str, user_id: str, prompt: str) -> Tuple[bytes, str]:
         # 1. Cargar imagen
         image = await self.image_repo.find_by_id(image_id)
         if not image:
@@ -26,11 +28,20 @@ class ChatAboutImageUseCase:
         await self.chat_repo.add_message(user_msg)
 
         # 3. Leer bytes de imagen (S3 o local)
-        storage = StorageService()
-        image_bytes = storage.read_bytes(image.file_path)
+        mime_type = image.mime_type
+        if is_dicom(filename=image.file_path, mime_type=mime_type):
+            # El VLM no entiende DICOM: usar la vista renderizada (cacheada en almacenamiento)
+            image_bytes, mime_type = await DerivativeService(storage_service).get_derivative(image.file_path, "vlm")
+        else:
+            # Lectura asíncrona: no bloquea el event loop mientras llega el objeto
+            image_bytes = await storage_service.read(image.file_path)
+        return image_bytes, mime_type
+
+    async def ask(self, image_id: str, user_id: str, prompt: str) -> ChatMessage:
+        image_bytes, mime_type = await self._prepare(image_id, user_id, prompt)
 
         # 4. Consultar VLM
-        answer = self.vlm.ask_about_image(prompt=prompt, image_bytes=image_bytes, mime_type=image.mime_type)
+        answer = await self.vlm.ask_about_image(prompt=prompt, image_bytes=image_bytes, mime_type=mime_type)
 
         # 5. Guardar respuesta del asistente
         assistant_msg = ChatMessage(image_id=image_id, user_id=user_id, role="assistant", content=answer)
@@ -38,4 +49,27 @@ class ChatAboutImageUseCase:
 
         return assistant_msg
 
+    async def ask_stream(self, image_id: str, user_id: str, prompt: str) -> AsyncIterator[Union[str, ChatMessage]]:
+        """Como ask, pero devuelve los fragmentos de la respuesta según llegan del VLM.
 
+        Los errores de la imagen (ValueError) se lanzan antes de empezar el stream. El
+        último elemento es el mensaje del asistente, que solo se guarda si la respuesta
+        se completa (si el cliente se desconecta, la generación se cancela sin guardarla).
+        """
+        image_bytes, mime_type = await self._prepare(image_id, user_id, prompt)
+        return self._stream_answer(image_id, user_id, prompt, image_bytes, mime_type)
+
+    async def _stream_answer(self, image_id: str, user_id: str, prompt: str, image_bytes: bytes,
+                             mime_type: str) -> AsyncIterator[Union[str, ChatMessage]]:
+        parts = []
+        chunks = self.vlm.stream_about_image(prompt=prompt, image_bytes=image_bytes, mime_type=mime_type)
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+        assistant_msg = ChatMessage(image_id=image_id, user_id=user_id, role="assistant", content="".join(parts).strip())
+        await self.chat_repo.add_message(assistant_msg)
+        yield assistant_msg
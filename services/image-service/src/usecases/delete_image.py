@@ -1,5 +1,7 @@
 from domain.repositories.ImageRepository import ImageRepository
 from infrastructure.storage import storage_service
+from infrastructure.derivatives import DerivativeService
+from infrastructure.blob_releases import release_blob
 
 class DeleteImageUseCase:
     def __init__(self, image_repository: ImageRepository):
@@ -12,10 +14,15 @@ class DeleteImageUseCase:
         if not image:
             raise ValueError("Imagen no encontrada")
         
-        # Eliminar archivo del almacenamiento
-        file_deleted = await storage_service.delete_image(image.file_path)
-        
         # Eliminar registro de la base de datos
         db_deleted = await self.image_repository.delete(image_id)
         
-        return file_deleted and db_deleted 
\ No newline at end of file
+        # Blob direccionado por contenido: se libera si ninguna otra imagen apunta a él
+        # y lo borra el reconciliador (puede estar reutilizándolo una subida en curso)
+        if (image.metadata or {}).get("content_hash"):
+            await release_blob(self.image_repository, image.file_path)
+            return db_deleted
+        file_deleted = await storage_service.delete_image(image.file_path)
+        await DerivativeService(storage_service).delete_derivatives(image.file_path)
+        
+        return file_deleted and db_deleted
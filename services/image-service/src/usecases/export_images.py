@@ -0,0 +1,48 @@
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from domain.repositories.ImageRepository import ImageRepository
+from usecases.get_images import encode_cursor, decode_cursor
+
+# Imágenes por consulta a Mongo (y por bloque escrito en la respuesta)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+class ExportImagesUseCase:
+    """Exportación por lotes de imágenes filtradas, en el orden de los listados.
+
+    Cada lote es una consulta keyset independiente (tras la última posición
+    exportada), así que no queda ningún cursor de Mongo abierto mientras el
+    cliente consume la respuesta, y el token de reanudación de un lote permite
+    continuar la exportación desde ahí si la conexión se corta.
+    """
+
+    def __init__(self, image_repository: ImageRepository):
+        self.image_repository = image_repository
+
+    def execute(self, status: Optional[str] = None, user_id: Optional[str] = None,
+                date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                resume_token: Optional[str] = None,
+                batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """Validar los filtros y devolver el iterador de lotes {images, resume_token}.
+
+        Lanza ValueError (antes de empezar a exportar) si el token o el rango de fechas no son válidos.
+        """
+        if date_from and date_to and date_from >= date_to:
+            raise ValueError("El rango de fechas está vacío (date_from debe ser anterior a date_to)")
+        after = decode_cursor(resume_token) if resume_token else None
+        return self._batches(status, user_id, date_from, date_to, after, batch_size)
+
+    async def _batches(self, status: Optional[str], user_id: Optional[str], date_from: Optional[datetime],
+                       date_to: Optional[datetime], after: Optional[Tuple[datetime, str]],
+                       batch_size: int) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            images = await self.image_repository.find_page_documents(
+                user_id, batch_size, after=after, status=status, date_from=date_from, date_to=date_to
+            )
+            if not images:
+                return
+            last = images[-1]
+            after = (last["upload_date"], last["id"])
+            yield {"images": images, "resume_token": encode_cursor(*after)}
+            if len(images) < batch_size:
+                return
@@ -1,17 +1,54 @@
-from typing import List
+import json
+import base64
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
 from domain.entities.Image import Image
 from domain.repositories.ImageRepository import ImageRepository
 
+def encode_cursor(upload_date: datetime, image_id: str) -> str:
+    """Cursor opaco con la posición (upload_date, id) de la última imagen de la página"""
+    raw = json.dumps({"d": upload_date.isoformat(), "i": image_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Posición codificada en un cursor; ValueError si no es válido"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+        upload_date, image_id = datetime.fromisoformat(position["d"]), str(position["i"])
+    except Exception:
+        raise ValueError("Cursor de paginación no válido")
+    # El id se convierte a ObjectId en la consulta: uno mal formado es un error del cliente
+    if not ObjectId.is_valid(image_id):
+        raise ValueError("Cursor de paginación no válido")
+    return upload_date, image_id
+
 class GetImagesUseCase:
     def __init__(self, image_repository: ImageRepository):
         self.image_repository = image_repository
     
-    async def execute(self, user_id: str = None, skip: int = 0, limit: int = 100) -> List[Image]:
-        """Ejecutar el caso de uso de obtener imágenes"""
-        if user_id:
-            return await self.image_repository.find_by_user_id(user_id)
+    async def execute(self, user_id: str = None, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                      include_total: bool = False) -> Dict[str, Any]:
+        """Ejecutar el caso de uso de obtener imágenes (paginación por cursor sobre upload_date e id).
+
+        `skip` se mantiene por compatibilidad; con `cursor` se ignora. Las imágenes se
+        devuelven como documentos con la forma de ImageResponse, sin pasar por entidades.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        # Se pide una imagen de más para saber si hay página siguiente
+        page_query = self.image_repository.find_page_documents(user_id, limit + 1, after=after,
+                                                               skip=0 if after else skip)
+        if include_total:
+            images, total = await asyncio.gather(page_query, self.image_repository.count(user_id))
         else:
-            return await self.image_repository.find_all(skip=skip, limit=limit)
+            images, total = await page_query, None
+        next_cursor = None
+        if len(images) > limit:
+            last = images[limit - 1]
+            next_cursor = encode_cursor(last["upload_date"], last["id"])
+        return {"images": images[:limit], "next_cursor": next_cursor, "total": total}
 
 class GetImageByIdUseCase:
     def __init__(self, image_repository: ImageRepository):
@@ -28,6 +65,6 @@ class GetImagesByStatusUseCase:
     def __init__(self, image_repository: ImageRepository):
         self.image_repository = image_repository
     
-    async def execute(self, status: str) -> List[Image]:
-        """Ejecutar el caso de uso de obtener imágenes por estado"""
-        return await self.image_repository.find_by_status(status) 
\ No newline at end of file
+    async def execute(self, status: str, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Ejecutar el caso de uso de obtener imágenes por estado (documentos con la forma de ImageResponse)"""
+        return await self.image_repository.find_by_status_documents(status, limit) 
\ No newline at end of file
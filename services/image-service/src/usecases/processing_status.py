@@ -0,0 +1,81 @@
+import re
+import logging
+from typing import Any, Dict
+
+from domain.entities.Image import Image
+from adapters.dtos.image_dto import ProcessingStatusResponse, TumorPredictionResult
+from infrastructure.status_hub import status_hub
+
+logger = logging.getLogger(__name__)
+
+# Etiquetas de predicción que indican tumor
+TUMOR_LABEL_PATTERN = re.compile(r'tumor|sí|si|true|1', re.IGNORECASE)
+
+
+def build_processing_status(image: Image) -> ProcessingStatusResponse:
+    """Estado del procesamiento de una imagen (respuesta de polling y eventos push)"""
+    # Extraer información del procesamiento
+    processing_started = None
+    processing_completed = None
+    prediction = None
+
+    if image.metadata:
+        if 'processing_started' in image.metadata:
+            processing_started = image.metadata['processing_started']
+        if 'processing_completed' in image.metadata:
+            processing_completed = image.metadata['processing_completed']
+        if 'prediction' in image.metadata:
+            pred_data = image.metadata['prediction']
+            # Normalizar datos de predicción del colab-service
+            pred_label = str(pred_data.get('prediction', ''))
+            # Determinar si es tumor basado en el label
+            es_tumor = bool(TUMOR_LABEL_PATTERN.search(pred_label)) if isinstance(pred_label, str) else bool(pred_label)
+            prediction = TumorPredictionResult(
+                es_tumor=es_tumor,
+                clase_predicha=pred_label,
+                confianza=float(pred_data.get('mean_score', 0)),
+                probabilidades={},  # El colab-service no devuelve probabilidades detalladas
+                recomendacion=''  # El colab-service no incluye recomendación
+            )
+
+    # Generar mensaje según el estado
+    if image.processing_status == "pending":
+        message = "La imagen está en cola para procesamiento"
+    elif image.processing_status == "processing":
+        message = "La imagen se está procesando actualmente"
+    elif image.processing_status == "completed":
+        message = "El análisis se ha completado exitosamente"
+    elif image.processing_status == "failed":
+        error_msg = image.metadata.get('processing_error', 'Error desconocido') if image.metadata else 'Error desconocido'
+        message = f"El procesamiento falló: {error_msg}"
+    else:
+        message = f"Estado desconocido: {image.processing_status}"
+
+    return ProcessingStatusResponse(
+        image_id=str(image.id),
+        status=image.processing_status,
+        message=message,
+        prediction=prediction,
+        processing_started=processing_started,
+        processing_completed=processing_completed
+    )
+
+
+def status_event(image: Image) -> Dict[str, Any]:
+    """Evento de estado serializable para el hub (incluye el usuario para los canales por usuario)"""
+    return {**build_processing_status(image).model_dump(mode="json"), "user_id": image.user_id}
+
+
+def status_event_from_document(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Evento de estado a partir de un documento de Mongo (change streams)"""
+    doc = {**doc, "_id": str(doc["_id"])}
+    return status_event(Image.model_validate(doc))
+
+
+def publish_status(image: Image) -> None:
+    """Notificar a los suscriptores el estado actual de la imagen"""
+    try:
+        status_hub.publish_local(status_event(image))
+    except Exception as e:
+        # Una notificación fallida nunca debe romper el flujo principal
+        logger.warning(f"[PROCESSING_STATUS] No se pudo publicar el estado de {image.id}: {e}")
@@ -0,0 +1,311 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from domain.repositories.ImageRepository import ImageRepository
+from infrastructure.database import database
+from infrastructure.blob_releases import ORPHAN_GRACE_SECONDS, released_at
+from infrastructure.storage import StorageService
+from infrastructure.storage_backends import get_backend
+from usecases.upload_session import UPLOAD_SESSIONS_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+# Ruta de un objeto direccionado por contenido: .../<sha256>[.<derivado>].<ext>
+CONTENT_ADDRESSED_PATH = re.compile(r"^(.*[/\\][0-9a-f]{64})(\..*)?$")
+# Temporales de subida (<uuid><ext>.part) fuera del staging propio del almacenamiento local
+STAGED_UPLOAD_NAME = re.compile(r"^[0-9a-f]{32}[^/\\]*\.part$")
+# Sesiones que aún pueden recibir o completar su subida
+OPEN_SESSION_STATUSES = ("pending", "completing")
+# Rutas de ejemplo por categoría en el informe
+REPORT_SAMPLES = 20
+
+Group = Tuple[str, List[Dict[str, Any]]]
+
+
+def group_key(path: str) -> str:
+    """Clave de agrupación: un blob y sus derivados (<hash>.thumb_128.webp, <hash>.rendered.png) comparten la suya"""
+    match = CONTENT_ADDRESSED_PATH.match(path)
+    return match.group(1) if match else path
+
+
+def age_seconds(modified: Optional[datetime], now: datetime) -> float:
+    """Antigüedad de una fecha (naive UTC o con zona) respecto a now (naive UTC)"""
+    if modified is None:
+        return 0.0
+    if modified.tzinfo is not None:
+        modified = modified.astimezone(timezone.utc).replace(tzinfo=None)
+    return (now - modified).total_seconds()
+
+
+class RepairBudget:
+    """Límite de reparaciones por segundo y por ejecución (no saturar el almacén ni Mongo)"""
+
+    def __init__(self, rate: float, max_repairs: int):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.max_repairs = max_repairs
+        self.used = 0
+        self._next_at = 0.0
+
+    async def acquire(self) -> bool:
+        if self.used >= self.max_repairs:
+            return False
+        wait = self._next_at - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._next_at = max(self._next_at, time.monotonic()) + self.interval
+        self.used += 1
+        return True
+
+
+class ReconcileStorageUseCase:
+    """Reconciliación entre el almacenamiento y la colección de imágenes.
+
+    - Recorre en streaming, por lotes y ordenados por ruta, los objetos de cada área
+      (blobs/ e images/) y los registros de Mongo bajo el mismo prefijo, y los cruza
+      como un merge-join: objetos sin registro (huérfanos) y registros sin objeto.
+    - Aplica un TTL a los temporales de staging y a los objetos de sesiones de
+      subida directa caducadas o inexistentes.
+    - En modo dry-run solo informa; si no, repara con un límite de ritmo. Borrar
+      registros sin objeto es opcional (repair_records): es información clínica.
+    """
+
+    def __init__(self, storage_service: StorageService, image_repository: ImageRepository):
+        self.storage_service = storage_service
+        self.image_repository = image_repository
+        self.batch_size = int(os.getenv("RECONCILE_BATCH_SIZE", "1000"))
+        self.staging_ttl = int(os.getenv("STAGING_TTL_SECONDS", str(24 * 3600)))
+        # Margen para no tocar subidas en curso ni blobs recién liberados (ver blob_releases)
+        self.orphan_grace = ORPHAN_GRACE_SECONDS
+        self.repair_rate = float(os.getenv("RECONCILE_REPAIR_RATE", "20"))
+        self.max_repairs = int(os.getenv("RECONCILE_MAX_REPAIRS", "10000"))
+
+    async def execute(self, dry_run: bool = True, repair_records: bool = False) -> Dict[str, Any]:
+        """Ejecutar una pasada completa y devolver el informe"""
+        started = time.monotonic()
+        self.dry_run = dry_run
+        self.repair_records = repair_records
+        self.now = datetime.utcnow()
+        self.budget = RepairBudget(self.repair_rate, self.max_repairs)
+        self.report = {
+            "dry_run": dry_run,
+            "scanned_objects": 0,
+            "scanned_records": 0,
+            "orphan_objects": 0,
+            "orphan_bytes": 0,
+            "missing_objects": 0,
+            "expired_staging": 0,
+            "expired_staging_bytes": 0,
+            "expired_uploads": 0,
+            "expired_uploads_bytes": 0,
+            "deleted_objects": 0,
+            "deleted_records": 0,
+            "skipped_repairs": 0,
+            "errors": 0,
+            "samples": {"orphan_objects": [], "missing_objects": [], "expired_staging": [], "expired_uploads": []},
+        }
+
+        for area in ("blobs", "images"):
+            await self._reconcile_area(self.storage_service._location(area))
+        await self._sweep_staging()
+        await self._sweep_uploads()
+
+        self.report["duration_seconds"] = round(time.monotonic() - started, 3)
+        logger.info(
+            f"[RECONCILE] {'Dry-run' if dry_run else 'Reparación'} completada: "
+            f"{self.report['orphan_objects']} huérfanos, {self.report['missing_objects']} registros sin objeto, "
+            f"{self.report['expired_staging'] + self.report['expired_uploads']} temporales caducados, "
+            f"{self.report['deleted_objects']} objetos y {self.report['deleted_records']} registros eliminados"
+        )
+        return self.report
+
+    async def _reconcile_area(self, location: str) -> None:
+        """Merge-join de los objetos de un área con los registros que apuntan a ella"""
+        separator = "/" if "://" in location else os.sep
+        prefix = location.rstrip("/\\") + separator
+        objects = self._group(self._scan_area(location), lambda o: group_key(o["path"]))
+        records = self._group(self._scan_records(prefix), lambda r: group_key(r["file_path"]))
+
+        object_group = await self._next(objects)
+        record_group = await self._next(records)
+        while object_group is not None or record_group is not None:
+            if record_group is None or (object_group is not None and object_group[0] < record_group[0]):
+                await self._orphan_objects(object_group[1])
+                object_group = await self._next(objects)
+            elif object_group is None or record_group[0] < object_group[0]:
+                await self._missing_objects(record_group[1])
+                record_group = await self._next(records)
+            else:
+                # Blob referenciado: basta con que exista el objeto al que apunta cada registro
+                present = {o["path"] for o in object_group[1]}
+                missing = [r for r in record_group[1] if r["file_path"] not in present]
+                if missing:
+                    await self._missing_objects(missing)
+                object_group = await self._next(objects)
+                record_group = await self._next(records)
+
+    async def _scan_area(self, location: str) -> AsyncIterator[Dict[str, Any]]:
+        backend = self.storage_service.backend_for(location)
+        async for obj in backend.list_objects(location, self.batch_size):
+            self.report["scanned_objects"] += 1
+            if obj["path"].endswith(".tmp"):
+                # Escritura atómica interrumpida: no pertenece a ningún blob
+                await self._expire(obj, "expired_staging", self.staging_ttl)
+                continue
+            yield obj
+
+    async def _scan_records(self, prefix: str) -> AsyncIterator[Dict[str, Any]]:
+        async for record in self.image_repository.iter_file_paths(prefix, self.batch_size):
+            self.report["scanned_records"] += 1
+            yield record
+
+    async def _orphan_objects(self, group: List[Dict[str, Any]]) -> None:
+        """Objetos sin ningún registro; el grupo (blob y derivados) se trata junto.
+
+        El margen cuenta desde la última escritura del grupo o desde que se liberó
+        el blob al borrar su última imagen, lo más reciente: un blob antiguo recién
+        liberado (que una subida puede estar reutilizando por deduplicación) no se toca.
+        """
+        if max(age_seconds(o["last_modified"], self.now) for o in group) < self.orphan_grace:
+            return
+        released = await released_at([o["path"] for o in group])
+        if any(age_seconds(when, self.now) < self.orphan_grace for when in released.values()):
+            return
+        for obj in group:
+            self._record("orphan_objects", obj["path"])
+            self.report["orphan_bytes"] += obj["size"]
+            await self._delete_object(obj["path"])
+
+    async def _missing_objects(self, records: List[Dict[str, Any]]) -> None:
+        """Registros cuyo archivo ya no está en el almacenamiento"""
+        for record in records:
+            if age_seconds(record["upload_date"], self.now) < self.orphan_grace:
+                continue
+            self._record("missing_objects", f"{record['id']} -> {record['file_path']}")
+            if self.dry_run or not self.repair_records:
+                continue
+            if not await self.budget.acquire():
+                self.report["skipped_repairs"] += 1
+                continue
+            if await self.image_repository.delete(record["id"]):
+                self.report["deleted_records"] += 1
+                logger.warning(f"[RECONCILE] Registro {record['id']} eliminado: su archivo no existe ({record['file_path']})")
+            else:
+                self.report["errors"] += 1
+
+    async def _sweep_staging(self) -> None:
+        """TTL de los temporales de subida y de validación asíncrona"""
+        tmp_dir = self.storage_service.upload_tmp_dir
+        uploads = self.storage_service.uploads_location()
+        if self.storage_service.storage_type == "local":
+            # Staging propio del almacenamiento: todo lo que contiene es temporal
+            async for obj in get_backend("local").list_objects(tmp_dir, self.batch_size):
+                if obj["path"].startswith(uploads + os.sep):
+                    continue
+                self.report["scanned_objects"] += 1
+                await self._expire(obj, "expired_staging", self.staging_ttl)
+            return
+        # Directorio temporal compartido del sistema: solo los .part de este servicio
+        for obj in await asyncio.to_thread(self._list_staged_uploads, tmp_dir):
+            self.report["scanned_objects"] += 1
+            await self._expire(obj, "expired_staging", self.staging_ttl)
+        # Temporales de validación asíncrona publicados en el almacén (staging/)
+        location = self.storage_service._location("staging")
+        async for obj in self.storage_service.backend_for(location).list_objects(location, self.batch_size):
+            self.report["scanned_objects"] += 1
+            await self._expire(obj, "expired_staging", self.staging_ttl)
+
+    @staticmethod
+    def _list_staged_uploads(directory: str) -> List[Dict[str, Any]]:
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return []
+        staged = []
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False) and STAGED_UPLOAD_NAME.match(entry.name):
+                st = entry.stat(follow_symlinks=False)
+                staged.append({"path": entry.path, "size": st.st_size, "last_modified": datetime.utcfromtimestamp(st.st_mtime)})
+        return staged
+
+    async def _sweep_uploads(self) -> None:
+        """Objetos de sesiones de subida directa caducadas, inexistentes o ya completadas"""
+        location = self.storage_service.uploads_location()
+        batch: List[Dict[str, Any]] = []
+        async for obj in self.storage_service.backend_for(location).list_objects(location, self.batch_size):
+            self.report["scanned_objects"] += 1
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                await self._sweep_upload_batch(batch)
+                batch = []
+        if batch:
+            await self._sweep_upload_batch(batch)
+
+    async def _sweep_upload_batch(self, batch: List[Dict[str, Any]]) -> None:
+        session_ids = [self._session_id(obj["path"]) for obj in batch]
+        cursor = database.get_collection(UPLOAD_SESSIONS_COLLECTION).find(
+            {"_id": {"$in": session_ids}}, {"status": 1, "expires_at": 1}
+        )
+        sessions = {doc["_id"]: doc async for doc in cursor}
+        for session_id, obj in zip(session_ids, batch):
+            session = sessions.get(session_id)
+            if session is not None and session["status"] in OPEN_SESSION_STATUSES:
+                if age_seconds(session["expires_at"], self.now) < self.orphan_grace:
+                    continue
+                await self._expire(obj, "expired_uploads", 0)
+            else:
+                # Sin sesión (o ya cerrada): el objeto no se va a completar nunca
+                await self._expire(obj, "expired_uploads", self.orphan_grace)
+
+    @staticmethod
+    def _session_id(path: str) -> str:
+        name = re.split(r"[/\\]", path)[-1]
+        return name.split(".", 1)[0]
+
+    async def _expire(self, obj: Dict[str, Any], category: str, ttl: int) -> None:
+        if age_seconds(obj["last_modified"], self.now) < ttl:
+            return
+        self._record(category, obj["path"])
+        self.report[f"{category}_bytes"] += obj["size"]
+        await self._delete_object(obj["path"])
+
+    async def _delete_object(self, path: str) -> None:
+        if self.dry_run:
+            return
+        if not await self.budget.acquire():
+            self.report["skipped_repairs"] += 1
+            return
+        # delete_image también descarta la entrada de la caché de lectura
+        if await self.storage_service.delete_image(path):
+            self.report["deleted_objects"] += 1
+
+    def _record(self, category: str, sample: str) -> None:
+        self.report[category] += 1
+        samples = self.report["samples"][category]
+        if len(samples) < REPORT_SAMPLES:
+            samples.append(sample)
+
+    @staticmethod
+    async def _group(items: AsyncIterator[Dict[str, Any]], key_of: Callable[[Dict[str, Any]], str]) -> AsyncIterator[Group]:
+        """Agrupar elementos consecutivos (ya ordenados) con la misma clave"""
+        current_key, group = None, []
+        async for item in items:
+            key = key_of(item)
+            if group and key != current_key:
+                yield current_key, group
+                group = []
+            current_key = key
+            group.append(item)
+        if group:
+            yield current_key, group
+
+    @staticmethod
+    async def _next(groups: AsyncIterator[Group]) -> Optional[Group]:
+        try:
+            return await groups.__anext__()
+        except StopAsyncIteration:
+            return None
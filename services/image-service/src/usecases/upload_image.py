@@ -1,11 +1,12 @@
 import os
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import AsyncIterator, Optional, Dict, Any
 import logging
 
 from infrastructure.storage import StorageService
 from infrastructure.repositories.MongoImageRepository import MongoImageRepository
 from domain.entities.Image import Image as ImageEntity
+from usecases.processing_status import publish_status
 
 logger = logging.getLogger(__name__)
 
@@ -30,26 +31,51 @@ class UploadImageUseCase:
 
             # Guardar a almacenamiento definitivo
             unique_filename, file_info = await self.storage_service.save_image(file_content, original_filename, user_id)
-
-            # Crear entidad
-            image = ImageEntity(
-                filename=unique_filename,
-                original_filename=custom_filename if custom_filename else original_filename,
-                file_path=file_info["file_path"],
-                file_size=file_info["file_size"],
-                mime_type=file_info["mime_type"],
-                width=file_info.get("width"),
-                height=file_info.get("height"),
-                user_id=user_id,
-                upload_date=datetime.utcnow(),
-                processing_status="pending",
-                metadata={**file_info.get("metadata", {})},
-            )
+            image = self._build_image(unique_filename, file_info, original_filename, user_id, custom_filename)
 
             saved = await self.image_repository.save(image)
+            publish_status(saved)
             return {"image": saved, "message": "Imagen subida correctamente"}
 
         except Exception as e:
             logger.error(f"Error en upload_image síncrono: {str(e)}")
             raise
 
+    async def execute_stream(self, chunks: AsyncIterator[bytes], original_filename: str, user_id: str, custom_filename: Optional[str] = None) -> Dict[str, Any]:
+        """Subir una imagen leyendo el cuerpo por bloques, sin cargarla entera en memoria."""
+        logger.info(f"[UPLOAD_UC] Inicio (streaming) para archivo: {original_filename}")
+        if not self.storage_service.is_valid_image_type(original_filename):
+            raise ValueError("Tipo de archivo no válido")
+
+        # El tamaño máximo se comprueba mientras se recibe
+        staged = await self.storage_service.stage_stream(chunks, original_filename)
+        try:
+            if staged.size == 0:
+                raise ValueError("El archivo está vacío")
+            unique_filename, file_info = await self.storage_service.save_staged(staged, original_filename, user_id)
+            image = self._build_image(unique_filename, file_info, original_filename, user_id, custom_filename)
+            saved = await self.image_repository.save(image)
+            publish_status(saved)
+            return {"image": saved, "message": "Imagen subida correctamente"}
+        except Exception as e:
+            logger.error(f"Error en upload_image (streaming): {str(e)}")
+            raise
+        finally:
+            self.storage_service.discard_staged_path(staged.path)
+
+    @staticmethod
+    def _build_image(unique_filename: str, file_info: Dict[str, Any], original_filename: str, user_id: str, custom_filename: Optional[str]) -> ImageEntity:
+        """Crear la entidad a partir de la información de almacenamiento"""
+        return ImageEntity(
+            filename=unique_filename,
+            original_filename=custom_filename if custom_filename else original_filename,
+            file_path=file_info["file_path"],
+            file_size=file_info["file_size"],
+            mime_type=file_info["mime_type"],
+            width=file_info.get("width"),
+            height=file_info.get("height"),
+            user_id=user_id,
+            upload_date=datetime.utcnow(),
+            processing_status="pending",
+            metadata={**file_info.get("metadata", {})},
+        )
@@ -0,0 +1,194 @@
+import os
+import re
+import uuid
+import secrets
+import logging
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Optional
+
+from pymongo import IndexModel, ReturnDocument
+
+from infrastructure.database import database
+from infrastructure.storage import StorageService
+from infrastructure.repositories.MongoImageRepository import MongoImageRepository
+from usecases.upload_image import UploadImageUseCase
+from usecases.processing_status import publish_status
+from tasks.validation_tasks import enqueue_validation_job
+
+logger = logging.getLogger(__name__)
+
+# Colección con las sesiones de subida directa al almacenamiento
+UPLOAD_SESSIONS_COLLECTION = "upload_sessions"
+# Las sesiones se conservan un tiempo tras caducar (complete idempotente, auditoría) y luego expiran por TTL
+UPLOAD_SESSIONS_INDEXES = [
+    IndexModel(
+        "expires_at",
+        expireAfterSeconds=int(os.getenv("UPLOAD_SESSION_RETENTION_SECONDS", str(7 * 24 * 3600))),
+        name="expires_at_ttl",
+    ),
+]
+
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadSessionUseCase:
+    """Subidas directas al almacenamiento sin que los bytes pasen por el servicio.
+
+    1. create: el cliente declara nombre, tamaño y SHA-256 y recibe un destino
+       prefirmado (POST/PUT a S3, o el endpoint local de contenido en desarrollo).
+    2. El cliente sube el archivo directamente a ese destino.
+    3. complete: se verifica tamaño y hash con un HEAD/stat, el objeto se mueve a su
+       blob direccionado por contenido (copia en el servidor), se crea el registro de
+       la imagen y se encola su validación en validate_upload.
+    """
+
+    def __init__(self, storage_service: StorageService, image_repository: MongoImageRepository):
+        self.storage_service = storage_service
+        self.image_repository = image_repository
+        self.collection = database.get_collection(UPLOAD_SESSIONS_COLLECTION)
+        self.expires_in = int(os.getenv("UPLOAD_SESSION_EXPIRES_SECONDS", "900"))
+
+    async def create(self, original_filename: str, size: int, content_hash: str, user_id: str,
+                     custom_filename: Optional[str] = None) -> Dict[str, Any]:
+        """Abrir una sesión de subida y devolver su destino prefirmado"""
+        content_hash = content_hash.lower()
+        if not self.storage_service.is_valid_image_type(original_filename):
+            raise ValueError("Tipo de archivo no válido")
+        if size <= 0:
+            raise ValueError("El archivo está vacío")
+        if size > self.storage_service.get_max_file_size():
+            raise ValueError("El archivo es demasiado grande")
+        if not SHA256_PATTERN.match(content_hash):
+            raise ValueError("El hash debe ser un SHA-256 en hexadecimal")
+
+        session_id = uuid.uuid4().hex
+        file_extension = os.path.splitext(original_filename)[1].lower()
+        content_type = self.storage_service._get_mime_type(file_extension)
+        upload_path = self.storage_service.upload_location(session_id, file_extension)
+        target = self.storage_service.create_presigned_upload(
+            upload_path, size, content_hash, content_type, expires_in=self.expires_in
+        )
+        now = datetime.utcnow()
+        session = {
+            "_id": session_id,
+            # Autoriza la subida al endpoint local (sin S3 no hay URL firmada)
+            "token": secrets.token_urlsafe(32),
+            "user_id": user_id,
+            "original_filename": original_filename,
+            "custom_filename": custom_filename,
+            "file_extension": file_extension,
+            "content_type": content_type,
+            "size": size,
+            "content_hash": content_hash,
+            "upload_path": upload_path,
+            "status": "pending",
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=self.expires_in),
+        }
+        await self.collection.insert_one(session)
+        logger.info(f"[UPLOAD_SESSION] Sesión {session_id} creada para user_id={user_id} ({size} bytes)")
+        return {"session": session, "upload": target}
+
+    async def receive_local(self, session_id: str, token: str, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """Equivalente local (desarrollo) de la URL prefirmada: recibe el cuerpo por bloques"""
+        if self.storage_service.storage_type == "s3":
+            return {"error_code": "not_supported", "message": "Con S3 la subida va directamente al bucket"}
+        session = await self.collection.find_one({"_id": session_id})
+        if session is None or not secrets.compare_digest(session["token"], token or ""):
+            return {"error_code": "not_found", "message": "Sesión de subida no encontrada"}
+        if session["status"] != "pending":
+            return {"error_code": "in_progress", "message": "La sesión ya no admite subidas"}
+        if session["expires_at"] < datetime.utcnow():
+            return {"error_code": "expired", "message": "La sesión de subida ha caducado"}
+
+        staged = await self.storage_service.stage_stream(chunks, session["original_filename"])
+        await self.storage_service.backend_for(session["upload_path"]).write_file(
+            session["upload_path"], staged.path, session["content_type"]
+        )
+        return {"session_id": session_id, "size": staged.size, "message": "Contenido recibido"}
+
+    async def complete(self, session_id: str, user_id: str) -> Dict[str, Any]:
+        """Verificar la subida, registrar la imagen y encolar su validación (idempotente)"""
+        session = await self.collection.find_one_and_update(
+            {"_id": session_id, "user_id": user_id, "status": "pending"},
+            {"$set": {"status": "completing", "updated_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if session is None:
+            session = await self.collection.find_one({"_id": session_id, "user_id": user_id})
+            if session is None:
+                return {"error_code": "not_found", "message": "Sesión de subida no encontrada"}
+            if session["status"] == "completed":
+                # Reintento del cliente: misma imagen; se vuelve a encolar si falló el envío
+                image = await self.image_repository.find_by_id(session["image_id"])
+                job_id = session.get("job_id") or await self._enqueue(session, image)
+                return {"image": image, "job_id": job_id, "message": "Subida ya completada"}
+            return {"error_code": "in_progress", "message": "La subida se está completando"}
+
+        try:
+            error = await self._verify(session)
+            if error is not None:
+                # El cliente puede volver a subir mientras el destino siga vigente
+                await self._set_status(session_id, "pending", last_error=error["error_code"])
+                return error
+
+            unique_filename, file_info = await self.storage_service.save_uploaded(
+                session["upload_path"], session["original_filename"], session["size"], session["content_hash"], user_id
+            )
+            image = UploadImageUseCase._build_image(
+                unique_filename, file_info, session["original_filename"], user_id, session.get("custom_filename")
+            )
+            image.metadata["upload_session_id"] = session_id
+            image.metadata["medical_validation"] = {"status": "queued"}
+            saved = await self.image_repository.save(image)
+        except Exception:
+            await self._set_status(session_id, "pending")
+            raise
+        await self._set_status(session_id, "completed", image_id=saved.id)
+        publish_status(saved)
+        logger.info(f"[UPLOAD_SESSION] Sesión {session_id} completada: imagen {saved.id}")
+
+        job_id = await self._enqueue(session, saved)
+        return {"image": saved, "job_id": job_id, "message": "Imagen subida; validación en cola"}
+
+    async def _verify(self, session: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Comprobar tamaño y SHA-256 del objeto subido sin pasarlo por el servicio si es posible"""
+        stat = await self.storage_service.stat(session["upload_path"])
+        if stat is None:
+            return {"error_code": "upload_missing", "message": "No se encontró el archivo subido"}
+        if stat["size"] != session["size"]:
+            return {
+                "error_code": "size_mismatch",
+                "message": f"Tamaño recibido {stat['size']} distinto del declarado {session['size']}",
+            }
+        content_hash = stat["sha256"]
+        if content_hash is None:
+            # Almacén sin checksum (disco local o S3 compatible sin soporte): se calcula leyendo el objeto
+            content_hash = await self.storage_service.hash_object(session["upload_path"])
+        if content_hash != session["content_hash"]:
+            return {"error_code": "hash_mismatch", "message": "El SHA-256 del archivo subido no coincide con el declarado"}
+        return None
+
+    async def _enqueue(self, session: Dict[str, Any], image: Any) -> Optional[str]:
+        """Encolar la validación de la imagen; None si el broker no está disponible (se reintenta en complete)"""
+        if image is None:
+            return None
+        job_id = uuid.uuid4().hex
+        message = {
+            "job_id": job_id,
+            "image_id": image.id,
+            "original_filename": session["original_filename"],
+            "user_id": session["user_id"],
+        }
+        try:
+            await enqueue_validation_job(job_id, message)
+        except Exception:
+            return None
+        await self.collection.update_one({"_id": session["_id"]}, {"$set": {"job_id": job_id}})
+        return job_id
+
+    async def _set_status(self, session_id: str, status: str, **fields: Any) -> None:
+        await self.collection.update_one(
+            {"_id": session_id},
+            {"$set": {"status": status, "updated_at": datetime.utcnow(), **fields}},
+        )
@@ -1,25 +1,64 @@
 import os
+import time
+import asyncio
 import logging
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import AsyncIterator, Optional, Dict, Any, Awaitable, Tuple
 import mimetypes
 
-from infrastructure.storage import StorageService
+from infrastructure.storage import StorageService, StagedUpload
+from infrastructure.image_context import ImageContext
+from infrastructure.blob_releases import release_blob
 from infrastructure.repositories.MongoImageRepository import MongoImageRepository
 from domain.entities.Image import Image as ImageEntity
-import os
-import requests
+from adapters.gateways.prediction_gateway import PredictionGateway, PredictionError
+from usecases.processing_status import publish_status
 
 logger = logging.getLogger(__name__)
 
+
+class ValidatorUnavailable(RuntimeError):
+    """El validador no pudo emitir un veredicto (VLM caído, timeout, respuesta vacía)"""
+
+
 class ValidateUploadUseCase:
     def __init__(self, storage_service: StorageService, image_repository: MongoImageRepository):
         self.storage_service = storage_service
         self.image_repository = image_repository
+        self.prediction_gateway = PredictionGateway()
+        # Enviar al servicio de predicción la entrada ya redimensionada (300x300) en lugar del original
+        self.send_model_input = os.getenv("PREDICTION_SEND_MODEL_INPUT", "false").lower() == "true"
         logger.info(f"ValidateUploadUseCase inicializado (sin Celery) con storage_service: {type(storage_service)}")
-        
-    async def execute(self, file_content: bytes, original_filename: str, user_id: str, custom_filename: Optional[str] = None) -> Dict[str, Any]:
-        """Validar y guardar la imagen de forma síncrona y devolver la entidad creada."""
+
+    async def execute_stream(self, chunks: AsyncIterator[bytes], original_filename: str, user_id: str, custom_filename: Optional[str] = None) -> Dict[str, Any]:
+        """Variante en streaming: vuelca la subida por bloques a un temporal y la valida.
+
+        El contenido completo solo se carga para la validación y la predicción;
+        el guardado mueve el temporal en lugar de reescribir los bytes.
+        """
+        if not self.storage_service.is_valid_image_type(original_filename):
+            raise ValueError("Tipo de archivo no válido")
+        staged = await self.storage_service.stage_stream(chunks, original_filename)
+        try:
+            if staged.size == 0:
+                raise ValueError("El archivo está vacío")
+            file_content = await self.storage_service.read_staged(staged)
+            return await self.execute(file_content, original_filename, user_id, custom_filename, staged=staged)
+        finally:
+            self.storage_service.discard_staged_path(staged.path)
+
+    async def execute(self, file_content: bytes, original_filename: str, user_id: str, custom_filename: Optional[str] = None, staged: Optional[StagedUpload] = None, persist: bool = True, job_id: Optional[str] = None) -> Dict[str, Any]:
+        """Validar y guardar la imagen y devolver la entidad creada.
+
+        La validación médica, el guardado en almacenamiento y la predicción se lanzan
+        en paralelo (pipeline especulativo). Si la validación rechaza la imagen, la
+        predicción se cancela y el archivo guardado se descarta.
+        Con persist=False la entidad se devuelve sin insertar (la inserta el llamador, p. ej. en lote).
+        Con job_id (validación asíncrona) la imagen queda asociada a su job, que solo puede guardar una.
+        Si se cancela (cliente desconectado, apagado del worker), las etapas en curso se
+        cancelan y el archivo guardado se descarta igual que en un rechazo.
+        """
+        validation_task = storage_task = prediction_task = None
         try:
             logger.info(f"[VALIDATE_UPLOAD] Inicio para archivo: {original_filename}")
 
@@ -36,12 +75,31 @@ class ValidateUploadUseCase:
             if not mime_type:
                 mime_type = "application/octet-stream"
 
-            # Validación médica directa
-            from infrastructure.medical_image_validator import MedicalImageValidator
-            validator = MedicalImageValidator()
+            # Lanzar las tres etapas de forma especulativa
+            timings: Dict[str, float] = {}
+            pipeline_start = time.perf_counter()
+            processing_started = datetime.utcnow().isoformat()
+
+            # Contexto compartido: la imagen se decodifica una sola vez para todas las etapas
+            context = ImageContext(file_content, original_filename, mime_type)
+            dimensions = await context.dimensions()
+
+            validation_task = asyncio.create_task(
+                self._timed("validation", self._validate(context), timings)
+            )
+            if staged is not None:
+                store = self.storage_service.save_staged(staged, original_filename, user_id, dimensions=dimensions)
+            else:
+                store = self.storage_service.save_image(file_content, original_filename, user_id, dimensions=dimensions)
+            storage_task = asyncio.create_task(self._timed("storage", store, timings))
+            prediction_task = asyncio.create_task(
+                self._timed("prediction", self._predict(context), timings)
+            )
+
             try:
-                is_valid_ct, validation_info = await validator.validate_brain_ct(file_content, mime_type)
+                is_valid_ct, validation_info = await validation_task
             except Exception as val_err:
+                await self._discard(storage_task, prediction_task)
                 return {
                     "image": None,
                     "message": "Error en validación médica",
@@ -50,6 +108,7 @@ class ValidateUploadUseCase:
                 }
 
             if not is_valid_ct:
+                await self._discard(storage_task, prediction_task)
                 return {
                     "image": None,
                     "message": f"La imagen no es una tomografía cerebral válida. {validation_info.get('descripcion', '')}",
@@ -57,10 +116,47 @@ class ValidateUploadUseCase:
                     "error_detail": validation_info.get('descripcion', ''),
                 }
 
-            # Guardar en almacenamiento definitivo
-            unique_filename, file_info = await self.storage_service.save_image(file_content, original_filename, user_id)
+            # Validación aceptada: confirmar el guardado (shield: una cancelación no corta la escritura)
+            try:
+                unique_filename, file_info = await asyncio.shield(storage_task)
+            except Exception:
+                prediction_task.cancel()
+                await asyncio.gather(prediction_task, return_exceptions=True)
+                raise
 
-            # Crear y persistir entidad
+            # Esperar la predicción (ya en curso)
+            pred_data: Optional[Dict[str, Any]] = None
+            pred_error: Optional[PredictionError] = None
+            try:
+                pred_data = await prediction_task
+            except PredictionError as err:
+                pred_error = err
+            except Exception as err:
+                pred_error = PredictionError("prediction_exception", str(err))
+
+            timings["total_ms"] = round((time.perf_counter() - pipeline_start) * 1000, 2)
+
+            metadata: Dict[str, Any] = {
+                "medical_validation": {
+                    "status": "completed",
+                    "is_valid_ct": True,
+                    "descripcion": validation_info.get("descripcion", "Validación médica exitosa"),
+                    "completed_at": datetime.utcnow().isoformat(),
+                },
+                "pipeline_timings": timings,
+                **file_info.get("metadata", {}),
+            }
+            if job_id:
+                metadata["validation_job_id"] = job_id
+            if pred_data is not None:
+                metadata.update({
+                    "prediction": pred_data,
+                    "processing_started": processing_started,
+                    "processing_completed": datetime.utcnow().isoformat(),
+                    "processing_status": "completed",
+                })
+
+            # Crear y persistir entidad (una sola escritura, ya con la predicción)
             image = ImageEntity(
                 filename=unique_filename,
                 original_filename=custom_filename if custom_filename else original_filename,
@@ -71,52 +167,23 @@ class ValidateUploadUseCase:
                 height=file_info["height"],
                 user_id=user_id,
                 upload_date=datetime.utcnow(),
-                processing_status="pending",
-                metadata={
-                    "medical_validation": {
-                        "status": "completed",
-                        "is_valid_ct": True,
-                        "descripcion": validation_info.get("descripcion", "Validación médica exitosa"),
-                        "completed_at": datetime.utcnow().isoformat(),
-                    },
-                    **file_info.get("metadata", {}),
-                },
+                processing_status="completed" if pred_data is not None else "pending",
+                metadata=metadata,
             )
 
-            saved = await self.image_repository.save(image)
+            if persist:
+                saved = await self.image_repository.save(image)
+                publish_status(saved)
+            else:
+                saved = image
+            logger.info(f"[VALIDATE_UPLOAD] Tiempos por etapa: {timings}")
 
-            # Predicción síncrona (colab-service)
-            prediction_url = os.getenv("COLAB_PREDICT_URL", "http://colab-service:8004/predict")
-            try:
-                # Usar el contenido de la imagen que ya tenemos en memoria
-                files = {"image": (original_filename, file_content, mime_type)}
-                resp = requests.post(prediction_url, files=files, timeout=300)
-                if resp.status_code == 200:
-                    pred_data = resp.json()
-                    # Actualizar imagen a completed con predicción
-                    update_data: Dict[str, Any] = {
-                        "processing_status": "completed",
-                        "metadata.prediction": pred_data,
-                        "metadata.processing_started": image.metadata.get("processing_started") if image.metadata else datetime.utcnow().isoformat(),
-                        "metadata.processing_completed": datetime.utcnow().isoformat(),
-                        "metadata.processing_status": "completed",
-                    }
-                    await self.image_repository.update(str(saved.id), update_data)
-                    # Traer entidad actualizada
-                    saved = await self.image_repository.find_by_id(str(saved.id))
-                else:
-                    return {
-                        "image": saved,
-                        "message": "Error durante la predicción",
-                        "error_code": "prediction_error",
-                        "error_detail": resp.text,
-                    }
-            except Exception as pred_err:
+            if pred_error is not None:
                 return {
                     "image": saved,
-                    "message": "Excepción durante la predicción",
-                    "error_code": "prediction_exception",
-                    "error_detail": str(pred_err),
+                    "message": "Error durante la predicción" if pred_error.error_code == "prediction_error" else "Excepción durante la predicción",
+                    "error_code": pred_error.error_code,
+                    "error_detail": pred_error.detail,
                 }
 
             return {
@@ -124,6 +191,163 @@ class ValidateUploadUseCase:
                 "message": "Imagen validada, guardada y predicción generada",
             }
 
+        except asyncio.CancelledError:
+            if storage_task is not None:
+                logger.info(f"[VALIDATE_UPLOAD] Cancelado, descartando etapas en curso: {original_filename}")
+                validation_task.cancel()
+                # Si la imagen ya se insertó, release_blob ve su referencia y no libera el blob
+                await self._discard(storage_task, prediction_task)
+            raise
         except Exception as e:
             logger.error(f"Error en validate_upload síncrono: {str(e)}")
             raise
+
+    async def execute_stored(self, image: ImageEntity) -> Dict[str, Any]:
+        """Validar y analizar una imagen ya registrada (subida directa al almacenamiento).
+
+        Si la validación la rechaza, el registro se elimina y su blob se libera; si la
+        acepta, se actualiza con la validación y la predicción. Un fallo técnico del
+        validador devuelve validator_error sin tocar la imagen, para reintentarla.
+        """
+        logger.info(f"[VALIDATE_UPLOAD] Validando imagen almacenada: {image.id}")
+        file_content = await self.storage_service.read(image.file_path)
+        mime_type, _ = mimetypes.guess_type(image.filename)
+        context = ImageContext(file_content, image.filename, mime_type or image.mime_type)
+
+        timings: Dict[str, float] = {}
+        pipeline_start = time.perf_counter()
+        processing_started = datetime.utcnow().isoformat()
+        validation_task = asyncio.create_task(self._timed("validation", self._validate(context), timings))
+        prediction_task = asyncio.create_task(self._timed("prediction", self._predict(context), timings))
+
+        try:
+            is_valid_ct, validation_info = await validation_task
+        except asyncio.CancelledError:
+            # El registro se conserva pendiente de validar; solo hay que parar la predicción
+            prediction_task.cancel()
+            await asyncio.gather(prediction_task, return_exceptions=True)
+            raise
+        except Exception as val_err:
+            prediction_task.cancel()
+            await asyncio.gather(prediction_task, return_exceptions=True)
+            return {
+                "image": None,
+                "message": "Error en validación médica",
+                "error_code": "validator_error",
+                "error_detail": str(val_err),
+            }
+
+        if not is_valid_ct:
+            prediction_task.cancel()
+            await asyncio.gather(prediction_task, return_exceptions=True)
+            message = f"La imagen no es una tomografía cerebral válida. {validation_info.get('descripcion', '')}"
+            await self._delete_stored(image, message)
+            return {
+                "image": None,
+                "message": message,
+                "error_code": "invalid_medical_image",
+                "error_detail": validation_info.get('descripcion', ''),
+            }
+
+        pred_data: Optional[Dict[str, Any]] = None
+        pred_error: Optional[PredictionError] = None
+        try:
+            pred_data = await prediction_task
+        except PredictionError as err:
+            pred_error = err
+        except Exception as err:
+            pred_error = PredictionError("prediction_exception", str(err))
+        timings["total_ms"] = round((time.perf_counter() - pipeline_start) * 1000, 2)
+
+        update: Dict[str, Any] = {
+            "metadata.medical_validation": {
+                "status": "completed",
+                "is_valid_ct": True,
+                "descripcion": validation_info.get("descripcion", "Validación médica exitosa"),
+                "completed_at": datetime.utcnow().isoformat(),
+            },
+            "metadata.pipeline_timings": timings,
+        }
+        if image.width is None or image.height is None:
+            update["width"], update["height"] = await context.dimensions()
+        if pred_data is not None:
+            update.update({
+                "processing_status": "completed",
+                "metadata.prediction": pred_data,
+                "metadata.processing_started": processing_started,
+                "metadata.processing_completed": datetime.utcnow().isoformat(),
+                "metadata.processing_status": "completed",
+            })
+
+        saved = await self.image_repository.update(image.id, update) or image
+        publish_status(saved)
+        logger.info(f"[VALIDATE_UPLOAD] Tiempos por etapa (imagen almacenada): {timings}")
+
+        if pred_error is not None:
+            return {
+                "image": saved,
+                "message": "Error durante la predicción" if pred_error.error_code == "prediction_error" else "Excepción durante la predicción",
+                "error_code": pred_error.error_code,
+                "error_detail": pred_error.detail,
+            }
+        return {
+            "image": saved,
+            "message": "Imagen validada y predicción generada",
+        }
+
+    async def _delete_stored(self, image: ImageEntity, reason: str) -> None:
+        """Eliminar una imagen rechazada tras registrarla (y su blob si nadie más lo usa)"""
+        image.processing_status = "failed"
+        image.metadata = {**image.metadata, "processing_error": reason}
+        publish_status(image)
+        await self.image_repository.delete(image.id)
+        released = await release_blob(self.image_repository, image.file_path)
+        logger.info(f"[VALIDATE_UPLOAD] Imagen rechazada eliminada: {image.id} (blob liberado={released})")
+
+    async def _validate(self, context: ImageContext) -> Tuple[bool, Dict[str, Any]]:
+        """Validación médica directa con el VLM.
+
+        El validador no lanza excepciones: sus fallos técnicos llegan como
+        (False, {"validation_error": True}). No son un rechazo, así que se lanzan
+        como ValidatorUnavailable y acaban en validator_error (reintentable).
+        """
+        from infrastructure.medical_image_validator import MedicalImageValidator
+        validator = MedicalImageValidator()
+        is_valid_ct, validation_info = await validator.validate_brain_ct(
+            context.file_content, context.mime_type, context=context
+        )
+        if validation_info.get("validation_error"):
+            raise ValidatorUnavailable(validation_info.get("error") or validation_info.get("descripcion", ""))
+        return is_valid_ct, validation_info
+
+    async def _predict(self, context: ImageContext) -> Dict[str, Any]:
+        """Predicción (colab-service) con el cliente HTTP asíncrono compartido"""
+        if self.send_model_input:
+            payload = await context.model_input_png()
+            return await self.prediction_gateway.predict(payload, f"{os.path.splitext(context.filename)[0]}.png", "image/png")
+        if context.is_dicom:
+            # El servicio de predicción no decodifica DICOM: se envía el frame renderizado
+            payload = await context.rendered_png()
+            return await self.prediction_gateway.predict(payload, f"{os.path.splitext(context.filename)[0]}.png", "image/png")
+        return await self.prediction_gateway.predict(context.file_content, context.filename, context.mime_type)
+
+    async def _discard(self, storage_task: asyncio.Task, prediction_task: asyncio.Task) -> None:
+        """Cancelar la predicción y eliminar el archivo guardado especulativamente"""
+        prediction_task.cancel()
+        # El guardado no se cancela a mitad de escritura: se espera y luego se borra
+        results = await asyncio.gather(storage_task, prediction_task, return_exceptions=True)
+        stored = results[0]
+        if isinstance(stored, tuple):
+            _, file_info = stored
+            # El blob es compartido por contenido: se libera si nadie más lo referencia
+            released = await release_blob(self.image_repository, file_info["file_path"])
+            logger.info(f"[VALIDATE_UPLOAD] Archivo especulativo descartado: {file_info['file_path']} (liberado={released})")
+
+    @staticmethod
+    async def _timed(stage: str, awaitable: Awaitable[Any], timings: Dict[str, float]) -> Any:
+        """Ejecutar una etapa registrando su duración en milisegundos"""
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timings[f"{stage}_ms"] = round((time.perf_counter() - start) * 1000, 2)
@@ -0,0 +1,44 @@
+import io
+import os
+import sys
+import tempfile
+
+import pytest
+from PIL import Image as PILImage
+
+# Los módulos del servicio se importan como en el contenedor (src en el path)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+# Los singletons de almacenamiento se crean al importar: almacenamiento local temporal
+os.environ.setdefault("STORAGE_TYPE", "local")
+os.environ.setdefault("LOCAL_STORAGE_PATH", tempfile.mkdtemp(prefix="image-service-tests-"))
+
+
+@pytest.fixture
+def mongo():
+    """Base de datos en memoria (mongomock) en lugar de la conexión de database.connect_db"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from infrastructure.database import Database
+
+    Database.client = mongomock_motor.AsyncMongoMockClient()
+    Database.database = Database.client["brainlens_test"]
+    yield Database.database
+    Database.client = None
+    Database.database = None
+
+
+@pytest.fixture
+def png_bytes():
+    buffer = io.BytesIO()
+    PILImage.new("L", (64, 64), color=90).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def client(mongo):
+    """Cliente HTTP de la API sobre la base de datos en memoria"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    # Sin el lifespan: no se conecta a Mongo real ni a Kafka
+    return TestClient(app)
@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from domain.entities.Image import Image
+from infrastructure.storage import storage_service
+from infrastructure.repositories.MongoImageRepository import MongoImageRepository
+
+
+def _completed_image():
+    image = Image(
+        filename="a.png", original_filename="a.png", file_path="/tmp/a.png", file_size=1,
+        mime_type="image/png", user_id="user-1", upload_date=datetime.utcnow(), processing_status="completed",
+    )
+    return asyncio.run(MongoImageRepository().save(image))
+
+
+def _downloadable_image(png_bytes):
+    async def scenario():
+        filename, info = await storage_service.save_image(png_bytes, "a.png", "user-1")
+        image = Image(
+            filename=filename, original_filename="a.png", file_path=info["file_path"], file_size=info["file_size"],
+            mime_type="image/png", user_id="user-1", upload_date=datetime.utcnow(), metadata=info["metadata"],
+        )
+        return await MongoImageRepository().save(image)
+    return asyncio.run(scenario())
+
+
+def test_sse_stream_keeps_its_no_cache_header(client):
+    image = _completed_image()
+
+    response = client.get(f"/api/v1/images/{image.id}/processing-status/stream")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    assert "event: status" in response.text
+
+
+def test_plain_get_still_gets_short_public_cache(client):
+    response = client.get("/api/v1/images/validation-cache/stats")
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=300"
+
+
+def test_health_is_never_cached(client):
+    response = client.get("/api/v1/images/health")
+
+    assert response.headers["cache-control"] == "no-cache, no-store, must-revalidate"
+
+
+def test_sse_stream_picks_up_transitions_from_other_processes(client, monkeypatch):
+    from adapters.controllers import image_controller
+    from usecases.get_images import GetImageByIdUseCase
+
+    image = _completed_image()
+    # Otro proceso completa la imagen sin pasar por el hub de este
+    statuses = iter(["processing", "processing", "completed"])
+    real_execute = GetImageByIdUseCase.execute
+
+    async def execute(self, image_id):
+        current = await real_execute(self, image_id)
+        return current.model_copy(update={"processing_status": next(statuses)})
+
+    monkeypatch.setattr(GetImageByIdUseCase, "execute", execute)
+    monkeypatch.setattr(image_controller, "SSE_HEARTBEAT_SECONDS", 0.01)
+
+    response = client.get(f"/api/v1/images/{image.id}/processing-status/stream")
+
+    assert response.status_code == 200
+    assert response.text.count("event: status") == 2
+    assert ": ping" in response.text
+    assert '"status": "completed"' in response.text
+
+
+@pytest.mark.parametrize("header", ["bytes=5-3", "bytes=abc-", "bytes=0-1,4-5"])
+def test_invalid_range_is_ignored_and_the_full_object_served(client, png_bytes, header):
+    image = _downloadable_image(png_bytes)
+
+    response = client.get(f"/api/v1/images/download/{image.id}", headers={"Range": header})
+
+    assert response.status_code == 200
+    assert response.content == png_bytes
+    assert "content-range" not in response.headers
+
+
+def test_range_starting_past_the_end_is_not_satisfiable(client, png_bytes):
+    image = _downloadable_image(png_bytes)
+
+    response = client.get(f"/api/v1/images/download/{image.id}", headers={"Range": f"bytes={len(png_bytes)}-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(png_bytes)}"
+
+
+def test_valid_range_gets_a_partial_response(client, png_bytes):
+    image = _downloadable_image(png_bytes)
+
+    response = client.get(f"/api/v1/images/download/{image.id}", headers={"Range": "bytes=2-5"})
+
+    assert response.status_code == 206
+    assert response.content == png_bytes[2:6]
+    assert response.headers["content-range"] == f"bytes 2-5/{len(png_bytes)}"
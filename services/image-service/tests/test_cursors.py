@@ -0,0 +1,47 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from usecases.get_images import decode_cursor, encode_cursor
+from usecases.export_images import ExportImagesUseCase
+
+
+def _raw_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    upload_date, image_id = datetime(2026, 1, 2, 3, 4, 5, 678000), str(ObjectId())
+
+    assert decode_cursor(encode_cursor(upload_date, image_id)) == (upload_date, image_id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "no-es-base64!",
+    _raw_cursor({"d": "ayer", "i": str(ObjectId())}),
+    _raw_cursor({"d": "2026-01-02T03:04:05"}),
+    _raw_cursor({"d": "2026-01-02T03:04:05", "i": "no-es-un-objectid"}),
+    _raw_cursor({"d": "2026-01-02T03:04:05", "i": 12}),
+])
+def test_invalid_cursor_is_a_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_export_rejects_a_resume_token_with_a_bad_id():
+    token = _raw_cursor({"d": "2026-01-02T03:04:05", "i": "zzz"})
+
+    with pytest.raises(ValueError):
+        ExportImagesUseCase(image_repository=None).execute(resume_token=token)
+
+
+@pytest.mark.parametrize("path", ["/api/v1/images/?cursor={}", "/api/v1/images/export?resume_token={}"])
+def test_bad_cursor_id_is_a_400_not_a_500(client, path):
+    token = _raw_cursor({"d": "2026-01-02T03:04:05", "i": "zzz"})
+
+    response = client.get(path.format(token))
+
+    assert response.status_code == 400
@@ -0,0 +1,77 @@
+import os
+import asyncio
+
+import pytest
+
+from infrastructure.indexes import QUERY_PLANS, summarize_plan
+
+QUERY = {"name": "images.find_page", "collection": "images"}
+
+
+def _explain(winning_plan):
+    return {"queryPlanner": {"winningPlan": winning_plan}}
+
+
+def test_index_scan_is_not_a_collscan():
+    plan = summarize_plan(QUERY, _explain({
+        "stage": "LIMIT",
+        "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "user_upload_date"}},
+    }))
+
+    assert plan["collscan"] is False
+    assert plan["stages"] == ["LIMIT", "FETCH", "IXSCAN"]
+    assert plan["indexes"] == ["user_upload_date"]
+
+
+def test_collscan_is_detected_under_a_sort():
+    plan = summarize_plan(QUERY, _explain({
+        "stage": "SORT", "inputStage": {"stage": "COLLSCAN", "direction": "forward"},
+    }))
+
+    assert plan["collscan"] is True
+
+
+def test_collscan_in_one_branch_of_an_or_is_detected():
+    # El $or del cursor keyset: basta con que una rama recorra la colección
+    plan = summarize_plan(QUERY, _explain({
+        "stage": "SUBPLAN",
+        "inputStage": {"stage": "OR", "inputStages": [
+            {"stage": "IXSCAN", "indexName": "upload_date"},
+            {"stage": "COLLSCAN"},
+        ]},
+    }))
+
+    assert plan["collscan"] is True
+
+
+def test_sbe_query_plan_is_unwrapped():
+    plan = summarize_plan(QUERY, _explain({
+        "queryPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "upload_date"}},
+        "slotBasedPlan": {"stages": "..."},
+    }))
+
+    assert plan["stages"] == ["FETCH", "IXSCAN"]
+    assert plan["collscan"] is False
+
+
+@pytest.mark.skipif(not os.getenv("MONGODB_TEST_URL"), reason="requiere MONGODB_TEST_URL (MongoDB real para explain)")
+def test_repository_queries_use_indexes():
+    """Con los índices declarados, ninguna consulta representativa (incluido _page_query) hace COLLSCAN"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from infrastructure.database import Database
+    from infrastructure.indexes import ensure_indexes, explain_query_plans
+
+    async def plans():
+        Database.client = AsyncIOMotorClient(os.environ["MONGODB_TEST_URL"])
+        Database.database = Database.client[os.getenv("MONGODB_TEST_DATABASE", "brainlens_test")]
+        try:
+            await ensure_indexes()
+            return await explain_query_plans()
+        finally:
+            Database.client.close()
+
+    results = asyncio.run(plans())
+
+    assert [plan["name"] for plan in results] == [query["name"] for query in QUERY_PLANS]
+    collscans = {plan["name"]: plan["stages"] for plan in results if plan["collscan"]}
+    assert not collscans, f"Consultas con COLLSCAN: {collscans}"
@@ -0,0 +1,77 @@
+import os
+import asyncio
+import hashlib
+import tracemalloc
+
+import pytest
+from PIL import Image as PILImage
+
+from infrastructure.storage import StorageService
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _write_noise_png(path, width=2048, height=1024):
+    """PNG sin compresión útil (ruido): varios MB en disco"""
+    PILImage.frombytes("RGB", (width, height), os.urandom(width * height * 3)).save(path, compress_level=0)
+
+
+def _sha256_of(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+async def _chunks(path):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            yield chunk
+
+
+def test_stage_stream_and_save_staged_keep_memory_bounded(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_TYPE", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_PATH", str(tmp_path / "storage"))
+    storage = StorageService()
+    source = tmp_path / "estudio.png"
+    _write_noise_png(source)
+    size = source.stat().st_size
+    expected_hash = _sha256_of(source)
+    assert size > 50 * CHUNK_SIZE
+
+    async def upload():
+        staged = await storage.stage_stream(_chunks(source), "estudio.png")
+        return staged, await storage.save_staged(staged, "estudio.png", "user-1")
+
+    tracemalloc.start()
+    try:
+        staged, (filename, info) = asyncio.run(upload())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Ni la subida ni el guardado acumulan el archivo en memoria
+    assert peak < 8 * CHUNK_SIZE, f"pico de {peak} bytes para un archivo de {size}"
+    assert staged.size == size
+    assert staged.content_hash == expected_hash
+    assert not os.path.exists(staged.path)
+    assert filename == f"{expected_hash}.png"
+    assert info["metadata"]["content_hash"] == expected_hash
+    assert _sha256_of(info["file_path"]) == expected_hash
+    assert (info["width"], info["height"]) == (2048, 1024)
+
+
+def test_stage_stream_rejects_oversized_upload_and_removes_temp(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_TYPE", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_PATH", str(tmp_path / "storage"))
+    storage = StorageService()
+    monkeypatch.setattr(storage, "get_max_file_size", lambda: 3 * CHUNK_SIZE)
+
+    async def chunks():
+        for _ in range(5):
+            yield b"\0" * CHUNK_SIZE
+
+    with pytest.raises(ValueError):
+        asyncio.run(storage.stage_stream(chunks(), "grande.png"))
+    assert os.listdir(storage.upload_tmp_dir) == []
@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import infrastructure.medical_image_validator as medical_image_validator
+from domain.entities.Image import Image
+from infrastructure.blob_releases import RELEASED_BLOBS_COLLECTION
+from infrastructure.storage import storage_service
+from infrastructure.repositories.MongoImageRepository import MongoImageRepository
+from usecases.validate_upload import ValidateUploadUseCase
+
+TECHNICAL_FAILURE = (False, {"descripcion": "Error técnico", "error": "timeout", "validation_error": True})
+REJECTION = (False, {"descripcion": "Respuesta del VLM: NO"})
+
+
+def fake_validator(verdict):
+    class FakeValidator:
+        async def validate_brain_ct(self, image_bytes, mime_type, context=None):
+            return verdict
+    return FakeValidator
+
+
+async def _fake_prediction(context):
+    return {"prediction": "tumor_glioma", "confidence": 0.9}
+
+
+async def _stored_image(png_bytes):
+    filename, info = await storage_service.save_image(png_bytes, "estudio.png", "user-1")
+    image = Image(
+        filename=filename, original_filename="estudio.png", file_path=info["file_path"],
+        file_size=info["file_size"], mime_type=info["mime_type"], user_id="user-1",
+        upload_date=datetime.utcnow(), metadata=info["metadata"],
+    )
+    return await MongoImageRepository().save(image)
+
+
+@pytest.mark.parametrize("verdict, expected_code", [(TECHNICAL_FAILURE, "validator_error"), (REJECTION, "invalid_medical_image")])
+def test_execute_stored_only_deletes_on_a_real_rejection(mongo, png_bytes, monkeypatch, verdict, expected_code):
+    monkeypatch.setattr(medical_image_validator, "MedicalImageValidator", fake_validator(verdict))
+
+    async def scenario():
+        image = await _stored_image(png_bytes)
+        use_case = ValidateUploadUseCase(storage_service, MongoImageRepository())
+        monkeypatch.setattr(use_case, "_predict", _fake_prediction)
+        result = await use_case.execute_stored(image)
+        remaining = await MongoImageRepository().find_by_id(image.id)
+        released = await mongo[RELEASED_BLOBS_COLLECTION].count_documents({"_id": image.file_path})
+        return result, remaining, released
+
+    result, remaining, released = asyncio.run(scenario())
+    assert result["image"] is None
+    assert result["error_code"] == expected_code
+    if expected_code == "validator_error":
+        # Fallo técnico: la imagen sigue registrada y su blob no se libera
+        assert remaining is not None
+        assert released == 0
+    else:
+        assert remaining is None
+        assert released == 1
+
+
+def test_execute_reports_validator_error_instead_of_rejecting(mongo, png_bytes, monkeypatch):
+    monkeypatch.setattr(medical_image_validator, "MedicalImageValidator", fake_validator(TECHNICAL_FAILURE))
+    use_case = ValidateUploadUseCase(storage_service, MongoImageRepository())
+    monkeypatch.setattr(use_case, "_predict", _fake_prediction)
+
+    result = asyncio.run(use_case.execute(png_bytes, "estudio.png", "user-1"))
+
+    assert result["image"] is None
+    assert result["error_code"] == "validator_error"
+    assert "timeout" in result["error_detail"]
+
+
+def test_cancelling_execute_mid_validation_stores_nothing(mongo, png_bytes, monkeypatch):
+    validation_started = asyncio.Event()
+    prediction_cancelled = asyncio.Event()
+
+    class SlowValidator:
+        async def validate_brain_ct(self, image_bytes, mime_type, context=None):
+            validation_started.set()
+            await asyncio.sleep(60)
+
+    async def slow_prediction(context):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            prediction_cancelled.set()
+            raise
+
+    monkeypatch.setattr(medical_image_validator, "MedicalImageValidator", SlowValidator)
+    use_case = ValidateUploadUseCase(storage_service, MongoImageRepository())
+    monkeypatch.setattr(use_case, "_predict", slow_prediction)
+
+    async def scenario():
+        task = asyncio.create_task(use_case.execute(png_bytes, "estudio.png", "user-1"))
+        await validation_started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        images = await mongo[MongoImageRepository.COLLECTION].count_documents({})
+        released = await mongo[RELEASED_BLOBS_COLLECTION].count_documents({})
+        return images, released
+
+    images, released = asyncio.run(scenario())
+    assert images == 0
+    # El blob guardado especulativamente queda liberado para el reconciliador
+    assert released == 1
+    assert prediction_cancelled.is_set()
@@ -0,0 +1,188 @@
+import asyncio
+import os
+from datetime import datetime
+
+import pytest
+
+import infrastructure.medical_image_validator as medical_image_validator
+import tasks.kafka_producer as kafka_producer
+from domain.entities.Image import Image
+from infrastructure.storage import storage_service
+from infrastructure.repositories.MongoImageRepository import MongoImageRepository
+from tasks.in_memory_broker import InMemoryBroker
+from tasks.validation_tasks import VALIDATE_UPLOAD_TOPIC, enqueue_validation_job, get_job_status
+from tasks.worker_validate_upload import GROUP_ID, build_worker
+from usecases.validate_upload import ValidateUploadUseCase
+
+ACCEPTED = (True, {"descripcion": "Respuesta del VLM: SÍ"})
+TECHNICAL_FAILURE = (False, {"descripcion": "Error técnico", "error": "timeout", "validation_error": True})
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = InMemoryBroker()
+    producer = broker.producer()
+    monkeypatch.setattr(kafka_producer, "get_kafka_producer", lambda: producer)
+    return broker
+
+
+@pytest.fixture
+def validator(monkeypatch):
+    """Veredicto del validador configurable por prueba; cuenta las llamadas"""
+    state = {"verdict": ACCEPTED, "calls": 0}
+
+    class FakeValidator:
+        async def validate_brain_ct(self, image_bytes, mime_type, context=None):
+            state["calls"] += 1
+            return state["verdict"]
+
+    async def fake_predict(self, context):
+        return {"prediction": "tumor_glioma", "confidence": 0.9}
+
+    monkeypatch.setattr(medical_image_validator, "MedicalImageValidator", FakeValidator)
+    monkeypatch.setattr(ValidateUploadUseCase, "_predict", fake_predict)
+    return state
+
+
+async def _enqueue(png_bytes, job_id):
+    async def chunks():
+        yield png_bytes
+
+    staged = await storage_service.stage_stream(chunks(), "estudio.png")
+    staging_path = await storage_service.share_staged(staged, job_id)
+    await enqueue_validation_job(job_id, {
+        "job_id": job_id,
+        "staging_path": staging_path,
+        "original_filename": "estudio.png",
+        "user_id": "user-1",
+        "custom_filename": None,
+    })
+    return staging_path
+
+
+def _worker(broker, **kwargs):
+    consumer = broker.consumer(VALIDATE_UPLOAD_TOPIC, group_id=GROUP_ID)
+    return build_worker(consumer, broker.producer(), poll_timeout_ms=0, retry_backoff_ms=1, **kwargs)
+
+
+async def _images_of_job(job_id):
+    return await MongoImageRepository().collection.count_documents({"metadata.validation_job_id": job_id})
+
+
+def test_enqueue_consume_commit(mongo, broker, validator, png_bytes):
+    async def scenario():
+        staging_path = await _enqueue(png_bytes, "job-ok")
+        assert (await get_job_status("job-ok"))["status"] == "queued"
+        await _worker(broker).run(max_batches=1)
+        return staging_path, await get_job_status("job-ok"), await _images_of_job("job-ok")
+
+    staging_path, job, images = asyncio.run(scenario())
+    assert job["status"] == "completed"
+    assert job["image_id"]
+    assert images == 1
+    assert not os.path.exists(staging_path)
+    assert broker.committed_offset(GROUP_ID, VALIDATE_UPLOAD_TOPIC) == 1
+    assert broker.messages(f"{VALIDATE_UPLOAD_TOPIC}.dlq") == []
+
+
+def test_redelivered_job_does_not_duplicate_the_image(mongo, broker, validator, png_bytes):
+    async def scenario():
+        await _enqueue(png_bytes, "job-dup")
+        await _worker(broker).run(max_batches=1)
+        # Re-entrega con el staging aún presente (caída tras guardar la imagen, antes del commit)
+        staging_path = await _enqueue(png_bytes, "job-dup")
+        await _worker(broker).run(max_batches=1)
+        return staging_path, await get_job_status("job-dup"), await _images_of_job("job-dup")
+
+    staging_path, job, images = asyncio.run(scenario())
+    assert images == 1
+    assert not os.path.exists(staging_path)
+    assert job["status"] == "completed"
+    assert validator["calls"] == 1
+    assert broker.committed_offset(GROUP_ID, VALIDATE_UPLOAD_TOPIC) == 2
+
+
+def test_validator_error_is_retried_then_dead_lettered(mongo, broker, validator, png_bytes):
+    validator["verdict"] = TECHNICAL_FAILURE
+
+    async def scenario():
+        staging_path = await _enqueue(png_bytes, "job-vlm-down")
+        worker = _worker(broker, max_retries=2)
+        await worker.run(max_batches=1)
+        return staging_path, worker.get_metrics(), await get_job_status("job-vlm-down"), await _images_of_job("job-vlm-down")
+
+    staging_path, metrics, job, images = asyncio.run(scenario())
+    # Un intento inicial y dos reintentos; después, a la DLQ y el lote se confirma
+    assert validator["calls"] == 3
+    assert metrics["retries"] == 2
+    dead_letters = broker.messages(f"{VALIDATE_UPLOAD_TOPIC}.dlq")
+    assert len(dead_letters) == 1
+    assert dead_letters[0]["attempts"] == 3
+    assert job["status"] == "failed"
+    assert images == 0
+    # No es un rechazo: el archivo se conserva (lo expira el TTL de staging)
+    assert os.path.exists(staging_path)
+    assert broker.committed_offset(GROUP_ID, VALIDATE_UPLOAD_TOPIC) == 1
+
+
+def test_validator_recovers_within_retries(mongo, broker, validator, png_bytes, monkeypatch):
+    verdicts = iter([TECHNICAL_FAILURE, ACCEPTED])
+
+    class FlakyValidator:
+        async def validate_brain_ct(self, image_bytes, mime_type, context=None):
+            validator["calls"] += 1
+            return next(verdicts)
+
+    monkeypatch.setattr(medical_image_validator, "MedicalImageValidator", FlakyValidator)
+
+    async def scenario():
+        await _enqueue(png_bytes, "job-flaky")
+        await _worker(broker, max_retries=2).run(max_batches=1)
+        return await get_job_status("job-flaky"), await _images_of_job("job-flaky")
+
+    job, images = asyncio.run(scenario())
+    assert validator["calls"] == 2
+    assert job["status"] == "completed"
+    assert images == 1
+    assert broker.messages(f"{VALIDATE_UPLOAD_TOPIC}.dlq") == []
+
+
+def test_permanent_error_goes_to_dlq_without_retries(mongo, broker, validator):
+    async def scenario():
+        broker.append(VALIDATE_UPLOAD_TOPIC, {
+            "job_id": "job-missing", "staging_path": storage_service.staging_location("no-existe.png"),
+            "original_filename": "estudio.png", "user_id": "user-1",
+        })
+        broker.append(VALIDATE_UPLOAD_TOPIC, b"no es json")
+        worker = _worker(broker, max_retries=3)
+        await worker.run(max_batches=1)
+        return worker.get_metrics(), await get_job_status("job-missing")
+
+    metrics, job = asyncio.run(scenario())
+    assert metrics["retries"] == 0
+    assert metrics["dead_lettered"] == 2
+    assert job["status"] == "failed"
+    assert validator["calls"] == 0
+    assert broker.committed_offset(GROUP_ID, VALIDATE_UPLOAD_TOPIC) == 2
+
+
+def test_stored_image_survives_validator_outage(mongo, broker, validator, png_bytes):
+    validator["verdict"] = TECHNICAL_FAILURE
+
+    async def scenario():
+        filename, info = await storage_service.save_image(png_bytes, "directa.png", "user-1")
+        image = await MongoImageRepository().save(Image(
+            filename=filename, original_filename="directa.png", file_path=info["file_path"],
+            file_size=info["file_size"], mime_type=info["mime_type"], user_id="user-1",
+            upload_date=datetime.utcnow(), metadata=info["metadata"],
+        ))
+        await enqueue_validation_job("job-stored", {"job_id": "job-stored", "image_id": image.id})
+        await _worker(broker, max_retries=1).run(max_batches=1)
+        return image, await MongoImageRepository().find_by_id(image.id), await get_job_status("job-stored")
+
+    image, remaining, job = asyncio.run(scenario())
+    assert validator["calls"] == 2
+    assert remaining is not None
+    assert os.path.exists(image.file_path)
+    assert job["status"] == "failed"
+    assert len(broker.messages(f"{VALIDATE_UPLOAD_TOPIC}.dlq")) == 1